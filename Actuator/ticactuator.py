@@ -1,13 +1,197 @@
-from pytic import PyTic
-from time import sleep
+from time import sleep, perf_counter
+from types import SimpleNamespace
+import bisect
 import math
+import threading
+
+# Without the Tic drivers, still allow the simulator's TicActuator stand-in to load
+try:
+    from pytic import PyTic
+except ImportError:
+    PyTic = object
+
+
+class TicTimeoutError(Exception):
+    """Raised when the Tic still can't be read after every attempt the retry policy allows"""
+
+
+class RetryPolicy:
+    """How many times to try a Tic read, and how long to back off between tries"""
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        backoff: float = 0.001,
+        backoff_factor: float = 2,
+        max_backoff: float = 0.05,
+    ):
+        """Creates a retry policy
+
+        Args:
+            max_attempts (int, optional): Reads to try before giving up. Defaults to 5.
+            backoff (float, optional): Wait (s) after the first failed read. Defaults to 0.001.
+            backoff_factor (float, optional): Each wait is this much longer than the last. Defaults to 2.
+            max_backoff (float, optional): Longest wait (s) between reads. Defaults to 0.05.
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt: int) -> float:
+        """How long to wait after a failed read
+
+        Args:
+            attempt (int): which attempt just failed, 0 for the first
+
+        Returns:
+            float: wait (s)
+        """
+        return min(self.max_backoff, self.backoff * self.backoff_factor**attempt)
+
+
+class LatencyHistogram:
+    """Round-trip times of one kind of Tic read, counted in logarithmic bins, along with failed reads"""
+
+    BIN_EDGES = [10 ** (e / 10) for e in range(-50, 1)]
+    """Upper edges of the bins (s), 10 per decade from 10us to 1s. Anything slower goes in a last bin."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LatencyHistogram.BIN_EDGES) + 1)
+        """Successful reads in each bin"""
+        self.reads = 0
+        """Number of successful reads"""
+        self.failures = 0
+        """Number of failed read attempts, including ones that were retried"""
+        self.timeouts = 0
+        """Number of times every attempt failed and TicTimeoutError was raised"""
+        self.total_time = 0
+        """Summed round-trip time (s) of successful reads"""
+        self.max_time = 0
+        """Slowest successful read (s)"""
+
+    def record(self, latency: float):
+        """Counts a successful read
+
+        Args:
+            latency (float): round-trip time (s)
+        """
+        self.counts[bisect.bisect_left(LatencyHistogram.BIN_EDGES, latency)] += 1
+        self.reads += 1
+        self.total_time += latency
+        self.max_time = max(self.max_time, latency)
+
+    def percentile(self, q: float) -> float:
+        """Estimates a latency percentile, rounded up to the top of its bin
+
+        Args:
+            q (float): percentile, 0 to 100
+
+        Returns:
+            float: latency (s), nan if nothing has been read yet
+        """
+        if self.reads <= 0:
+            return math.nan
+        rank = math.ceil(q / 100 * self.reads)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                break
+        if i >= len(LatencyHistogram.BIN_EDGES):
+            return self.max_time
+        return min(LatencyHistogram.BIN_EDGES[i], self.max_time)
+
+
+class ActuatorState:
+    """Read-only record of the actuator's variables, all fetched in one read"""
+
+    __slots__ = (
+        "time",
+        "position",
+        "position_mm",
+        "target_position",
+        "target_position_mm",
+        "velocity",
+        "velocity_mms",
+        "target_velocity",
+        "target_velocity_mms",
+        "max_speed",
+        "max_speed_mms",
+        "max_accel",
+        "max_accel_mmss",
+        "max_decel",
+        "max_decel_mmss",
+        "step_mode",
+        "vin_voltage",
+        "error_status",
+    )
+
+    def __init__(self, actuator, variables, time: float):
+        """Copies the actuator's variables and converts them to coherent units
+
+        Args:
+            actuator (TicActuator): the actuator, for its unit conversions
+            variables: pytic's structure of all the Tic's variables, as read in one go
+            time (float): perf_counter() time the variables were read
+        """
+        setter = super().__setattr__
+        setter("time", time)
+        setter("position", variables.current_position)
+        setter("position_mm", actuator.steps_to_mm(variables.current_position))
+        setter("target_position", variables.target_position)
+        setter("target_position_mm", actuator.steps_to_mm(variables.target_position))
+        setter("velocity", variables.current_velocity)
+        setter("velocity_mms", actuator.vel_to_mms(variables.current_velocity))
+        setter("target_velocity", variables.target_velocity)
+        setter("target_velocity_mms", actuator.vel_to_mms(variables.target_velocity))
+        setter("max_speed", variables.max_speed)
+        setter("max_speed_mms", actuator.vel_to_mms(variables.max_speed))
+        setter("max_accel", variables.max_accel)
+        setter("max_accel_mmss", actuator.accel_to_mmss(variables.max_accel))
+        setter("max_decel", variables.max_decel)
+        setter("max_decel_mmss", actuator.accel_to_mmss(variables.max_decel))
+        setter("step_mode", variables.step_mode)
+        setter("vin_voltage", variables.vin_voltage)
+        setter("error_status", variables.error_status)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ActuatorState is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("ActuatorState is read-only")
 
 
 class TicActuator(PyTic):
     """Wrapper for existing pytic package, but with useful helper functions to allow operations in coherent units"""
 
+    SHUTDOWN_RETRY_POLICY = RetryPolicy(max_attempts=10, backoff=0.01, max_backoff=0.5)
+    """How reads are retried while going home to shut down, about 2s in all, long enough to ride out a USB stall"""
+    STATE_VARIABLES = (
+        "current_position",
+        "target_position",
+        "current_velocity",
+        "target_velocity",
+        "max_speed",
+        "max_accel",
+        "max_decel",
+        "step_mode",
+        "vin_voltage",
+        "error_status",
+    )
+    """Tic variables an ActuatorState is made from"""
+
+    snapshot_max_age = 0
+    """Default for how old a snapshot can be and still be reused (s). ExperimentRunner sets it from its control rate."""
+    _block_reads = True
+    """Whether pytic's private whole-block read works, see _read_variables()"""
+
     def __init__(
-        self, step_size: float = 0.01, step_mode: int = 0, current_limit: int = 576
+        self,
+        step_size: float = 0.01,
+        step_mode: int = 0,
+        current_limit: int = 576,
+        wait_for_power: bool = True,
     ):
         """Handler for actuator operations, includes helper fucntions to enable using coherent units
 
@@ -15,24 +199,46 @@ class TicActuator(PyTic):
             step_size (float, optional): Size of actuator's full step in mm. Defaults to 0.01.
             step_mode (int, optional): Microstepping mode. Defaults to 0 (full steps).
             current_limit (int, optional): Current limit in mA. Defaults to 576.
+            wait_for_power (bool, optional): Whether to ask the user to turn the power on if it's off, rather than
+            raising an error. Defaults to True.
+
+        Raises:
+            RuntimeError: if the actuator's power is off and wait_for_power is False
         """
         super().__init__()
 
         # Connect to first available Tic Device serial number over USB
         serial_nums = self.list_connected_device_serial_numbers()
         self.connect_to_serial_number(serial_nums[0])
+        self._init_state(step_size)
 
         if self.get_variable_by_name("vin_voltage") < 7000:
+            if not wait_for_power:
+                raise RuntimeError("The actuator's power is off.")
             input("Wait! You didn't turn the power on for the actuator! Do that now.")
 
-        self.step_size = step_size  ## mm/step
-        self.microstep_ratio = 1
-
         self.my_set_step_mode(
             step_mode
         )  # have to use own method because the superclass sets its own attributes on super().__init__()
         self.set_current_limit(current_limit)
 
+    def _init_state(self, step_size: float):
+        """Sets up everything the helper functions keep track of, once self.variables can be read
+
+        Args:
+            step_size (float): Size of actuator's full step in mm
+        """
+        self.retry_policy = RetryPolicy()
+        """How reads of the Tic's variables are retried"""
+        self.read_stats = {}
+        """LatencyHistogram of each variable read, by variable name. Whole-block reads are under "snapshot"."""
+
+        self.step_size = step_size  ## mm/step
+        self.microstep_ratio = 1
+
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+
     def steps_to_mm(self, val: float) -> float:
         """Converts microsteps to mm
 
@@ -60,18 +266,13 @@ class TicActuator(PyTic):
     def get_pos(self) -> int:
         """Gets current actuator position in microsteps
 
+        Raises:
+            TicTimeoutError: if the position couldn't be read
+
         Returns:
                 float: current actuator position in microsteps
         """
-        pos = None
-        while pos is None:
-            try:
-                pos = self.get_variable_by_name("current_position")
-            except:
-                pos = None
-            else:
-                break
-        return pos
+        return self.get_variable_by_name("current_position")
 
     def get_pos_mm(self) -> float:
         """Gets current actuator position in mm
@@ -106,6 +307,20 @@ class TicActuator(PyTic):
         self.move_to_pos(pos)
         return pos
 
+    def start_move_to_mm(self, pos_mm: float) -> int:
+        """Starts moving the actuator to a position in mm without waiting for it to get there. Keep calling
+        heartbeat() while it moves, and compare a snapshot's position to its target position to see when it has.
+
+        Args:
+                pos_mm (float): desired position in mm
+
+        Returns:
+                int: corresponding position in actuator's units, steps
+        """
+        pos = math.floor(self.mm_to_steps(pos_mm))
+        self.set_target_position(pos)
+        return pos
+
     def mms_to_vel(self, vel_mms: float) -> int:
         """Converts velocity in mm/s to actuator units of steps/10,000s
 
@@ -133,19 +348,13 @@ class TicActuator(PyTic):
     def get_vel(self) -> int:
         """Gets current actuator velocity in microsteps/10,000s
 
+        Raises:
+            TicTimeoutError: if the velocity couldn't be read
+
         Returns:
                 float: current actuator velocity in microsteps/10,000s
         """
-
-        vel = None
-        while vel is None:
-            try:
-                vel = self.get_variable_by_name("current_velocity")
-            except:
-                vel = None
-            else:
-                break
-        return vel
+        return self.get_variable_by_name("current_velocity")
 
     def get_vel_mms(self) -> float:
         """Gets current actuator velocity in mm/s
@@ -195,6 +404,18 @@ class TicActuator(PyTic):
         accel = math.floor(self.mm_to_steps(accel_mmss) * 100)
         return accel
 
+    def accel_to_mmss(self, accel: int) -> float:
+        """Converts acceleration in actuator units of steps/100s/s to mm/s^2
+
+        Args:
+            accel (int): acceleration in actuator units of steps/100s/s
+
+        Returns:
+            float: acceleration in mm/s^2
+        """
+        accel_mmss = self.steps_to_mm(accel) / 100
+        return accel_mmss
+
     def set_max_accel_mmss(
         self, max_accel_mmss: float, also_set_decel: bool = False
     ) -> int:
@@ -241,42 +462,146 @@ class TicActuator(PyTic):
         self.microstep_ratio = 2 ** self.get_variable_by_name("step_mode")
         return self.microstep_ratio
 
+    def change_step_mode(self, step_mode: int) -> int:
+        """Changes the microstepping mode away from home, rescaling the position so it's the same in mm.
+        The Tic counts position in microsteps, so my_set_step_mode() alone would change the position in mm.
+        Halts the actuator first.
+
+        Args:
+            step_mode (int): Microstepping mode
+
+        Returns:
+            int: Number of microsteps per full step
+        """
+        pos_mm = self.get_pos_mm()
+        self.my_set_step_mode(step_mode)
+        self.halt_and_set_position(round(self.mm_to_steps(pos_mm)))
+        return self.microstep_ratio
+
     def heartbeat(self):
         """Resets command timeout back to 1 second. Call this at least every second to prevent actuator stopping.
         Alias for reset_command_timeout() because heartbeat is easier to remember.
         """
         self.reset_command_timeout()
 
-    def go_home_quiet_down(self):
-        """Returns actuator to zero position, enters safe start, de-energizes, and reports any errors"""
-        print("Going to zero")
-        self.move_to_pos(0)
+    def go_home_quiet_down(self) -> bool:
+        """Returns actuator to zero position, enters safe start, de-energizes, and reports any errors. Reads are
+        retried for longer than usual meanwhile, and the actuator is de-energized even if they still time out.
 
-        # De-energize motor and get error status
-        print("Entering safe start")
-        self.enter_safe_start()
-        print("Deenergizing")
-        self.deenergize()
-        print(self.get_variable_by_name("error_status"))
+        Returns:
+            bool: whether the actuator got back to zero
+        """
+        policy = self.retry_policy
+        self.retry_policy = TicActuator.SHUTDOWN_RETRY_POLICY
+        homed = False
+        try:
+            print("Going to zero")
+            self.move_to_pos(0)
+            homed = True
+        except TicTimeoutError as e:
+            print("Couldn't finish going to zero: {:}".format(e))
+        finally:
+            try:
+                # De-energize motor and get error status
+                print("Entering safe start")
+                self.enter_safe_start()
+                print("Deenergizing")
+                self.deenergize()
+                print(self.get_variable_by_name("error_status"))
+            except TicTimeoutError as e:
+                print("Couldn't read the error status: {:}".format(e))
+            finally:
+                self.retry_policy = policy
+        return homed
+
+    def _read(self, name: str, read):
+        """Reads from the Tic, retrying according to the retry policy and recording how long it took
+
+        Args:
+            name (str): what's being read, to file its latency under in read_stats
+            read (function): takes no arguments and does the read
+
+        Raises:
+            TicTimeoutError: if every attempt failed
+
+        Returns:
+            _type_: whatever read() returned
+        """
+        stats = self.read_stats.get(name)
+        if stats is None:
+            stats = self.read_stats.setdefault(name, LatencyHistogram())
+
+        policy = self.retry_policy
+        for attempt in range(policy.max_attempts):
+            start = perf_counter()
+            try:
+                value = read()
+            except Exception as e:
+                stats.failures += 1
+                error = e
+            else:
+                if value is not None:
+                    stats.record(perf_counter() - start)
+                    return value
+                stats.failures += 1
+                error = None
+            if attempt + 1 < policy.max_attempts:
+                sleep(policy.delay(attempt))
+
+        stats.timeouts += 1
+        raise TicTimeoutError(
+            "Couldn't read {:} from the Tic after {:d} attempts".format(
+                name, policy.max_attempts
+            )
+        ) from error
 
     def get_variable_by_name(self, name: str):
-        """Gets actuator variables and keeps trying until success
+        """Gets actuator variables, retrying failed reads according to the retry policy
 
         Args:
             name (str): name of variable to retrieve
 
+        Raises:
+            TicTimeoutError: if the variable couldn't be read
+
         Returns:
             _type_: the value of the variable that was requested, type may vary
         """
-        var = None
-        while var is None:
-            try:
-                var = getattr(self.variables, name)
-            except:
-                var = None
-            else:
-                break
-        return var
+        return self._read(name, lambda: getattr(self.variables, name))
+
+    def latency_stats(self) -> dict:
+        """Summarises the round-trip time and failures of every kind of read so far, e.g. for saving with a run
+
+        Returns:
+            dict: for each variable read, its number of reads, p50, p99 and max round-trip time (ms), and failed
+                and timed out reads
+        """
+        return {
+            name: {
+                "reads": stats.reads,
+                "p50_ms": 1000 * stats.percentile(50),
+                "p99_ms": 1000 * stats.percentile(99),
+                "max_ms": 1000 * stats.max_time,
+                "failures": stats.failures,
+                "timeouts": stats.timeouts,
+            }
+            for name, stats in sorted(self.read_stats.items())
+        }
+
+    def latency_report(self) -> str:
+        """Summarises the round-trip time and failures of every kind of read so far
+
+        Returns:
+            str: one line per variable read
+        """
+        lines = []
+        for name, stats in self.latency_stats().items():
+            lines.append(
+                "{:>20}: {reads:7d} reads, p50 = {p50_ms:6.2f}ms, p99 = {p99_ms:6.2f}ms, max = {max_ms:6.2f}ms, {failures:d} failed, {timeouts:d} timed out".format(
+                    name, **stats
+                )
+            )
+        return "\n".join(lines)
 
     def startup(self):
         """Energizes actuator and exits safe start"""
@@ -284,3 +609,62 @@ class TicActuator(PyTic):
         self.energize()
         print("Exiting safe start")
         self.exit_safe_start()
+
+    def snapshot(self, max_age: float = None) -> ActuatorState:
+        """Gets all of the actuator's variables from a single read, sharing recent reads between threads.
+        Every separate get_variable_by_name() call reads all of the variables over USB, so prefer this when
+        more than one variable is needed.
+
+        Args:
+            max_age (float, optional): Reuse the last snapshot if it's at most this old (s). 0 always reads. Defaults
+            to snapshot_max_age.
+
+        Raises:
+            TicTimeoutError: if the variables couldn't be read
+
+        Returns:
+            ActuatorState: the actuator's variables
+        """
+        if max_age is None:
+            max_age = self.snapshot_max_age
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and perf_counter() - snapshot.time <= max_age:
+                return snapshot
+
+            snapshot = self._read("snapshot", self._read_state)
+            self._snapshot = snapshot
+            return snapshot
+
+    def _read_state(self) -> ActuatorState:
+        """Reads all of the Tic's variables once
+
+        Returns:
+            ActuatorState: the actuator's variables
+        """
+        return ActuatorState(self, self._read_variables(), perf_counter())
+
+    def _read_variables(self):
+        """Reads the variables an ActuatorState needs. pytic has no public way to read them all at once, so this
+        uses its private one, and if that's gone in this version of pytic, falls back to reading them one at a time.
+
+        Returns:
+            the variables, as attributes
+        """
+        if self._block_reads:
+            update = getattr(self.variables, "_update_tic_variables", None)
+            if update is not None:
+                update()
+                variables = getattr(self.variables, "_tic_variables", None)
+                if variables is not None:
+                    return variables
+            self._block_reads = False
+            print(
+                "pytic can't read every Tic variable at once, reading them one at a time instead."
+            )
+        return SimpleNamespace(
+            **{
+                name: getattr(self.variables, name)
+                for name in TicActuator.STATE_VARIABLES
+            }
+        )
@@ -0,0 +1,287 @@
+import math
+from Control.squeezeflowmodel import SqueezeFlowModel
+
+
+class ForcePIDController:
+    """Force-to-velocity PI(D) control law used by the squeeze flow tests.
+
+    The multistep law, from PID_squeeze_flow_timed_multistep.py, clamps the error for the proportional term, scales the
+    command by the gap squared and leaves out the derivative term. The single target law, from PID_squeeze_flow_1.py
+    and PID_squeeze_flow_timed.py, is the full PID on the unclamped error, only ever moving down.
+
+    update_error() is fed every force measurement and keeps the leaky integral and the derivative of the error.
+    velocity() is called by the actuator loop and turns the current error state into a velocity command.
+
+    With a SqueezeFlowModel, update_model() fits the sample's rheology as the test runs, and velocity() adds the
+    closing velocity the fit says holds the target force, so after a step change the command starts near the
+    velocity it settles at instead of waiting on the integrator.
+    """
+
+    INT_THRESHOLD = 10
+    """Integrated error is clamped to this magnitude to prevent integral windup (g*s)"""
+    ERROR_THRESHOLD = 2
+    """Error is clamped to this magnitude for the proportional term (g)"""
+    MUTE_DERIVATIVE_TERM_STEPS_MAX = 100
+    """Number of actuator loop iterations the derivative term is muted for after a step change"""
+    MODEL_FIT_BAND = 0.05
+    """The sample model is only fitted while the error is within this fraction of the target"""
+
+    def __init__(
+        self,
+        K_P: float = 0.7,
+        K_I: float = 0.005,
+        K_D: float = 0.000167,
+        decay_rate_r: float = -0.1502,
+        a: float = 0.7,
+        b: float = 0.15,
+        c: float = 50,
+        d: float = 0.01,
+        ref_gap: float = 0.010,
+        model: SqueezeFlowModel = None,
+        feedforward_gain: float = 1,
+        max_feedforward: float = 0.25,
+        reference_time_constant: float = 0.5,
+        multistep: bool = True,
+    ):
+        """Creates a controller with no error accumulated
+
+        Args:
+            K_P (float, optional): Proportional control coefficient for error in grams to speed in mm/s. Only used for logging, the proportional gain follows the a/b/c/d schedule. Defaults to 0.7.
+            K_I (float, optional): Integral control coefficient for integrated error in grams*s to speed in mm/s. Defaults to 0.005.
+            K_D (float, optional): Derivative control coefficient for error derivative in grams/s to speed in mm/s. Defaults to 0.000167.
+            decay_rate_r (float, optional): Exponential leak rate of the integrated error (1/s). Defaults to -0.1502.
+            a (float, optional): Proportional gain far from the target. Defaults to 0.7.
+            b (float, optional): Proportional gain close to the target. Defaults to 0.15.
+            c (float, optional): Sharpness of the switch between the two gains. Defaults to 50.
+            d (float, optional): Squared relative error at which the gain switches. Defaults to 0.01.
+            ref_gap (float, optional): Gap (m) at which velocity is not rescaled. Defaults to 0.010.
+            model (SqueezeFlowModel, optional): Sample model for the feedforward term. Defaults to None, for no feedforward.
+            feedforward_gain (float, optional): Fraction of the model's velocity to feed forward. Defaults to 1.
+            max_feedforward (float, optional): Largest feedforward speed, either way (mm/s). Defaults to 0.25.
+            reference_time_constant (float, optional): Time constant (s) the feedforward moves from one target force
+            to the next with, which sets how fast it loads the frame after a step change. Defaults to 0.5.
+            multistep (bool, optional): Whether to use the multistep control law rather than the single target one.
+            Defaults to True.
+        """
+        self.K_P = K_P
+        self.K_I = K_I
+        self.K_D = K_D
+        self.decay_rate_r = decay_rate_r
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+        self.ref_gap = ref_gap
+        self.model = model
+        """Sample model for the feedforward term, None for no feedforward"""
+        self.feedforward_gain = feedforward_gain
+        self.max_feedforward = max_feedforward
+        self.reference_time_constant = reference_time_constant
+        self.multistep = multistep
+        """Whether the multistep control law is used, rather than the single target one"""
+
+        self.target = 0
+        """Target force"""
+        self.step_increase = 0
+        """How much the target force has increased from the last step"""
+        self.error = 0
+        """Positive error means force must increase, so actuator must extend down"""
+        self.int_error = 0
+        """Time-integrated error"""
+        self.der_error = 0
+        """Time-derivative of error"""
+        self.mute_derivative_term_steps = 0
+        """Remaining actuator loop iterations with the derivative term muted"""
+        self.reference = 0
+        """Force the feedforward is moving towards the target along, see reference_time_constant"""
+        self.vel_FF = 0
+        """Feedforward component of the last velocity command (mm/s)"""
+
+    @classmethod
+    def from_settings(
+        cls, settings: dict, model: SqueezeFlowModel = None, multistep: bool = True
+    ):
+        """Builds a controller from the gains in a settings dictionary, like test_settings.json
+
+        Args:
+            settings (dict): test settings, with gain, max_velocity_mms and reference_time_constant_s in its
+            "feedforward" block if it has one
+            model (SqueezeFlowModel, optional): Sample model for the feedforward term. Defaults to None.
+            multistep (bool, optional): Whether to use the multistep control law. Defaults to True.
+
+        Returns:
+            ForcePIDController: the controller
+        """
+        feedforward = settings.get("feedforward", {})
+        return cls(
+            settings["K_P"],
+            settings["K_I"],
+            settings["K_D"],
+            settings["decay_rate_r"],
+            settings["a"],
+            settings["b"],
+            settings["c"],
+            settings["d"],
+            settings["ref_gap"],
+            model,
+            feedforward.get("gain", 1),
+            feedforward.get("max_velocity_mms", 0.25),
+            feedforward.get("reference_time_constant_s", 0.5),
+            multistep,
+        )
+
+    def variable_K_P(self, er: float, tar: float) -> float:
+        """Proportional gain, scheduled on how far the force is from the target
+
+        Args:
+            er (float): error
+            tar (float): size of the target step
+
+        Returns:
+            float: proportional gain
+        """
+        a, b, c, d = self.a, self.b, self.c, self.d
+        return (a + b) / 2 + (a - b) / 2 * math.tanh(c * ((er / tar) ** 2 - d))
+
+    def update_error(self, force: float, dt_force: float):
+        """Updates the error, its leaky integral and its derivative with a new force measurement
+
+        Args:
+            force (float): force measurement
+            dt_force (float): time since the previous force measurement (s)
+        """
+        old_error = self.error
+        self.error = self.target - force
+        self.int_error = self.int_error * math.exp(self.decay_rate_r * dt_force)
+        self.int_error += (
+            ((old_error + self.error) / 2 * dt_force) if dt_force > 0 else 0
+        )  # trapezoidal integration
+        self.der_error = (
+            ((self.error - old_error) / dt_force) if dt_force > 0 else 0
+        )  # first order backwards difference
+
+    def update_model(self, force: float, gap_m: float, velocity: float, dt: float):
+        """Feeds the sample model the latest force, gap and actuator velocity, if there is a model. Only samples with
+        the force near the target are fitted, since the model doesn't cover the frame catching up after a step.
+
+        Args:
+            force (float): force measurement
+            gap_m (float): current gap (m)
+            velocity (float): actuator velocity (mm/s), negative when squeezing
+            dt (float): time since the last call (s)
+        """
+        if self.model is not None:
+            if dt > 0:
+                self.reference += (
+                    dt
+                    / (self.reference_time_constant + dt)
+                    * (self.target - self.reference)
+                )
+            self.model.observe(
+                force,
+                gap_m,
+                -velocity / 1000,
+                dt,
+                abs(self.error) <= ForcePIDController.MODEL_FIT_BAND * abs(self.target),
+            )
+
+    def feedforward(self, gap_m: float) -> float:
+        """Velocity that should hold the target force at this gap, from the sample model, plus the velocity that loads
+        the frame as the reference force rises to the target
+
+        Args:
+            gap_m (float): current gap (m)
+
+        Returns:
+            float: feedforward velocity (mm/s), 0 without a model or before it's identified
+        """
+        if self.model is None or not self.model.identified():
+            return 0
+        closing_velocity = 1000 * (
+            self.model.closing_velocity(self.target, gap_m)
+            + self.model.frame_closing_velocity(
+                (self.target - self.reference) / self.reference_time_constant
+            )
+        )
+        return -max(
+            -self.max_feedforward,
+            min(self.feedforward_gain * closing_velocity, self.max_feedforward),
+        )
+
+    def reset_integral(self):
+        """Throws away the integrated error, to prevent windup before control starts"""
+        self.int_error = 0
+
+    def start(self, target: float, gap_m: float):
+        """Starts control on the first target once the sample is touched
+
+        Args:
+            target (float): first target force
+            gap_m (float): current gap (m)
+        """
+        self.target = target
+        self.step_increase = target
+        self.ref_gap = max(
+            self.ref_gap, gap_m
+        )  # if sample volume is large, might need to increase the ref gap
+        self.mute_derivative_term_steps = 0
+        self.reference = target
+
+    def next_step(self, target: float):
+        """Moves on to the next target force
+
+        Args:
+            target (float): new target force
+        """
+        self.step_increase = target - self.target
+        self.target = target
+        self.mute_derivative_term_steps = (
+            ForcePIDController.MUTE_DERIVATIVE_TERM_STEPS_MAX
+        )
+
+    def velocity(self, gap_m: float) -> tuple[float, float, float, float]:
+        """Computes the actuator velocity command. Call once per actuator loop iteration.
+
+        Args:
+            gap_m (float): current gap (m)
+
+        Returns:
+            tuple[float, float, float, float]: velocity command, and its proportional, integral and derivative components (mm/s).
+            The feedforward component is left in vel_FF.
+        """
+        if not self.multistep:
+            vel_P = -self.variable_K_P(self.error, self.target) * self.error
+            vel_I = -self.K_I * self.int_error
+            vel_D = -self.K_D * self.der_error
+            self.vel_FF = self.feedforward(gap_m)
+            v_new = vel_P + vel_D + vel_I + self.vel_FF
+            v_new = min(v_new, 0)  # Only go downward
+            return v_new, vel_P, vel_I, vel_D
+
+        # Prevent integral windup
+        if abs(self.int_error) > ForcePIDController.INT_THRESHOLD:
+            self.int_error = math.copysign(
+                ForcePIDController.INT_THRESHOLD, self.int_error
+            )
+
+        l_error = self.error
+        if abs(l_error) > ForcePIDController.ERROR_THRESHOLD:
+            l_error = math.copysign(ForcePIDController.ERROR_THRESHOLD, l_error)
+        vel_P = -self.variable_K_P(l_error, self.step_increase) * l_error
+        """Proportional component of velocity response"""
+        vel_I = -self.K_I * self.int_error
+        """Integral component of velocity response"""
+        vel_D = -self.K_D * self.der_error
+        """Derivative component of velocity response"""
+
+        if self.mute_derivative_term_steps > 0:
+            self.mute_derivative_term_steps = self.mute_derivative_term_steps - 1
+            self.der_error = 0
+            vel_D = 0
+
+        # v_new = vel_P + vel_D + vel_I
+        v_new = vel_P + vel_I
+        v_new = v_new * (gap_m / self.ref_gap) ** 2
+        self.vel_FF = self.feedforward(gap_m)
+        v_new = v_new + self.vel_FF
+        return v_new, vel_P, vel_I, vel_D
@@ -0,0 +1,140 @@
+from time import perf_counter, sleep
+import math
+import numpy as np
+
+
+class FixedRateScheduler:
+    """Paces a loop at a fixed rate against a monotonic clock, and keeps timing statistics for every cycle.
+
+    Call wait() once per loop iteration. Deadlines are fixed multiples of the period from start(), so a
+    slow cycle shortens the next sleep rather than pushing every later cycle back. If a cycle overruns by
+    more than a whole period, the deadlines it missed are skipped and counted instead of being run late
+    back-to-back; a smaller overrun just starts the next cycle straight away.
+    """
+
+    def __init__(
+        self,
+        frequency: float,
+        history: int = 2**16,
+        clock=perf_counter,
+        sleep=sleep,
+    ):
+        """Creates a scheduler
+
+        Args:
+            frequency (float): loop rate (Hz)
+            history (int, optional): Number of most recent cycles to keep timing for. Defaults to 2**16.
+            clock (function, optional): Monotonic clock returning seconds. Defaults to perf_counter.
+            sleep (function, optional): Sleeps for a number of seconds on the same clock. Defaults to sleep.
+        """
+        self.period = 1 / frequency
+        """Time between deadlines (s)"""
+        self.clock = clock
+        self.sleep = sleep
+
+        self.jitter = np.zeros(history)
+        """How late each cycle started after its deadline (s), ring buffer"""
+        self.exec_time = np.zeros(history)
+        """How long each cycle's work took (s), ring buffer"""
+        self.cycles = 0
+        """Number of cycles run"""
+        self.missed = 0
+        """Number of deadlines skipped because a cycle overran"""
+
+        self._start = None
+        self._deadline = None
+        self._wake = None
+
+    def start(self):
+        """Starts the schedule now, with the first deadline one period away"""
+        self._start = self.clock()
+        self._deadline = self._start
+        self._wake = None
+
+    def wait(self) -> float:
+        """Ends the current cycle and sleeps until the next deadline
+
+        Returns:
+            float: time (s) since the previous cycle started, the period unless deadlines were missed
+        """
+        if self._start is None:
+            self.start()
+
+        now = self.clock()
+        if self._wake is not None:
+            self.exec_time[self.cycles % len(self.exec_time)] = now - self._wake
+
+        next_deadline = self._deadline + self.period
+        if now - next_deadline >= self.period:
+            # Overran by whole periods: skip those deadlines rather than running them late back-to-back
+            skipped = math.floor((now - next_deadline) / self.period)
+            self.missed += skipped
+            next_deadline += skipped * self.period
+
+        remaining = next_deadline - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+
+        wake = self.clock()
+        if self._wake is not None:
+            self.cycles += 1
+        self.jitter[self.cycles % len(self.jitter)] = wake - next_deadline
+        dt = next_deadline - self._deadline
+        self._deadline = next_deadline
+        self._wake = wake
+        return dt
+
+    def stats(self) -> dict:
+        """Summarises the timing of the cycles kept in history, e.g. for saving with a run
+
+        Returns:
+            dict: cycles run, achieved and target rate (Hz), missed deadlines, and the mean, p99 and max
+                jitter and execution time (ms). Empty if no cycles have run.
+        """
+        n = min(self.cycles, len(self.jitter))
+        if n <= 0:
+            return {}
+        elapsed = self._deadline - self._start
+
+        def spread(values):
+            ms = 1000 * values[:n]
+            return {
+                "mean": float(np.mean(ms)),
+                "p99": float(np.percentile(ms, 99)),
+                "max": float(np.max(ms)),
+            }
+
+        return {
+            "cycles": self.cycles,
+            "rate_Hz": self.cycles / elapsed if elapsed > 0 else math.nan,
+            "target_Hz": 1 / self.period,
+            "missed": self.missed,
+            "jitter_ms": spread(self.jitter),
+            "exec_time_ms": spread(self.exec_time),
+        }
+
+    def report(self) -> str:
+        """Summarises the timing of the cycles kept in history
+
+        Returns:
+            str: achieved rate, jitter, execution time and missed deadlines
+        """
+        stats = self.stats()
+        if len(stats) == 0:
+            return "No cycles run"
+        return "\n".join(
+            [
+                "{:d} cycles at {:.1f}Hz (target {:.1f}Hz), {:d} deadlines missed".format(
+                    stats["cycles"],
+                    stats["rate_Hz"],
+                    stats["target_Hz"],
+                    stats["missed"],
+                ),
+                "Jitter:    mean = {mean:6.3f}ms, p99 = {p99:6.3f}ms, max = {max:6.3f}ms".format(
+                    **stats["jitter_ms"]
+                ),
+                "Exec time: mean = {mean:6.3f}ms, p99 = {p99:6.3f}ms, max = {max:6.3f}ms".format(
+                    **stats["exec_time_ms"]
+                ),
+            ]
+        )
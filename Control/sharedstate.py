@@ -0,0 +1,127 @@
+import collections
+import threading
+from time import sleep
+import numpy as np
+
+
+class SeqLockRecord:
+    """Latest values of a few related fields, shared between threads with a sequence lock.
+
+    A write bumps the sequence number to odd, changes the fields, then bumps it back to even. A reader copies
+    the fields and retries if the sequence number was odd or changed underneath it, so it always gets values
+    from a single write without ever blocking the writer. Writers only wait on each other.
+    """
+
+    def __init__(self, **fields):
+        """Creates a record
+
+        Args:
+            fields: name and starting value of each field
+        """
+        names = tuple(fields.keys())
+        self._type = collections.namedtuple("Snapshot", names)
+        self._index = {name: i for i, name in enumerate(names)}
+        self._values = list(fields.values())
+        self._seq = 0
+        self._write_lock = threading.Lock()
+
+    def write(self, **values):
+        """Changes some of the fields together
+
+        Args:
+            values: new value of each field to change
+        """
+        with self._write_lock:
+            self._seq += 1
+            for name, value in values.items():
+                self._values[self._index[name]] = value
+            self._seq += 1
+
+    def read(self):
+        """Gets a consistent copy of every field
+
+        Returns:
+            Snapshot: named tuple of the fields, all from the same write
+        """
+        while True:
+            seq = self._seq
+            if seq & 1:
+                sleep(0)  # a write is in progress, let it finish
+                continue
+            values = self._type._make(self._values)
+            if self._seq == seq:
+                return values
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._values[self._index[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class SampleHistory:
+    """Growing record of samples in named columns, written by one thread and read by any number without copying.
+
+    Every value is stored twice, capacity apart, in arrays twice the capacity long, so the latest capacity
+    samples are always contiguous and view() hands out slices rather than copies. The sample count is only
+    published once a sample is fully written, so readers never see half a sample.
+    """
+
+    def __init__(self, columns: list[str], capacity: int = 2**18):
+        """Creates an empty history
+
+        Args:
+            columns (list[str]): column names
+            capacity (int, optional): Number of most recent samples kept. Defaults to 2**18.
+        """
+        self.columns = tuple(columns)
+        self.capacity = capacity
+        self._data = np.zeros((len(columns), 2 * capacity))
+        self.count = 0
+        """Total number of samples appended, including ones since overwritten"""
+        self.start = 0
+        """Index of the oldest sample still wanted, see discard()"""
+
+    def append(self, *values):
+        """Adds a sample. Only one thread may append.
+
+        Args:
+            values: one value per column, in column order
+        """
+        i = self.count % self.capacity
+        self._data[:, i] = values
+        self._data[:, i + self.capacity] = values
+        self.count += 1
+
+    def discard(self, keep: int = 0):
+        """Hides all but the most recent samples from view()
+
+        Args:
+            keep (int, optional): Number of most recent samples to keep. Defaults to 0.
+        """
+        self.start = max(self.start, self.count - keep)
+
+    def view(self, n: int = None) -> tuple[np.ndarray, ...]:
+        """Gets the most recent samples without copying them
+
+        Args:
+            n (int, optional): Most samples to return. Defaults to all of them still kept.
+
+        Returns:
+            tuple[np.ndarray, ...]: read-only view of each column, oldest sample first
+        """
+        count = self.count
+        # Leave room for the writer to overwrite the next slot while the view is in use
+        oldest = max(self.start, count - self.capacity + 1)
+        if n is not None:
+            oldest = max(oldest, count - n)
+        if count <= oldest:
+            return tuple(np.zeros(0) for _ in self.columns)
+
+        begin = oldest % self.capacity
+        columns = self._data[:, begin : begin + count - oldest]
+        columns = columns.view()
+        columns.flags.writeable = False
+        return tuple(columns)
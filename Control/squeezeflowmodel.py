@@ -0,0 +1,326 @@
+import math
+
+
+class SqueezeFlowModel:
+    """Herschel-Bulkley squeeze flow of a fixed sample volume, with the sample's yield stress and consistency
+    identified online from force, gap and closing velocity.
+
+    The force needed to close the gap h at velocity v is F = tau_y * Y(h) + K * C(h) * v^n, where Y is the plastic
+    term (Meeten (2000) with wall slip, Scott (1935) without) and C the power law Stefan term, as in
+    Simulator/squeezeflowplant.py. With the flow index n fixed, F is linear in tau_y and K, so they're fitted by
+    exponentially weighted least squares as samples come in. closing_velocity() inverts the fit to get the velocity
+    that holds a given force, which ForcePIDController uses as feedforward.
+
+    The actuator doesn't move the hammer directly: the frame and load cell are a spring, so while the force changes
+    the hammer moves slower or faster than the actuator. observe() takes the actuator's gap and velocity and, given
+    the frame stiffness, works out the hammer's before fitting them.
+    """
+
+    def __init__(
+        self,
+        sample_volume: float,
+        plate_radius: float,
+        flow_index: float = 1,
+        wall_slip: bool = True,
+        forgetting_factor: float = 0.9995,
+        min_samples: int = 250,
+        force_scale: float = 1,
+        frame_stiffness: float = None,
+        velocity_time_constant: float = 1,
+        max_relative_error: float = 0.25,
+    ):
+        """Creates a model with nothing identified yet
+
+        Args:
+            sample_volume (float): sample volume (m^3)
+            plate_radius (float): hammer radius (m)
+            flow_index (float, optional): flow index n, below 1 is shear thinning. Defaults to 1 (Bingham).
+            wall_slip (bool, optional): whether the sample slips at the plates. Defaults to True.
+            forgetting_factor (float, optional): weight kept by each sample per new sample, so the fit follows a
+            sample whose rheology changes. Defaults to 0.9995, about 40s of memory at 50Hz.
+            min_samples (int, optional): samples needed before the fit is used. Defaults to 250.
+            force_scale (float, optional): Newtons per unit of force, so yield stress and consistency come out in
+            Pa and Pa.s^n. Defaults to 1.
+            frame_stiffness (float, optional): combined stiffness of frame and load cell (N/m), as the rigidity test
+            measures. Defaults to None, for a rigid frame.
+            velocity_time_constant (float, optional): time constant (s) of the low pass filter on the hammer's
+            velocity, which the actuator's jittery commands would otherwise bias. Defaults to 1.
+            max_relative_error (float, optional): largest standard error of the consistency, relative to the
+            consistency, for the fit to be used. Defaults to 0.25.
+        """
+        self.sample_volume = sample_volume
+        self.plate_radius = plate_radius
+        self.flow_index = flow_index
+        self.wall_slip = wall_slip
+        self.forgetting_factor = forgetting_factor
+        self.min_samples = min_samples
+        self.force_scale = force_scale
+        self.frame_stiffness = frame_stiffness
+        self.velocity_time_constant = velocity_time_constant
+        self.max_relative_error = max_relative_error
+
+        self.yield_stress = math.nan
+        """Identified yield stress tau_y (Pa), nan until there's a fit"""
+        self.consistency = math.nan
+        """Identified consistency K (Pa.s^n), nan until there's a fit"""
+        self.count = 0
+        """Number of samples fitted"""
+        self._normal = [0.0, 0.0, 0.0]
+        """Weighted sums of Y^2, Y*V and V^2, where V = C * v^n"""
+        self._moment = [0.0, 0.0]
+        """Weighted sums of Y*F and V*F"""
+        self._force_squares = 0.0
+        """Weighted sum of F^2"""
+        self._weight = 0.0
+        """Sum of the samples' weights"""
+        self.hammer_velocity = None
+        """Filtered closing velocity of the hammer (m/s), None before the first observation"""
+        self._last_force = None
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: dict,
+        sample_volume: float,
+        plate_radius: float,
+        force_scale: float,
+    ):
+        """Builds a model from the "feedforward" block of the test settings. Feedforward is only used when the block
+        has "enabled": true, so check that first.
+
+        Args:
+            settings (dict): feedforward settings, with flow_index, wall_slip, forgetting_factor, min_samples,
+            frame_stiffness_N_per_m, velocity_time_constant_s and max_relative_error
+            sample_volume (float): sample volume (m^3)
+            plate_radius (float): hammer radius (m)
+            force_scale (float): Newtons per unit of force
+
+        Returns:
+            SqueezeFlowModel: the model
+        """
+        return cls(
+            sample_volume,
+            plate_radius,
+            settings.get("flow_index", 1),
+            settings.get("wall_slip", True),
+            settings.get("forgetting_factor", 0.9995),
+            settings.get("min_samples", 250),
+            force_scale,
+            settings.get("frame_stiffness_N_per_m"),
+            settings.get("velocity_time_constant_s", 1),
+            settings.get("max_relative_error", 0.25),
+        )
+
+    def sample_radius(self, gap: float) -> float:
+        """Radius of the sample under the hammer, assuming it stays a cylinder
+
+        Args:
+            gap (float): gap (m)
+
+        Returns:
+            float: sample radius (m), no more than the hammer radius
+        """
+        return min(self.plate_radius, math.sqrt(self.sample_volume / (math.pi * gap)))
+
+    def plastic_term(self, gap: float) -> float:
+        """Y(h), the yield force per unit yield stress
+
+        Args:
+            gap (float): gap (m)
+
+        Returns:
+            float: plastic term (m^2)
+        """
+        r = self.sample_radius(gap)
+        if self.wall_slip:  # Meeten (2000)
+            return math.sqrt(3) * math.pi * r**2
+        return 2 * math.pi * r**3 / (3 * gap)  # Scott (1935)
+
+    def viscous_term(self, gap: float) -> float:
+        """C(h), the viscous force per unit consistency at unit closing velocity, from the power law Stefan equation
+
+        Args:
+            gap (float): gap (m)
+
+        Returns:
+            float: viscous term (m^2.(s/m)^n)
+        """
+        n = self.flow_index
+        r = self.sample_radius(gap)
+        return (
+            2
+            * math.pi
+            / (n + 3)
+            * ((2 * n + 1) / n) ** n
+            * r ** (n + 3)
+            / gap ** (2 * n + 1)
+        )
+
+    def hammer_gap(self, force: float, gap: float) -> float:
+        """Gap under the hammer, once the frame has given way under the force
+
+        Args:
+            force (float): force measurement
+            gap (float): gap (m) the actuator would give if the frame were rigid
+
+        Returns:
+            float: gap (m) under the hammer
+        """
+        if self.frame_stiffness is None:
+            return gap
+        return gap + force * self.force_scale / self.frame_stiffness
+
+    def observe(
+        self,
+        force: float,
+        gap: float,
+        closing_velocity: float,
+        dt: float,
+        fit: bool = True,
+    ):
+        """Works out the hammer's gap and velocity from the actuator's, and fits them
+
+        Args:
+            force (float): force measurement
+            gap (float): gap (m) the actuator would give if the frame were rigid
+            closing_velocity (float): speed the actuator is closing the gap at (m/s)
+            dt (float): time since the last observation (s)
+            fit (bool, optional): Whether to fit this sample, rather than only follow the hammer's velocity, e.g.
+            while the force is settling. Defaults to True.
+        """
+        velocity = closing_velocity
+        if self.frame_stiffness is not None and self._last_force is not None and dt > 0:
+            velocity -= (
+                (force - self._last_force)
+                * self.force_scale
+                / self.frame_stiffness
+                / dt
+            )
+        self._last_force = force
+        if self.hammer_velocity is None:
+            self.hammer_velocity = velocity
+        elif dt > 0:
+            self.hammer_velocity += (
+                dt
+                / (self.velocity_time_constant + dt)
+                * (velocity - self.hammer_velocity)
+            )
+        if fit:
+            self.update(force, self.hammer_gap(force, gap), self.hammer_velocity)
+
+    def update(self, force: float, gap: float, closing_velocity: float):
+        """Fits a new sample. Samples where the hammer is opening or the gap is gone are skipped, since the model
+        only covers squeezing.
+
+        Args:
+            force (float): force measurement
+            gap (float): gap (m)
+            closing_velocity (float): speed the gap is closing at (m/s)
+        """
+        if gap <= 0 or closing_velocity < 0:
+            return
+        y = self.plastic_term(gap)
+        v = self.viscous_term(gap) * closing_velocity**self.flow_index
+        f = force * self.force_scale
+        lam = self.forgetting_factor
+        normal = self._normal
+        normal[0] = lam * normal[0] + y * y
+        normal[1] = lam * normal[1] + y * v
+        normal[2] = lam * normal[2] + v * v
+        self._moment[0] = lam * self._moment[0] + y * f
+        self._moment[1] = lam * self._moment[1] + v * f
+        self._force_squares = lam * self._force_squares + f * f
+        self._weight = lam * self._weight + 1
+        self.count += 1
+
+        det = normal[0] * normal[2] - normal[1] ** 2
+        if det <= 1e-9 * normal[0] * normal[2]:
+            return  # not enough variety in the samples to tell the terms apart, keep the last fit
+        self.yield_stress = (
+            normal[2] * self._moment[0] - normal[1] * self._moment[1]
+        ) / det
+        self.consistency = (
+            normal[0] * self._moment[1] - normal[1] * self._moment[0]
+        ) / det
+
+    def consistency_error(self) -> float:
+        """Standard error of the identified consistency, from the residuals of the fit. It stays large until the
+        samples cover a range of velocities, since holding one force says little about the viscous term.
+
+        Returns:
+            float: standard error (Pa.s^n), inf if there's no fit
+        """
+        normal = self._normal
+        det = normal[0] * normal[2] - normal[1] ** 2
+        if math.isnan(self.consistency) or det <= 0 or self._weight <= 2:
+            return math.inf
+        residual_squares = (
+            self._force_squares
+            - self.yield_stress * self._moment[0]
+            - self.consistency * self._moment[1]
+        )
+        variance = max(residual_squares, 0) / (self._weight - 2)
+        return math.sqrt(variance * normal[0] / det)
+
+    def identified(self) -> bool:
+        """Whether the fit has seen enough samples, is physical and pins the consistency down well enough
+
+        Returns:
+            bool: True if the fit can be used
+        """
+        return (
+            self.count >= self.min_samples
+            and self.yield_stress >= 0
+            and self.consistency > 0
+            and self.consistency_error() <= self.max_relative_error * self.consistency
+        )
+
+    def force(self, gap: float, closing_velocity: float) -> float:
+        """Predicts the force needed to close the gap at a velocity
+
+        Args:
+            gap (float): gap (m)
+            closing_velocity (float): speed the gap is closing at (m/s)
+
+        Returns:
+            float: force, in the same units as update() is given
+        """
+        return (
+            self.yield_stress * self.plastic_term(gap)
+            + self.consistency
+            * self.viscous_term(gap)
+            * max(closing_velocity, 0) ** self.flow_index
+        ) / self.force_scale
+
+    def frame_closing_velocity(self, force_rate: float) -> float:
+        """How much faster than the hammer the actuator has to close the gap for the force to rise at a rate, as the
+        frame gives way
+
+        Args:
+            force_rate (float): rate the force rises at (units/s)
+
+        Returns:
+            float: closing velocity (m/s), 0 for a rigid frame
+        """
+        if self.frame_stiffness is None:
+            return 0
+        return force_rate * self.force_scale / self.frame_stiffness
+
+    def closing_velocity(self, force: float, gap: float) -> float:
+        """Velocity the gap has to close at to hold a force
+
+        Args:
+            force (float): force to hold
+            gap (float): gap (m)
+
+        Returns:
+            float: closing velocity (m/s), 0 if the force is too small to make the sample flow or there's no fit yet
+        """
+        if not self.identified() or gap <= 0:
+            return 0
+        excess = force * self.force_scale - self.yield_stress * self.plastic_term(gap)
+        if excess <= 0:
+            return 0
+        return (excess / (self.consistency * self.viscous_term(gap))) ** (
+            1 / self.flow_index
+        )
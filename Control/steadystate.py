@@ -0,0 +1,115 @@
+import collections
+import math
+
+
+class SteadyStateDetector:
+    """Streaming test for whether a signal has settled: fits a line to the samples in a rolling time window and
+    checks its drift across the window and the scatter about it, both relative to the signal's mean.
+
+    The fit comes from running sums that samples are added to as they arrive and taken from as they leave the
+    window, so each sample costs the same however long the window is. Times are kept relative to the first sample
+    since reset() so the sums stay well conditioned.
+    """
+
+    def __init__(
+        self, window: float, drift_tolerance: float, noise_tolerance: float = None
+    ):
+        """Creates a detector with no samples
+
+        Args:
+            window (float): length of the rolling window (s)
+            drift_tolerance (float): largest change of the fitted line across the window, as a fraction of the mean
+            noise_tolerance (float, optional): largest standard deviation about the fitted line, as a fraction of the
+            mean. Defaults to None, to not check.
+        """
+        self.window = window
+        self.drift_tolerance = drift_tolerance
+        self.noise_tolerance = noise_tolerance
+        self.reset()
+
+    def reset(self):
+        """Forgets every sample, e.g. when the target changes"""
+        self._samples = collections.deque()
+        self._t0 = None
+        self._n = 0
+        self._sum_t = 0.0
+        self._sum_v = 0.0
+        self._sum_tt = 0.0
+        self._sum_tv = 0.0
+        self._sum_vv = 0.0
+
+    def _add(self, t: float, v: float, sign: int):
+        self._n += sign
+        self._sum_t += sign * t
+        self._sum_v += sign * v
+        self._sum_tt += sign * t * t
+        self._sum_tv += sign * t * v
+        self._sum_vv += sign * v * v
+
+    def update(self, t: float, value: float):
+        """Adds a sample, dropping the ones that have left the window
+
+        Args:
+            t (float): time of the sample (s)
+            value (float): the sample
+        """
+        if self._t0 is None:
+            self._t0 = t
+        t = t - self._t0
+        self._samples.append((t, value))
+        self._add(t, value, 1)
+        while t - self._samples[0][0] > self.window:
+            self._add(*self._samples.popleft(), -1)
+
+    def full(self) -> bool:
+        """Whether the samples span the whole window yet
+
+        Returns:
+            bool: True once there's a window's worth of samples
+        """
+        return (
+            len(self._samples) > 2
+            and self._samples[-1][0] - self._samples[0][0] >= 0.95 * self.window
+        )
+
+    def mean(self) -> float:
+        """Mean of the samples in the window
+
+        Returns:
+            float: mean, nan with no samples
+        """
+        return self._sum_v / self._n if self._n > 0 else math.nan
+
+    def fit(self) -> tuple[float, float]:
+        """Least squares line through the samples in the window
+
+        Returns:
+            tuple[float, float]: slope (per s) and standard deviation about the line, nan with too few samples
+        """
+        n = self._n
+        if n < 3:
+            return math.nan, math.nan
+        t_var = self._sum_tt - self._sum_t**2 / n
+        if t_var <= 0:
+            return math.nan, math.nan
+        tv_cov = self._sum_tv - self._sum_t * self._sum_v / n
+        v_var = self._sum_vv - self._sum_v**2 / n
+        slope = tv_cov / t_var
+        residual = max(v_var - slope * tv_cov, 0)
+        return slope, math.sqrt(residual / (n - 2))
+
+    def steady(self) -> bool:
+        """Whether the signal has settled: the window is full, and the drift and scatter are within tolerance
+
+        Returns:
+            bool: True if steady
+        """
+        if not self.full():
+            return False
+        slope, noise = self.fit()
+        scale = abs(self.mean())
+        if math.isnan(slope) or scale <= 0:
+            return False
+        if abs(slope) * self.window > self.drift_tolerance * scale:
+            return False
+        return self.noise_tolerance is None or noise <= self.noise_tolerance * scale
@@ -0,0 +1,394 @@
+"""Persistent index of the runs in the data directory, so runs can be looked up by sample, volume, target and
+so on without listing and parsing every file again.
+
+The index is an SQLite database in the data directory. update() only re-reads files whose modification time
+or size changed since they were indexed, so keeping it current after new runs land is cheap:
+
+    python -m DataAnalysis.catalog --sample CarbopolB --volume 2
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+import numpy as np
+from DataLogger.datalogger import LOG_EXTENSION, SIDECAR_EXTENSION, read_log_header
+
+CATALOG_NAME = "catalog.sqlite"
+"""File name of the index, kept in the data directory"""
+SCHEMA_VERSION = 2
+"""Bumped whenever the tables change, so an old index gets rebuilt rather than misread"""
+DATA_SUFFIXES = ("-data.csv", "-data" + LOG_EXTENSION, "-data" + SIDECAR_EXTENSION)
+"""Endings of the run files the acquisition scripts write: CSV, binary log and metadata sidecar"""
+SCRIPT_NAMES = (
+    "PID_squeeze_flow_1",
+    "PID_squeeze_flow_multistep",
+    "set_gap_squeeze_flow",
+    "fixed_speed_squeeze_flow",
+    "fixed_speed_set_force",
+    "constant_strain_rate_squeeze_flow",
+    "newtonain_squeeze_flow_1",
+    "newtonain_squeeze_flow_fixed_volume_1",
+    "actuator_load_cell_test_1",
+    "retraction",
+    "rigidity_test",
+    "find_gap",
+)
+"""Names the acquisition scripts put in their file names, so they can be told apart from the sample name"""
+FORCE_UNITS = ("g", "kg", "N")
+"""Units a target force in a file name may have"""
+
+NAME_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})_(\d{2})-(\d{2})-(\d{2})_(.+)-data$")
+"""Run name as the scripts build it: date, time, then what was run"""
+
+
+def parse_run_name(run: str) -> dict:
+    """Gets what the scripts put into a run's file name, e.g.
+    2023-08-02_14-19-49_PID_squeeze_flow_1_Test2b-CarbopolB_3mL_5g-data. Parts that aren't in the name are None.
+
+    Args:
+        run (str): run's file name without its extension
+
+    Returns:
+        dict: the run's "timestamp" (ISO format), "script", "sample_str" as typed in, "sample" and "test" split
+            out of it as data_reading*.m did, "volume_mL", and the "target" and its "units" if the name has them
+    """
+    info = dict.fromkeys(
+        (
+            "timestamp",
+            "script",
+            "sample_str",
+            "sample",
+            "test",
+            "volume_mL",
+            "target",
+            "units",
+        )
+    )
+    match = NAME_PATTERN.match(run)
+    if match is None:
+        return info
+    date, hour, minute, second, body = match.groups()
+    info["timestamp"] = "{:}T{:}:{:}:{:}".format(date, hour, minute, second)
+
+    volume = re.search(r"_([\d.]+)mL(?=_|$)", body)
+    if volume is None:
+        info["script"] = body
+        return info
+    info["volume_mL"] = float(volume.group(1))
+    before = body[: volume.start()]
+    script = max(
+        (name for name in SCRIPT_NAMES if before.startswith(name + "_")),
+        key=len,
+        default=before.rsplit("_", 1)[0] if "_" in before else before,
+    )
+    info["script"] = script
+    info.update(split_sample_str(before[len(script) + 1 :]))
+
+    target = re.match(r"_([\d.]+)([a-zA-Z]+)", body[volume.end() :])
+    if target is not None and target.group(2) in FORCE_UNITS:
+        info["target"] = float(target.group(1))
+        info["units"] = target.group(2)
+    return info
+
+
+def split_sample_str(sample_str: str) -> dict:
+    """Splits the test number from the sample in names like Test2a-CarbopolB or Test2a_carbopol_KI=0.01
+
+    Args:
+        sample_str (str): sample description as typed in at the start of the run
+
+    Returns:
+        dict: the "sample_str", and the "sample" and "test" (None if there isn't one) in it
+    """
+    test = re.match(r"Test(\w+?)[-_]([^_-]+)", sample_str)
+    if test is None:
+        return {"sample_str": sample_str, "sample": sample_str, "test": None}
+    return {"sample_str": sample_str, "sample": test.group(2), "test": test.group(1)}
+
+
+def csv_targets(path: str) -> tuple[list[float], str]:
+    """Gets the target forces a run's CSV went through
+
+    Args:
+        path (str): path to the CSV
+
+    Returns:
+        tuple[list[float], str]: the targets in the order they were first used, and their units. Empty and None
+            if the run has no target force column.
+    """
+    with open(path, "r") as read_file:
+        labels = [label.strip() for label in read_file.readline().split(",")]
+    column = next(
+        (i for i, label in enumerate(labels) if label.startswith("Target Force (")),
+        None,
+    )
+    if column is None:
+        return [], None
+    targets = np.loadtxt(
+        path, delimiter=",", skiprows=1, usecols=column, dtype=np.float64, ndmin=1
+    )
+    unique, first = np.unique(targets, return_index=True)
+    return (
+        unique[np.argsort(first)].tolist(),
+        labels[column][len("Target Force (") : -1],
+    )
+
+
+class RunCatalog:
+    """Index of the runs in a data directory. A run's CSV and binary log are catalogued as one run."""
+
+    def __init__(self, data_dir: str = "data", db_path: str = None):
+        """Opens the index, creating it if there isn't one. Call update() to bring it up to date.
+
+        Args:
+            data_dir (str, optional): Directory the runs are saved in. Defaults to "data".
+            db_path (str, optional): Where to keep the index. Defaults to CATALOG_NAME in data_dir.
+        """
+        self.data_dir = Path(data_dir)
+        self.db_path = (
+            Path(db_path) if db_path is not None else self.data_dir / CATALOG_NAME
+        )
+        self.db = sqlite3.connect(self.db_path)
+        self.db.row_factory = sqlite3.Row
+
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with self.db:
+                self.db.executescript("""
+                    DROP TABLE IF EXISTS files;
+                    DROP TABLE IF EXISTS runs;
+                    DROP TABLE IF EXISTS run_targets;
+                    CREATE TABLE files (
+                        path TEXT PRIMARY KEY, run TEXT NOT NULL, mtime_ns INTEGER, size INTEGER
+                    );
+                    CREATE TABLE runs (
+                        run TEXT PRIMARY KEY, timestamp TEXT, script TEXT, sample_str TEXT,
+                        sample TEXT COLLATE NOCASE, test TEXT, volume_mL REAL, units TEXT,
+                        targets TEXT, settings TEXT, csv_path TEXT, log_path TEXT, sidecar_path TEXT
+                    );
+                    CREATE TABLE run_targets (run TEXT NOT NULL, target REAL);
+                    CREATE INDEX files_run ON files (run);
+                    CREATE INDEX runs_sample ON runs (sample, volume_mL);
+                    CREATE INDEX runs_timestamp ON runs (timestamp);
+                    CREATE INDEX run_targets_target ON run_targets (target);
+                    CREATE INDEX run_targets_run ON run_targets (run);
+                    """)
+                self.db.execute("PRAGMA user_version = {:d}".format(SCHEMA_VERSION))
+
+    def close(self):
+        """Closes the index"""
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def update(self) -> tuple[int, int]:
+        """Indexes runs that are new or whose files changed, and forgets runs whose files are gone
+
+        Returns:
+            tuple[int, int]: number of files (re)indexed and number forgotten
+        """
+        found = {}
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(DATA_SUFFIXES):
+                    stat = entry.stat()
+                    found[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        known = {
+            row["path"]: (row["mtime_ns"], row["size"])
+            for row in self.db.execute("SELECT path, mtime_ns, size FROM files")
+        }
+        changed = [path for path, key in found.items() if known.get(path) != key]
+        removed = [path for path in known if path not in found]
+
+        with self.db:
+            self.db.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in removed]
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                [(path, run_of(path), *found[path]) for path in changed],
+            )
+            for run in {run_of(path) for path in changed + removed}:
+                self._index_run(run)
+        return len(changed), len(removed)
+
+    def _index_run(self, run: str):
+        """Re-reads what's known about one run from its files, or forgets it if it has none left"""
+        self.db.execute("DELETE FROM run_targets WHERE run = ?", (run,))
+        paths = [
+            row["path"]
+            for row in self.db.execute("SELECT path FROM files WHERE run = ?", (run,))
+        ]
+        if len(paths) == 0:
+            self.db.execute("DELETE FROM runs WHERE run = ?", (run,))
+            return
+
+        csv_path = next((p for p in paths if p.endswith(".csv")), None)
+        log_path = next((p for p in paths if p.endswith(LOG_EXTENSION)), None)
+        sidecar_path = next((p for p in paths if p.endswith(SIDECAR_EXTENSION)), None)
+        info = parse_run_name(run)
+        targets = [info["target"]] if info["target"] is not None else []
+        units = info["units"]
+        settings = None
+        try:
+            metadata = None
+            if (
+                sidecar_path is not None
+            ):  # has everything the log header has, without opening the log
+                with open(self.data_dir / sidecar_path, "r") as read_file:
+                    metadata = json.load(read_file)["metadata"]
+            elif log_path is not None:
+                metadata = read_log_header(self.data_dir / log_path)["metadata"]
+            if metadata is not None:
+                if metadata.get("sample_str"):
+                    info.update(split_sample_str(metadata["sample_str"]))
+                if metadata.get("sample_volume"):
+                    info["volume_mL"] = metadata["sample_volume"] * 1e6
+                targets = metadata.get("targets", targets)
+                settings = metadata.get("settings")
+                units = metadata.get("load_cell", {}).get("units", units)
+            elif csv_path is not None:
+                csv_target_list, csv_units = csv_targets(self.data_dir / csv_path)
+                if len(csv_target_list) > 0:
+                    targets, units = csv_target_list, csv_units
+        except (OSError, ValueError, KeyError) as e:  # e.g. a run still being written
+            print("Only indexing the name of {:}: {:}".format(run, e))
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run,
+                info["timestamp"],
+                info["script"],
+                info["sample_str"],
+                info["sample"],
+                info["test"],
+                info["volume_mL"],
+                units,
+                json.dumps(targets),
+                json.dumps(settings) if settings is not None else None,
+                csv_path,
+                log_path,
+                sidecar_path,
+            ),
+        )
+        self.db.executemany(
+            "INSERT INTO run_targets VALUES (?, ?)",
+            [(run, float(target)) for target in targets],
+        )
+
+    def find(
+        self,
+        sample: str = None,
+        volume_mL: float = None,
+        target: float = None,
+        script: str = None,
+        since: str = None,
+        until: str = None,
+        tolerance: float = 1e-3,
+    ) -> list[dict]:
+        """Looks up runs. Only the given criteria are checked.
+
+        Args:
+            sample (str, optional): Sample name, ignoring case (ex: CarbopolB). Defaults to None.
+            volume_mL (float, optional): Sample volume (mL). Defaults to None.
+            target (float, optional): A target force the run went through. Defaults to None.
+            script (str, optional): Script name in the file name (ex: PID_squeeze_flow_1). Defaults to None.
+            since (str, optional): Earliest start, in ISO format (ex: 2023-08-01). Defaults to None.
+            until (str, optional): Latest start, in ISO format. Defaults to None.
+            tolerance (float, optional): How far numbers may be from the ones given. Defaults to 1e-3.
+
+        Returns:
+            list[dict]: matching runs, oldest first, with what was indexed about them. "path" is the run's
+                binary log if it has one, otherwise its CSV.
+        """
+        conditions = []
+        values = []
+        if sample is not None:
+            conditions.append("sample = ?")
+            values.append(sample)
+        if volume_mL is not None:
+            conditions.append("volume_mL BETWEEN ? AND ?")
+            values += [volume_mL - tolerance, volume_mL + tolerance]
+        if target is not None:
+            conditions.append(
+                "run IN (SELECT run FROM run_targets WHERE target BETWEEN ? AND ?)"
+            )
+            values += [target - tolerance, target + tolerance]
+        if script is not None:
+            conditions.append("script = ?")
+            values.append(script)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            values.append(since)
+        if until is not None:
+            conditions.append("timestamp <= ?")
+            values.append(until)
+
+        query = "SELECT * FROM runs"
+        if len(conditions) > 0:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp, run"
+
+        runs = []
+        for row in self.db.execute(query, values):
+            run = dict(row)
+            run["targets"] = json.loads(run["targets"])
+            if run["settings"] is not None:
+                run["settings"] = json.loads(run["settings"])
+            for key in ("csv_path", "log_path", "sidecar_path"):
+                if run[key] is not None:
+                    run[key] = str(self.data_dir / run[key])
+            run["path"] = run["log_path"] or run["csv_path"]
+            runs.append(run)
+        return runs
+
+
+def run_of(path: str) -> str:
+    """Gets the run a file belongs to, its name without the extension
+
+    Args:
+        path (str): file name
+
+    Returns:
+        str: run name
+    """
+    return path.rsplit(".", 1)[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Update the run catalog and list matching runs"
+    )
+    parser.add_argument("--data", default="data", help="data directory")
+    parser.add_argument("--sample", help="sample name, ignoring case")
+    parser.add_argument("--volume", type=float, help="sample volume (mL)")
+    parser.add_argument("--target", type=float, help="a target force of the run")
+    parser.add_argument("--script", help="script name in the file name")
+    parser.add_argument("--since", help="earliest start (ISO format)")
+    parser.add_argument("--until", help="latest start (ISO format)")
+    args = parser.parse_args()
+
+    with RunCatalog(args.data) as catalog:
+        indexed, forgotten = catalog.update()
+        if indexed or forgotten:
+            print(
+                "Indexed {:d} files, forgot {:d}".format(indexed, forgotten),
+                file=sys.stderr,
+            )
+        for run in catalog.find(
+            args.sample,
+            args.volume,
+            args.target,
+            args.script,
+            args.since,
+            args.until,
+        ):
+            print(run["path"])
@@ -0,0 +1,259 @@
+"""Memory-mapped, column by column access to run files, so analysis only loads the parts of a run it uses.
+
+A run CSV is converted once into a cache directory next to it (<run>-data.cache), holding each column as one
+contiguous raw array plus a JSON description. After that, opening the run just maps the arrays, and slicing
+by time or step only reads the pages the slice covers. The cache is rebuilt if the CSV changes. Binary run
+logs are already packed records, so they're mapped directly without a cache.
+"""
+
+import itertools
+import json
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+from DataLogger.datalogger import LOG_EXTENSION, map_log
+
+CACHE_EXTENSION = ".cache"
+"""Ending of the cache directory made next to a run CSV"""
+CACHE_VERSION = 1
+"""Bumped whenever the cache layout changes, so old caches get rebuilt"""
+CHUNK_ROWS = 50000
+"""Number of CSV lines parsed at a time while building a cache"""
+TIME_LABEL = "Elapsed Time"
+"""Column that time ranges are looked up in"""
+TARGET_PREFIX = "Target Force ("
+"""Start of the label of the column that steps are split on"""
+
+
+class RunCache:
+    """Columns of one run, memory-mapped. Columns are looked up by their CSV label, without surrounding spaces."""
+
+    def __init__(self, path: str, rebuild: bool = False):
+        """Opens a run, building the CSV's cache first if it doesn't have an up to date one
+
+        Args:
+            path (str): path to the run's CSV or .sfrlog file
+            rebuild (bool, optional): Whether to rebuild the cache even if it looks up to date. Defaults to False.
+        """
+        self.path = str(path)
+        self._columns = {}
+        self._steps = None
+
+        if self.path.endswith(LOG_EXTENSION):
+            rows, header = map_log(self.path)
+            self.length = len(rows)
+            """Number of rows"""
+            for c in header["columns"]:
+                if "value" in c:
+                    value = np.array(c["value"], dtype=c["dtype"])
+                    self._columns[c["label"].strip()] = np.broadcast_to(
+                        value, (self.length,)
+                    )
+                else:
+                    self._columns[c["label"].strip()] = rows[c["name"]]
+            return
+
+        self.cache_dir = Path(self.path.removesuffix(".csv") + CACHE_EXTENSION)
+        """Where the CSV's columns are cached"""
+        description = None if rebuild else self._read_description()
+        if description is None:
+            description = build_cache(self.path, self.cache_dir)
+        self.length = description["rows"]
+        for c in description["columns"]:
+            if self.length == 0:
+                self._columns[c["label"]] = np.zeros(0, dtype=c["dtype"])
+            else:
+                self._columns[c["label"]] = np.memmap(
+                    self.cache_dir / c["file"], c["dtype"], "r", shape=(self.length,)
+                )
+
+    def _read_description(self) -> dict:
+        """Reads the cache's description, or None if there's no cache or it's out of date"""
+        try:
+            with open(self.cache_dir / "columns.json", "r") as read_file:
+                description = json.load(read_file)
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(self.path)
+        if (
+            description.get("version") != CACHE_VERSION
+            or description["source_mtime_ns"] != stat.st_mtime_ns
+            or description["source_size"] != stat.st_size
+        ):
+            return None
+        return description
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def labels(self) -> list[str]:
+        """Labels of the columns"""
+        return list(self._columns)
+
+    def column(self, label: str) -> np.ndarray:
+        """Gets a whole column without reading it yet
+
+        Args:
+            label (str): the column's CSV label
+
+        Returns:
+            np.ndarray: read-only memory-mapped column
+        """
+        return self._columns[label.strip()]
+
+    def rows(self, start: int, stop: int, labels: list[str] = None) -> dict:
+        """Gets some rows of some columns
+
+        Args:
+            start (int): first row
+            stop (int): row after the last
+            labels (list[str], optional): Labels of the columns wanted. Defaults to all of them.
+
+        Returns:
+            dict: the rows of each column by label, as arrays read into memory
+        """
+        if labels is None:
+            labels = self.labels
+        return {label: np.array(self.column(label)[start:stop]) for label in labels}
+
+    def time_range(self, start: float, stop: float) -> tuple[int, int]:
+        """Finds the rows between two elapsed times by binary search, which only reads a few pages of the time column
+
+        Args:
+            start (float): earliest elapsed time (s)
+            stop (float): latest elapsed time (s)
+
+        Returns:
+            tuple[int, int]: first row at or after start, and the row after the last at or before stop
+        """
+        t = self.column(TIME_LABEL)
+        return int(np.searchsorted(t, start, "left")), int(
+            np.searchsorted(t, stop, "right")
+        )
+
+    def time_slice(self, start: float, stop: float, labels: list[str] = None) -> dict:
+        """Gets the rows between two elapsed times
+
+        Args:
+            start (float): earliest elapsed time (s)
+            stop (float): latest elapsed time (s)
+            labels (list[str], optional): Labels of the columns wanted. Defaults to all of them.
+
+        Returns:
+            dict: the rows of each column by label
+        """
+        return self.rows(*self.time_range(start, stop), labels)
+
+    def steps(self) -> np.ndarray:
+        """Splits the run into steps wherever the target force changes. Reads the target column once.
+
+        Returns:
+            np.ndarray: index of the first row of each step, followed by the number of rows
+        """
+        if self._steps is None:
+            label = next(
+                (label for label in self.labels if label.startswith(TARGET_PREFIX)),
+                None,
+            )
+            if label is None:  # no targets, so the whole run is one step
+                self._steps = np.array([0, self.length], dtype=np.intp)
+            else:
+                self._steps = step_boundaries(self.column(label))
+        return self._steps
+
+    def step(self, index: int, labels: list[str] = None) -> dict:
+        """Gets the rows of one step
+
+        Args:
+            index (int): step number, from 0
+            labels (list[str], optional): Labels of the columns wanted. Defaults to all of them.
+
+        Returns:
+            dict: the rows of each column by label
+        """
+        steps = self.steps()
+        return self.rows(steps[index], steps[index + 1], labels)
+
+
+def step_boundaries(target: np.ndarray) -> np.ndarray:
+    """Splits a run into steps wherever the target changes
+
+    Args:
+        target (np.ndarray): target of each sample
+
+    Returns:
+        np.ndarray: index of the first sample of each step, followed by the number of samples
+    """
+    changes = np.flatnonzero(target[1:] != target[:-1]) + 1
+    return np.concatenate(([0], changes, [len(target)])).astype(np.intp)
+
+
+def build_cache(csv_path: str, cache_dir: Path) -> dict:
+    """Converts a run CSV into a cache of raw column arrays, a chunk of lines at a time so the whole CSV is
+    never in memory. Columns of True and False become booleans and the rest 64 bit floats.
+
+    Args:
+        csv_path (str): path to the CSV
+        cache_dir (Path): directory to build the cache in, replaced if it exists
+
+    Returns:
+        dict: description of the cache, as saved in its columns.json
+    """
+    stat = os.stat(csv_path)
+    temp_dir = cache_dir.with_name(cache_dir.name + ".tmp")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    temp_dir.mkdir()
+
+    with open(csv_path, "r") as read_file:
+        labels = [label.strip() for label in read_file.readline().split(",")]
+        files = [
+            open(temp_dir / "{:03d}.bin".format(i), "wb") for i in range(len(labels))
+        ]
+        dtypes = None
+        rows = 0
+        try:
+            while True:
+                lines = list(itertools.islice(read_file, CHUNK_ROWS))
+                if len(lines) == 0:
+                    break
+                text = np.loadtxt(lines, delimiter=",", dtype=str, ndmin=2)
+                if dtypes is None:  # decide each column's type from the first row
+                    dtypes = [
+                        np.bool_ if value.strip() in ("True", "False") else np.float64
+                        for value in text[0]
+                    ]
+                for column, dtype, write_file in zip(text.T, dtypes, files):
+                    if dtype is np.bool_:
+                        values = np.char.strip(column) == "True"
+                    else:
+                        values = column.astype(np.float64)
+                    write_file.write(values.tobytes())
+                rows += len(text)
+        finally:
+            for write_file in files:
+                write_file.close()
+
+    if dtypes is None:
+        dtypes = [np.float64] * len(labels)
+    description = {
+        "version": CACHE_VERSION,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "rows": rows,
+        "columns": [
+            {
+                "label": label,
+                "file": "{:03d}.bin".format(i),
+                "dtype": np.dtype(dtype).str,
+            }
+            for i, (label, dtype) in enumerate(zip(labels, dtypes))
+        ],
+    }
+    with open(temp_dir / "columns.json", "w") as write_file:
+        json.dump(description, write_file, indent=4)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(temp_dir, cache_dir)
+    return description
@@ -0,0 +1,292 @@
+"""Per-step analysis of squeeze flow runs, the Python replacement for sfrStructGenerator.m and data_reading*.m.
+
+Each run is split into steps wherever the target force changes, in one pass over the whole run. Each step
+gets its steady-state statistics and the Scott (1935) and Meeten (2000) yield stresses, all computed for every
+step at once from cumulative sums rather than step by step. A campaign of runs is analysed in parallel, one
+run per process, and the steps of all of them go into one results table:
+
+    python -m DataAnalysis.sfranalysis data/*.csv -o results.csv
+"""
+
+import argparse
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from DataAnalysis.catalog import parse_run_name, run_of
+from DataAnalysis.runcache import RunCache, step_boundaries
+
+FORCE_TO_N = {"g": 0.00980665, "kg": 9.80665, "N": 1.0}
+"""Newtons per unit of force the load cell may be calibrated in"""
+
+RESULT_DTYPE = np.dtype(
+    [
+        ("file", "U200"),
+        ("date", "U10"),
+        ("test", "U10"),
+        ("sample", "U40"),
+        ("volume_mL", "f8"),
+        ("step", "i8"),
+        ("target_N", "f8"),
+        ("start_time", "f8"),
+        ("end_time", "f8"),
+        ("n_samples", "i8"),
+        ("steady_n_samples", "i8"),
+        ("force_mean_N", "f8"),
+        ("force_std_N", "f8"),
+        ("gap_end_m", "f8"),
+        ("gap_mean_m", "f8"),
+        ("gap_std_m", "f8"),
+        ("gap_rate_m_per_s", "f8"),
+        ("aspect_ratio_end", "f8"),
+        ("scott_yield_stress_end_Pa", "f8"),
+        ("scott_yield_stress_mean_Pa", "f8"),
+        ("meeten_yield_stress_end_Pa", "f8"),
+        ("meeten_yield_stress_mean_Pa", "f8"),
+    ]
+)
+"""One row per step of the results table. The steady-state statistics (mean, std and rate) are over the last
+part of each step, see analyze_run()."""
+
+
+def load_run(path: str) -> dict:
+    """Loads the columns of a run that the analysis needs, from a CSV or binary run log, keeping only the
+    samples where the test was active. A CSV is read through its column cache, see DataAnalysis/runcache.py.
+
+    Args:
+        path (str): path to the run's CSV or .sfrlog file
+
+    Raises:
+        ValueError: if the run is missing a column the analysis needs
+
+    Returns:
+        dict: "t" elapsed time (s), "F" force (N), "F_tar" target force (N), "h" gap (m) and "V" viscosity
+            volume (m^3) of each sample, named as in sfrStructGenerator.m
+    """
+    run = RunCache(path)
+    force_label = next(
+        (label for label in run.labels if label.startswith("Current Force (")),
+        "Current Force (g)",
+    )
+    units = force_label[len("Current Force (") : -1]
+    needed = [
+        "Elapsed Time",
+        force_label,
+        "Target Force ({:})".format(units),
+        "Current Gap (m)",
+        "Viscosity Volume (m^3)",
+        "Test Active?",
+    ]
+    missing = [label for label in needed if label not in run.labels]
+    if len(missing) > 0:
+        raise ValueError("{:} is missing columns {:}".format(path, ", ".join(missing)))
+
+    active = np.asarray(run.column("Test Active?"), dtype=bool)
+    t, F, F_tar, h, V = (
+        np.asarray(run.column(label), dtype=np.float64)[active] for label in needed[:-1]
+    )
+    to_N = FORCE_TO_N[units]
+    return {"t": t, "F": to_N * F, "F_tar": to_N * F_tar, "h": h, "V": V}
+
+
+def run_info(path: str) -> dict:
+    """Gets the date, test and sample a run was named with, as the run catalog reads them, see parse_run_name() in
+    DataAnalysis/catalog.py. Parts that aren't in the file name are left empty.
+
+    Args:
+        path (str): path to the run's file
+
+    Returns:
+        dict: the run's "file" name, "date" (YYYY-MM-DD), "test" (ex: 1a) and lower case "sample" name
+    """
+    name = Path(path).name
+    info = parse_run_name(run_of(name))
+    return {
+        "file": name,
+        "date": info["timestamp"][:10] if info["timestamp"] is not None else "",
+        "test": info["test"] or "",
+        "sample": (info["sample"] or "").lower(),
+    }
+
+
+def scott_yield_stress(F: np.ndarray, h: np.ndarray, V: np.ndarray) -> np.ndarray:
+    """Yield stress by the Scott (1935) model, for a sample that sticks to the plates
+
+    Args:
+        F (np.ndarray): force (N)
+        h (np.ndarray): gap (m)
+        V (np.ndarray): sample volume (m^3)
+
+    Returns:
+        np.ndarray: yield stress (Pa)
+    """
+    return 1.5 * math.sqrt(math.pi) * F * h**2.5 / V**1.5
+
+
+def meeten_yield_stress(F: np.ndarray, h: np.ndarray, V: float) -> np.ndarray:
+    """Yield stress by the Meeten (2000) model, for a sample that slips perfectly on the plates
+
+    Args:
+        F (np.ndarray): force (N)
+        h (np.ndarray): gap (m)
+        V (float): sample volume (m^3)
+
+    Returns:
+        np.ndarray: yield stress (Pa)
+    """
+    return F * h / V / math.sqrt(3)
+
+
+def window_sums(x: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """Sums x over many index windows at once
+
+    Args:
+        x (np.ndarray): values
+        starts (np.ndarray): first index of each window
+        stops (np.ndarray): index after the last of each window
+
+    Returns:
+        np.ndarray: sum over each window
+    """
+    cumulative = np.concatenate(([0.0], np.cumsum(x)))
+    return cumulative[stops] - cumulative[starts]
+
+
+def analyze_run(path: str, steady_fraction: float = 0.25) -> np.ndarray:
+    """Splits a run into steps and summarises each one
+
+    Args:
+        path (str): path to the run's CSV or .sfrlog file
+        steady_fraction (float, optional): Fraction at the end of each step, by time, taken as steady state. Defaults to 0.25.
+
+    Returns:
+        np.ndarray: one RESULT_DTYPE row per step
+    """
+    run = load_run(path)
+    t, F, F_tar, h, V = run["t"], run["F"], run["F_tar"], run["h"], run["V"]
+    info = run_info(path)
+    if len(t) == 0:
+        return np.zeros(0, dtype=RESULT_DTYPE)
+
+    R = np.sqrt(V[0] / (h * math.pi))
+    scott = scott_yield_stress(F, h, V)
+    meeten = meeten_yield_stress(F, h, V[0])
+
+    bounds = step_boundaries(F_tar)
+    starts = bounds[:-1]
+    ends = bounds[1:] - 1  # last sample of each step
+    n_steps = len(starts)
+
+    # Steady state is the last steady_fraction of each step, by time
+    window_start_times = t[ends] - steady_fraction * (t[ends] - t[starts])
+    window_starts = np.maximum(
+        np.searchsorted(t, window_start_times, side="left"), starts
+    )
+    window_stops = ends + 1
+    n = window_stops - window_starts
+    step_of_sample = np.repeat(np.arange(n_steps), np.diff(bounds))
+
+    def mean_and_std(x):
+        mean = window_sums(x, window_starts, window_stops) / n
+        deviation = x - mean[step_of_sample]
+        variance = window_sums(deviation**2, window_starts, window_stops) / n
+        return mean, np.sqrt(variance), deviation
+
+    force_mean, force_std, _ = mean_and_std(F)
+    gap_mean, gap_std, gap_deviation = mean_and_std(h)
+    _, _, time_deviation = mean_and_std(t)
+    time_spread = window_sums(time_deviation**2, window_starts, window_stops)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gap_rate = np.where(
+            time_spread > 0,
+            window_sums(time_deviation * gap_deviation, window_starts, window_stops)
+            / time_spread,
+            np.nan,
+        )
+
+    results = np.zeros(n_steps, dtype=RESULT_DTYPE)
+    for key, value in info.items():
+        results[key] = value
+    results["volume_mL"] = V[0] * 1e6
+    results["step"] = np.arange(1, n_steps + 1)
+    results["target_N"] = F_tar[starts]
+    results["start_time"] = t[starts]
+    results["end_time"] = t[ends]
+    results["n_samples"] = ends - starts + 1
+    results["steady_n_samples"] = n
+    results["force_mean_N"] = force_mean
+    results["force_std_N"] = force_std
+    results["gap_end_m"] = h[ends]
+    results["gap_mean_m"] = gap_mean
+    results["gap_std_m"] = gap_std
+    results["gap_rate_m_per_s"] = gap_rate
+    results["aspect_ratio_end"] = h[ends] / R[ends]
+    results["scott_yield_stress_end_Pa"] = scott[ends]
+    results["scott_yield_stress_mean_Pa"] = (
+        window_sums(scott, window_starts, window_stops) / n
+    )
+    results["meeten_yield_stress_end_Pa"] = meeten[ends]
+    results["meeten_yield_stress_mean_Pa"] = (
+        window_sums(meeten, window_starts, window_stops) / n
+    )
+    return results
+
+
+def analyze_campaign(
+    paths: list[str], steady_fraction: float = 0.25, processes: int = None
+) -> np.ndarray:
+    """Analyses many runs in parallel, one run per process
+
+    Args:
+        paths (list[str]): paths to the runs' CSV or .sfrlog files
+        steady_fraction (float, optional): Fraction at the end of each step taken as steady state. Defaults to 0.25.
+        processes (int, optional): Number of worker processes. Defaults to one per core.
+
+    Returns:
+        np.ndarray: RESULT_DTYPE rows for every step of every run, in the order the runs were given
+    """
+    if len(paths) == 0:
+        return np.zeros(0, dtype=RESULT_DTYPE)
+    with ProcessPoolExecutor(processes) as executor:
+        results = list(executor.map(analyze_run, paths, [steady_fraction] * len(paths)))
+    return np.concatenate(results)
+
+
+def write_results_csv(results: np.ndarray, csv_path: str):
+    """Writes a results table to a CSV, one step per line
+
+    Args:
+        results (np.ndarray): RESULT_DTYPE rows
+        csv_path (str): where to write it
+    """
+    names = results.dtype.names
+    columns = [map(str, results[name].tolist()) for name in names]
+    with open(csv_path, "w") as write_file:
+        write_file.write(",".join(names) + "\n")
+        write_file.writelines(",".join(line) + "\n" for line in zip(*columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Summarise each step of squeeze flow runs"
+    )
+    parser.add_argument("paths", nargs="+", help="run CSV or .sfrlog files")
+    parser.add_argument(
+        "-o", "--output", default="results.csv", help="results CSV to write"
+    )
+    parser.add_argument(
+        "--steady-fraction",
+        type=float,
+        default=0.25,
+        help="fraction at the end of each step taken as steady state",
+    )
+    parser.add_argument("--processes", type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    results = analyze_campaign(args.paths, args.steady_fraction, args.processes)
+    write_results_csv(results, args.output)
+    print(
+        "Wrote {:d} steps from {:d} runs to {:}".format(
+            len(results), len(args.paths), args.output
+        )
+    )
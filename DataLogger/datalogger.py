@@ -0,0 +1,290 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+import numpy as np
+
+MAGIC = b"SFRLOG1\n"
+"""First bytes of every binary run log"""
+LOG_EXTENSION = ".sfrlog"
+"""File extension for binary run logs"""
+SIDECAR_EXTENSION = ".json"
+"""File extension for the metadata sidecar written next to each binary run log"""
+
+
+class DataLogger:
+    """Records rows of run data to a binary log, buffering them in memory and writing whole blocks at once.
+
+    The file starts with MAGIC, then the length of a JSON header as a little-endian uint32, then the header,
+    which holds each column's name, CSV label and dtype, plus any metadata about the run. After that come the
+    rows as packed fixed-size records, so a log cut short by a crash is still readable up to the last block.
+    Columns that can't change during a run are constants: their value is kept in the header instead of every row.
+    Use log_to_csv() to turn a log into the CSV layout sfrStructGenerator.m reads, constants and all.
+
+    The metadata, constants, software version and host also go into a JSON sidecar next to the log, so tools can
+    find runs by their parameters without opening logs. It's rewritten with anything added by update_metadata()
+    and with the row count on close().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: list[tuple],
+        metadata: dict = None,
+        block_rows: int = 500,
+    ):
+        """Opens a new binary log, writes its header and the metadata sidecar
+
+        Args:
+            path (str): where to write the log
+            columns (list[tuple]): (name, CSV label, numpy dtype) of each column, e.g. ("force", "Current Force (g)", "f8"),
+                or (name, CSV label, numpy dtype, value) for a constant, which log() doesn't take
+            metadata (dict, optional): anything else worth keeping about the run, must be JSON serializable. Defaults to None.
+            block_rows (int, optional): Number of rows buffered before they're written to disk. Defaults to 500.
+        """
+        self.path = path
+        self.sidecar_path = sidecar_path(path)
+        self.dtype = np.dtype(
+            [(column[0], column[2]) for column in columns if len(column) < 4]
+        )
+        self.labels = [column[1] for column in columns]
+        self.constants = {
+            column[0]: np.array(column[3], dtype=column[2]).item()
+            for column in columns
+            if len(column) >= 4
+        }
+        """Value of each constant column"""
+        self.metadata = dict(metadata) if metadata is not None else {}
+        """Metadata for the sidecar, see update_metadata()"""
+        self.rows_written = 0
+        """Number of rows written to disk so far"""
+
+        self._block = np.zeros(block_rows, dtype=self.dtype)
+        self._n = 0
+        self._sidecar = {
+            "log": os.path.basename(path),
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "finished": None,
+            "rows": 0,
+            "software_version": software_version(),
+            "host": {
+                "name": platform.node(),
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+            },
+            "constants": self.constants,
+        }
+
+        header_columns = []
+        for column in columns:
+            header_column = {
+                "name": column[0],
+                "label": column[1],
+                "dtype": np.dtype(column[2]).str,
+            }
+            if len(column) >= 4:
+                header_column["value"] = self.constants[column[0]]
+            header_columns.append(header_column)
+        header = json.dumps(
+            {"columns": header_columns, "metadata": self.metadata}
+        ).encode()
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._file.write(np.uint32(len(header)).astype("<u4").tobytes())
+        self._file.write(header)
+        self._file.flush()
+        self._write_sidecar()
+
+    def update_metadata(self, **values):
+        """Adds to the run's metadata and rewrites the sidecar. The log's header keeps the metadata it started with.
+
+        Args:
+            values: metadata to add or replace, must be JSON serializable
+        """
+        self.metadata.update(values)
+        self._write_sidecar()
+
+    def _write_sidecar(self):
+        """Writes the sidecar, replacing the old one in one step so readers never see half of it"""
+        self._sidecar["rows"] = self.rows_written + self._n
+        temp_path = self.sidecar_path + ".tmp"
+        with open(temp_path, "w") as write_file:
+            json.dump(dict(self._sidecar, metadata=self.metadata), write_file, indent=4)
+        os.replace(temp_path, self.sidecar_path)
+
+    def log(self, *row):
+        """Adds a row, writing out the block if it's full
+
+        Args:
+            row: one value per column other than the constants, in column order
+        """
+        self._block[self._n] = row
+        self._n = self._n + 1
+        if self._n >= len(self._block):
+            self.flush()
+
+    def flush(self):
+        """Writes any buffered rows to disk"""
+        if self._n <= 0:
+            return
+        self._file.write(self._block[: self._n].tobytes())
+        self._file.flush()
+        self.rows_written = self.rows_written + self._n
+        self._n = 0
+
+    def close(self):
+        """Writes any buffered rows to disk and closes the log"""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        self._sidecar["finished"] = datetime.now().isoformat(timespec="seconds")
+        self._write_sidecar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_log(path: str) -> tuple[np.ndarray, dict]:
+    """Reads a binary run log
+
+    Args:
+        path (str): path to the log
+
+    Raises:
+        ValueError: if the file isn't a binary run log
+
+    Returns:
+        tuple[np.ndarray, dict]: structured array of the rows, constant columns included, and the header with
+            the columns and metadata
+    """
+    with open(path, "rb") as read_file:
+        header = _read_header(read_file, path)
+        data = read_file.read()
+
+    columns = header["columns"]
+    dtype = np.dtype([(c["name"], c["dtype"]) for c in columns if "value" not in c])
+    n_rows = len(data) // dtype.itemsize  # ignore a partly written last row
+    rows = np.frombuffer(data, dtype=dtype, count=n_rows)
+    if len(dtype) == len(columns):
+        return rows, header
+
+    full = np.empty(n_rows, dtype=[(c["name"], c["dtype"]) for c in columns])
+    for c in columns:
+        full[c["name"]] = c["value"] if "value" in c else rows[c["name"]]
+    return full, header
+
+
+def map_log(path: str) -> tuple[np.ndarray, dict]:
+    """Memory-maps the rows of a binary run log rather than reading them, so only what's used is loaded
+
+    Args:
+        path (str): path to the log
+
+    Raises:
+        ValueError: if the file isn't a binary run log
+
+    Returns:
+        tuple[np.ndarray, dict]: read-only structured array of the rows, without the constant columns, and the
+            header with the columns (constants' values included) and metadata
+    """
+    with open(path, "rb") as read_file:
+        header = _read_header(read_file, path)
+        offset = read_file.tell()
+        size = read_file.seek(0, 2)
+
+    columns = header["columns"]
+    dtype = np.dtype([(c["name"], c["dtype"]) for c in columns if "value" not in c])
+    n_rows = (size - offset) // dtype.itemsize  # ignore a partly written last row
+    if n_rows <= 0:
+        return np.zeros(0, dtype=dtype), header
+    return np.memmap(path, dtype, "r", offset, (n_rows,)), header
+
+
+def read_log_header(path: str) -> dict:
+    """Reads just the header of a binary run log, without its rows
+
+    Args:
+        path (str): path to the log
+
+    Raises:
+        ValueError: if the file isn't a binary run log
+
+    Returns:
+        dict: the header with the columns and metadata
+    """
+    with open(path, "rb") as read_file:
+        return _read_header(read_file, path)
+
+
+def _read_header(read_file, path: str) -> dict:
+    """Reads the header from the start of an open binary run log, leaving the file at the first row"""
+    if read_file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("{:} is not a binary run log".format(path))
+    header_len = int(np.frombuffer(read_file.read(4), dtype="<u4")[0])
+    return json.loads(read_file.read(header_len))
+
+
+def sidecar_path(log_path: str) -> str:
+    """Gets where the metadata sidecar of a binary run log goes
+
+    Args:
+        log_path (str): path to the log
+
+    Returns:
+        str: path to the sidecar
+    """
+    return log_path.removesuffix(LOG_EXTENSION) + SIDECAR_EXTENSION
+
+
+def software_version() -> str:
+    """Gets the git commit the code is running from, marked -dirty if there are uncommitted changes
+
+    Returns:
+        str: the version, or None if it isn't a git checkout
+    """
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=5,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def log_to_csv(log_path: str, csv_path: str = None) -> str:
+    """Converts a binary run log to the CSV layout the acquisition scripts used to write directly
+
+    Args:
+        log_path (str): path to the log
+        csv_path (str, optional): where to write the CSV. Defaults to the log path ending in .csv.
+
+    Returns:
+        str: path of the CSV
+    """
+    if csv_path is None:
+        csv_path = log_path.removesuffix(LOG_EXTENSION) + ".csv"
+
+    rows, header = read_log(log_path)
+    labels = [col["label"] for col in header["columns"]]
+    # Python's str() of each value, exactly as ",".join(map(str, ...)) gave when writing rows one at a time
+    columns = [map(str, rows[col["name"]].tolist()) for col in header["columns"]]
+
+    with open(csv_path, "w") as write_file:
+        write_file.write(",".join(labels) + "\n")
+        write_file.writelines(",".join(line) + "\n" for line in zip(*columns))
+    return csv_path
+
+
+if __name__ == "__main__":
+    for log_path in sys.argv[1:]:
+        print("Wrote {:}".format(log_to_csv(log_path)))
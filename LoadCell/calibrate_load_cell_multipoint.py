@@ -0,0 +1,4 @@
+from openscale import OpenScale
+
+scale = OpenScale()
+scale.calibrate_multipoint(["5g", "20g", "35g", "50g", "70g"], N=1500)
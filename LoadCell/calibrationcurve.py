@@ -0,0 +1,141 @@
+import numpy as np
+
+
+class CalibrationCurve:
+    """Corrects linearly calibrated measurements for load cell nonlinearity with a lookup table.
+
+    A polynomial is fitted to the measurements the linear calibration gives for several known weights, then
+    evaluated once on an evenly spaced grid. Correcting a measurement is then just finding its grid cell
+    by arithmetic and interpolating between the cell's ends, the same cost for any polynomial degree and for
+    single values or whole NumPy arrays. Beyond the grid, the end cells are extended in a straight line
+    rather than trusting the polynomial.
+    """
+
+    def __init__(
+        self,
+        points: list[list[float]],
+        degree: int = 2,
+        table_size: int = 1024,
+        margin: float = 0.1,
+    ):
+        """Fits a curve and compiles it into a lookup table
+
+        Args:
+            points (list[list[float]]): [linearly calibrated measurement, true measurement] of each known weight,
+                including [0, 0] for the tare
+            degree (int, optional): Degree of the polynomial, at most one less than the number of points. Defaults to 2.
+            table_size (int, optional): Number of grid points in the lookup table. Defaults to 1024.
+            margin (float, optional): How far past the points to extend the grid, as a fraction of their range. Defaults to 0.1.
+
+        Raises:
+            ValueError: if there are too few points to fit the polynomial
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) <= degree:
+            raise ValueError(
+                "Need at least {:d} calibration points for a degree {:d} curve, got {:d}".format(
+                    degree + 1, degree, len(points)
+                )
+            )
+        self.points = points
+        self.degree = degree
+        self.margin = margin
+        self.coefficients = np.polyfit(points[:, 0], points[:, 1], degree)
+        """Polynomial coefficients, highest power first"""
+
+        lo = np.min(points[:, 0])
+        hi = np.max(points[:, 0])
+        pad = margin * (hi - lo)
+        self.grid_start = lo - pad
+        self.grid_step = (hi - lo + 2 * pad) / (table_size - 1)
+        self.table = np.polyval(
+            self.coefficients,
+            self.grid_start + self.grid_step * np.arange(table_size),
+        )
+        """Corrected measurement at each grid point"""
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        """Builds a curve saved with to_dict()
+
+        Args:
+            values (dict): the saved curve
+
+        Returns:
+            CalibrationCurve: the curve
+        """
+        return cls(
+            values["points"],
+            values["degree"],
+            values.get("table_size", 1024),
+            values.get("margin", 0.1),
+        )
+
+    def to_dict(self) -> dict:
+        """Gets what the curve was fitted from, e.g. for saving as JSON. The table is rebuilt when it's loaded.
+
+        Returns:
+            dict: the curve's points and settings
+        """
+        return {
+            "points": self.points.tolist(),
+            "degree": self.degree,
+            "table_size": len(self.table),
+            "margin": self.margin,
+        }
+
+    def correct(self, measurement):
+        """Corrects linearly calibrated measurements
+
+        Args:
+            measurement (float | np.ndarray): linearly calibrated measurements
+
+        Returns:
+            float | np.ndarray: corrected measurements
+        """
+        position = (np.asarray(measurement, dtype=np.float64) - self.grid_start) / (
+            self.grid_step
+        )
+        cell = np.clip(np.floor(position), 0, len(self.table) - 2).astype(np.intp)
+        fraction = position - cell
+        corrected = self.table[cell] + fraction * (
+            self.table[cell + 1] - self.table[cell]
+        )
+        return corrected if np.ndim(corrected) > 0 else float(corrected)
+
+    def residuals(self) -> np.ndarray:
+        """Gets how far the corrected points are from the true measurements
+
+        Returns:
+            np.ndarray: corrected minus true measurement of each point
+        """
+        return self.correct(self.points[:, 0]) - self.points[:, 1]
+
+    def summary(self) -> str:
+        """Describes the fit in a line
+
+        Returns:
+            str: the description
+        """
+        linear_error = np.max(np.abs(self.points[:, 0] - self.points[:, 1]))
+        return "Degree {:d} curve through {:d} points: largest error {:.3f} linear, {:.3f} corrected".format(
+            self.degree,
+            len(self.points),
+            linear_error,
+            np.max(np.abs(self.residuals())),
+        )
+
+
+def fit_linear_calibration(weights: np.ndarray, offsets: np.ndarray) -> float:
+    """Fits the best single calibration factor to several known weights by least squares through zero
+
+    Args:
+        weights (np.ndarray): calibration weights, in units
+        offsets (np.ndarray): mean raw reading minus the zero reading for each weight
+
+    Returns:
+        float: calibration, raw reading per unit, negated so measurements of weights come out negative like calibrate()'s
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.float64)
+    return float(-np.dot(offsets, weights) / np.dot(weights, weights))
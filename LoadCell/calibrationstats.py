@@ -0,0 +1,476 @@
+import math
+import numpy as np
+
+MAD_TO_SIGMA = 1.4826
+"""Scales a median absolute deviation to the standard deviation of normally distributed noise"""
+
+
+class ReadingStatistics:
+    """Summary of a batch of raw load cell readings"""
+
+    FIELDS = (
+        "n",
+        "mean",
+        "std",
+        "min",
+        "max",
+        "trim",
+        "trimmed_n",
+        "trimmed_mean",
+        "trimmed_std",
+        "median",
+        "robust_std",
+        "n_over_1std",
+        "n_under_1std",
+        "duration",
+        "drift_slope",
+        "temperature",
+    )
+    """Names of the statistics, in report order"""
+
+    def __init__(self, **values):
+        """Creates a summary. Statistics not given are None, e.g. order statistics from streamed readings.
+
+        Args:
+            values: value of each statistic in FIELDS
+        """
+        for name in ReadingStatistics.FIELDS:
+            setattr(self, name, values.get(name))
+
+    @property
+    def center(self) -> float:
+        """Best estimate of the true reading: the trimmed mean if there is one, otherwise the mean"""
+        return self.trimmed_mean if self.trimmed_mean is not None else self.mean
+
+    def to_dict(self) -> dict:
+        """Gets the statistics as plain numbers, e.g. for saving as JSON
+
+        Returns:
+            dict: value of each statistic
+        """
+        values = {}
+        for name in ReadingStatistics.FIELDS:
+            value = getattr(self, name)
+            values[name] = (
+                value if value is None or isinstance(value, int) else float(value)
+            )
+        return values
+
+    def summary(self) -> str:
+        """Describes the statistics in a few lines
+
+        Returns:
+            str: the description
+        """
+        lines = [
+            "{:d} readings, mean = {:.2f}, std = {:.2f}, min = {:}, max = {:}".format(
+                self.n, self.mean, self.std, self.min, self.max
+            )
+        ]
+        if self.trimmed_mean is not None:
+            lines.append(
+                "Middle {:.0%}: mean = {:.2f}, std = {:.2f}, median = {:.2f}, robust std = {:.2f}".format(
+                    1 - 2 * self.trim,
+                    self.trimmed_mean,
+                    self.trimmed_std,
+                    self.median,
+                    self.robust_std,
+                )
+            )
+            lines.append(
+                "Number over 1std: {:}, Number under 1std: {:}, Number within 1std: {:}".format(
+                    self.n_over_1std,
+                    self.n_under_1std,
+                    self.trimmed_n - self.n_over_1std - self.n_under_1std,
+                )
+            )
+        if self.drift_slope is not None:
+            lines.append(
+                "Drift over {:.1f}s: {:.3f} per second".format(
+                    self.duration, self.drift_slope
+                )
+            )
+        if self.temperature is not None:
+            lines.append("Mean temperature: {:.2f}".format(self.temperature))
+        return "\n".join(lines)
+
+
+def reading_statistics(
+    readings: np.ndarray,
+    times: np.ndarray = None,
+    trim: float = 0.01,
+    temperatures: np.ndarray = None,
+) -> ReadingStatistics:
+    """Summarises a batch of readings, throwing out the top and bottom trim fraction as noise for the trimmed statistics
+
+    Args:
+        readings (np.ndarray): raw readings
+        times (np.ndarray, optional): time (s) of each reading, for the drift. Defaults to no drift estimate.
+        trim (float, optional): Fraction of readings to throw out at each end. Defaults to 0.01.
+        temperatures (np.ndarray, optional): temperature reported with each reading, NaN where there was none. Defaults to None.
+
+    Returns:
+        ReadingStatistics: the summary
+    """
+    readings = np.asarray(readings, dtype=np.float64)
+    n = len(readings)
+    lo = math.floor(trim * n)
+    hi = max(lo + 1, math.floor((1 - trim) * n))
+    # Only the cut points need to be in order, not the whole array
+    kept = np.partition(readings, [lo, hi - 1])[lo:hi]
+    trimmed_mean = np.mean(kept)
+    trimmed_std = np.std(kept)
+    median = np.median(kept)
+
+    duration = drift_slope = None
+    if times is not None and n >= 2:
+        times = np.asarray(times, dtype=np.float64)
+        duration = times[-1] - times[0]
+        if duration > 0:
+            t = times - np.mean(times)
+            drift_slope = np.dot(t, readings - np.mean(readings)) / np.dot(t, t)
+
+    return ReadingStatistics(
+        n=n,
+        mean=np.mean(readings),
+        std=np.std(readings),
+        min=np.min(readings),
+        max=np.max(readings),
+        trim=trim,
+        trimmed_n=len(kept),
+        trimmed_mean=trimmed_mean,
+        trimmed_std=trimmed_std,
+        median=median,
+        robust_std=MAD_TO_SIGMA * np.median(np.abs(kept - median)),
+        n_over_1std=int(np.count_nonzero(kept >= trimmed_mean + trimmed_std)),
+        n_under_1std=int(np.count_nonzero(kept <= trimmed_mean - trimmed_std)),
+        duration=duration,
+        drift_slope=drift_slope,
+        temperature=mean_temperature(temperatures),
+    )
+
+
+def mean_temperature(temperatures: np.ndarray) -> float:
+    """Mean of the temperatures that were reported
+
+    Args:
+        temperatures (np.ndarray): temperatures, NaN where there was none
+
+    Returns:
+        float: the mean, or None if there were none
+    """
+    if temperatures is None:
+        return None
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    reported = temperatures[np.isfinite(temperatures)]
+    return float(np.mean(reported)) if len(reported) > 0 else None
+
+
+class StreamingStatistics:
+    """Running mean, standard deviation, range and drift of readings, without keeping the readings.
+
+    Moments are combined batch by batch with Chan et al.'s parallel update, so adding a batch costs NumPy
+    time rather than Python time per reading. Order statistics (trimmed mean, median) need every reading,
+    so they're left out.
+    """
+
+    def __init__(self):
+        self.n = 0
+        """Number of readings added"""
+        self._mean = 0.0
+        self._m2 = 0.0  # summed squared deviation of the readings from their mean
+        self._t_mean = 0.0
+        self._t_m2 = 0.0  # same for the times
+        self._co_moment = 0.0  # summed product of time and reading deviations
+        self._min = math.inf
+        self._max = -math.inf
+        self._t_first = None
+        self._t_last = None
+        self._temperature_sum = 0.0
+        self._temperature_count = 0
+
+    def add(
+        self, times: np.ndarray, readings: np.ndarray, temperatures: np.ndarray = None
+    ):
+        """Adds a batch of readings
+
+        Args:
+            times (np.ndarray): time (s) of each reading
+            readings (np.ndarray): raw readings
+            temperatures (np.ndarray, optional): temperature reported with each reading, NaN where there was none. Defaults to None.
+        """
+        readings = np.asarray(readings, dtype=np.float64)
+        times = np.asarray(times, dtype=np.float64)
+        n_b = len(readings)
+        if n_b <= 0:
+            return
+        mean_b = np.mean(readings)
+        t_mean_b = np.mean(times)
+        dx = readings - mean_b
+        dt = times - t_mean_b
+
+        n = self.n + n_b
+        delta = mean_b - self._mean
+        t_delta = t_mean_b - self._t_mean
+        weight = self.n * n_b / n
+        self._m2 += np.dot(dx, dx) + delta**2 * weight
+        self._t_m2 += np.dot(dt, dt) + t_delta**2 * weight
+        self._co_moment += np.dot(dt, dx) + delta * t_delta * weight
+        self._mean += delta * n_b / n
+        self._t_mean += t_delta * n_b / n
+        self.n = n
+
+        self._min = min(self._min, np.min(readings))
+        self._max = max(self._max, np.max(readings))
+        if self._t_first is None:
+            self._t_first = times[0]
+        self._t_last = times[-1]
+        if temperatures is not None:
+            temperatures = np.asarray(temperatures, dtype=np.float64)
+            reported = temperatures[np.isfinite(temperatures)]
+            self._temperature_sum += np.sum(reported)
+            self._temperature_count += len(reported)
+
+    def statistics(self) -> ReadingStatistics:
+        """Summarises the readings added so far
+
+        Returns:
+            ReadingStatistics: the summary, without order statistics
+        """
+        if self.n <= 0:
+            return ReadingStatistics(n=0)
+        return ReadingStatistics(
+            n=self.n,
+            mean=self._mean,
+            std=math.sqrt(self._m2 / self.n),
+            min=self._min,
+            max=self._max,
+            duration=self._t_last - self._t_first,
+            drift_slope=self._co_moment / self._t_m2 if self._t_m2 > 0 else None,
+            temperature=(
+                self._temperature_sum / self._temperature_count
+                if self._temperature_count > 0
+                else None
+            ),
+        )
+
+
+class CreepModel:
+    """Load cell creep fitted as an exponential decay, reading(t) = offset + amplitude * exp(-(t - start) / time_constant)"""
+
+    def __init__(
+        self,
+        offset: float,
+        amplitude: float,
+        time_constant: float,
+        start: float,
+        rms: float,
+    ):
+        """Creates a model
+
+        Args:
+            offset (float): reading the creep settles to
+            amplitude (float): how far the reading was from settled at start
+            time_constant (float): time (s) for the remaining creep to fall by a factor of e
+            start (float): time (s) the fit starts from
+            rms (float): root mean square error of the fit
+        """
+        self.offset = offset
+        self.amplitude = amplitude
+        self.time_constant = time_constant
+        self.start = start
+        self.rms = rms
+
+    def found(self) -> bool:
+        """Whether the fit found creep, rather than the decay not explaining the readings better than a constant
+
+        Returns:
+            bool: True if there's a creep term
+        """
+        return self.amplitude != 0
+
+    def remaining(self, t: float) -> float:
+        """How far the reading still has to creep from a given time on
+
+        Args:
+            t (float): time (s)
+
+        Returns:
+            float: predicted remaining creep, in raw reading
+        """
+        return abs(self.amplitude) * math.exp(-(t - self.start) / self.time_constant)
+
+    def to_dict(self) -> dict:
+        """Gets the model as plain numbers, e.g. for saving as JSON
+
+        Returns:
+            dict: the model's parameters
+        """
+        return {
+            "offset": float(self.offset),
+            "amplitude": float(self.amplitude),
+            "time_constant": float(self.time_constant),
+            "rms": float(self.rms),
+        }
+
+    def summary(self) -> str:
+        """Describes the model in a line
+
+        Returns:
+            str: the description
+        """
+        if not self.found():
+            return (
+                "No creep found, readings steady at {:.2f} (rms error {:.2f})".format(
+                    self.offset, self.rms
+                )
+            )
+        return "Creep settles to {:.2f} with time constant {:.1f}s (amplitude {:.2f}, rms error {:.2f})".format(
+            self.offset, self.time_constant, self.amplitude, self.rms
+        )
+
+
+def fit_creep(
+    times: np.ndarray,
+    readings: np.ndarray,
+    time_constants: np.ndarray = None,
+    min_f_ratio: float = 10,
+) -> CreepModel:
+    """Fits an exponential decay to readings by least squares. For each candidate time constant the offset and
+    amplitude are linear, so they are solved in closed form for every candidate at once and the best fit kept.
+    If the decay doesn't explain the readings clearly better than a constant does, there's no creep to speak
+    of and the amplitude is 0.
+
+    Args:
+        times (np.ndarray): time (s) of each reading, or of each mean of a chunk of readings
+        readings (np.ndarray): the readings
+        time_constants (np.ndarray, optional): Candidate time constants (s). Defaults to 200 from 0.5s to 2000s, log spaced.
+        min_f_ratio (float, optional): How much better than a constant the decay has to fit, as an F statistic. Defaults to 10.
+
+    Returns:
+        CreepModel: the best fit
+    """
+    if time_constants is None:
+        time_constants = np.geomspace(0.5, 2000, 200)
+    times = np.asarray(times, dtype=np.float64)
+    readings = np.asarray(readings, dtype=np.float64)
+    n = len(readings)
+    start = times[0]
+
+    decay = np.exp(
+        -np.outer(1 / time_constants, times - start)
+    )  # one row per candidate
+    decay_dev = decay - decay.mean(axis=1, keepdims=True)
+    reading_dev = readings - readings.mean()
+    decay_var = np.einsum("ij,ij->i", decay_dev, decay_dev)
+    covariance = decay_dev @ reading_dev
+    amplitudes = np.divide(
+        covariance, decay_var, out=np.zeros_like(covariance), where=decay_var > 0
+    )
+    sq_error_constant = np.dot(reading_dev, reading_dev)
+    sq_errors = sq_error_constant - amplitudes * covariance
+
+    best = int(np.argmin(sq_errors))
+    sq_error = max(sq_errors[best], 0)
+    if n <= 3 or (sq_error_constant - sq_error) / 2 <= min_f_ratio * sq_error / (n - 3):
+        return CreepModel(
+            readings.mean(),
+            0,
+            time_constants[best],
+            start,
+            math.sqrt(sq_error_constant / n),
+        )
+
+    amplitude = amplitudes[best]
+    return CreepModel(
+        readings.mean() - amplitude * decay[best].mean(),
+        amplitude,
+        time_constants[best],
+        start,
+        math.sqrt(sq_error / n),
+    )
+
+
+class CalibrationReport:
+    """Outcome of a tare or calibration, with the statistics it was based on"""
+
+    def __init__(
+        self,
+        kind: str,
+        value: float,
+        readings: ReadingStatistics,
+        units: str = None,
+        weight: float = None,
+        creep: ReadingStatistics = None,
+        creep_model: CreepModel = None,
+    ):
+        """Creates a report
+
+        Args:
+            kind (str): "tare" or "calibration"
+            value (float): the tare value, or the calibration in raw reading per unit
+            readings (ReadingStatistics): statistics of the readings the value came from
+            units (str, optional): units of the calibration. Defaults to None.
+            weight (float, optional): calibration weight, in units. Defaults to None.
+            creep (ReadingStatistics, optional): statistics of the readings while waiting out load cell creep. Defaults to None.
+            creep_model (CreepModel, optional): creep fitted to those readings, if the wait was adaptive. Defaults to None.
+        """
+        self.kind = kind
+        self.value = value
+        self.readings = readings
+        self.units = units
+        self.weight = weight
+        self.creep = creep
+        self.creep_model = creep_model
+
+    def to_dict(self) -> dict:
+        """Gets the report as plain values, e.g. for saving as JSON
+
+        Returns:
+            dict: the report
+        """
+        return {
+            "kind": self.kind,
+            "value": float(self.value),
+            "units": self.units,
+            "weight": self.weight,
+            "readings": self.readings.to_dict(),
+            "creep": self.creep.to_dict() if self.creep is not None else None,
+            "creep_model": (
+                self.creep_model.to_dict() if self.creep_model is not None else None
+            ),
+        }
+
+    def summary(self) -> str:
+        """Describes the report in a few lines
+
+        Returns:
+            str: the description
+        """
+        lines = []
+        if self.creep is not None:
+            lines += ["While waiting for creep:", self.creep.summary()]
+        if self.creep_model is not None:
+            lines.append(self.creep_model.summary())
+        lines.append(self.readings.summary())
+        lines.append("The {:} value is {:.2f}".format(self.kind, self.value))
+        return "\n".join(lines)
+
+
+def plot_deviations(readings: np.ndarray, stats: ReadingStatistics):
+    """Shows a histogram of the kept readings' deviation from their center. Blocks until the window is closed.
+
+    Args:
+        readings (np.ndarray): raw readings
+        stats (ReadingStatistics): their statistics
+    """
+    import matplotlib.pyplot as plt
+
+    readings = np.asarray(readings, dtype=np.float64)
+    lo = math.floor(stats.trim * stats.n)
+    kept = np.sort(readings)[lo : lo + stats.trimmed_n]
+    plt.hist(kept - stats.center, 50)
+    plt.xlabel("Deviation from the mean")
+    plt.ylabel("Number of samples")
+    plt.title("Middle {:.0%} of readings".format(1 - 2 * stats.trim))
+    plt.show()
@@ -0,0 +1,239 @@
+import bisect
+import collections
+import math
+
+MAD_TO_SIGMA = 1.4826
+"""Scales a median absolute deviation to the standard deviation of normally distributed noise"""
+
+
+class HampelFilter:
+    """Streaming Hampel filter: rejects a sample if it is further from the median of the last few samples than a
+    few robust standard deviations, estimated from their median absolute deviation (MAD).
+
+    The window is kept sorted with bisect, so the median is a lookup and the MAD is a binary search over the
+    deviations on either side of the median. Per-sample cost stays constant for a given window, with no lists
+    built per sample. Every sample enters the window whether or not it is rejected, so a real step in force is
+    only rejected until it makes up half the window.
+    """
+
+    def __init__(
+        self,
+        window: int = 7,
+        n_sigmas: float = 3,
+        min_deviation: float = 0,
+        replace: bool = False,
+    ):
+        """Creates a filter
+
+        Args:
+            window (int, optional): Number of most recent samples to compare against. Defaults to 7.
+            n_sigmas (float, optional): How many robust standard deviations from the median a sample may be. Defaults to 3.
+            min_deviation (float, optional): Smallest allowed distance from the median, for when the window is so
+                quiet that the MAD is about zero. Same units as the samples. Defaults to 0.
+            replace (bool, optional): Whether to pass on the median in place of a rejected sample rather than dropping it. Defaults to False.
+        """
+        self.window = window
+        self.n_sigmas = n_sigmas
+        self.min_deviation = min_deviation
+        self.replace = replace
+        self.count = 0
+        """Number of samples seen"""
+        self.rejected = 0
+        """Number of samples rejected as outliers"""
+        self._recent = collections.deque()
+        self._sorted = []
+
+    def reset(self):
+        """Forgets the samples in the window, but not the counts"""
+        self._recent.clear()
+        self._sorted.clear()
+
+    def update(self, value: float) -> float:
+        """Adds a sample and checks it against the window
+
+        Args:
+            value (float): newest sample
+
+        Returns:
+            float: the sample, the window median in its place if it was rejected and replace is set, or None if it was rejected
+        """
+        if len(self._recent) >= self.window:
+            old = self._recent.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._recent.append(value)
+        bisect.insort(self._sorted, value)
+        self.count += 1
+
+        n = len(self._sorted)
+        if n < 3:  # too few samples to tell what's normal
+            return value
+
+        median = self._median()
+        k = (n - 1) // 2
+        mad = self._kth_deviation(k, median)
+        if n % 2 == 0:
+            mad = (mad + self._kth_deviation(k + 1, median)) / 2
+        threshold = max(self.n_sigmas * MAD_TO_SIGMA * mad, self.min_deviation)
+        if abs(value - median) <= threshold:
+            return value
+
+        self.rejected += 1
+        return median if self.replace else None
+
+    def _median(self) -> float:
+        """Median of the window"""
+        s = self._sorted
+        half = len(s) // 2
+        return s[half] if len(s) % 2 else (s[half - 1] + s[half]) / 2
+
+    def _kth_deviation(self, k: int, median: float) -> float:
+        """k-th smallest (from 0) absolute deviation of the window from its median. The deviations below the median
+        and those above it are each already sorted, so this is a binary search for the k-th smallest of two sorted
+        sequences rather than a sort.
+
+        Args:
+            k (int): rank of the deviation wanted
+            median (float): median of the window
+
+        Returns:
+            float: the deviation
+        """
+        s = self._sorted
+        half = len(s) // 2
+        n_below = half
+        n_above = len(s) - half
+
+        def below(i):  # i-th smallest deviation among samples at or below the median
+            return median - s[half - 1 - i]
+
+        def above(j):  # j-th smallest deviation among samples at or above the median
+            return s[half + j] - median
+
+        # Find how many of the k + 1 smallest deviations come from below the median
+        lo = max(0, k + 1 - n_above)
+        hi = min(k + 1, n_below)
+        while lo < hi:
+            i = (lo + hi) // 2
+            if below(i) < above(k - i):
+                lo = i + 1
+            else:
+                hi = i
+        i = lo
+        j = k + 1 - i
+        return max(
+            below(i - 1) if i > 0 else -math.inf, above(j - 1) if j > 0 else -math.inf
+        )
+
+
+class ExponentialSmoother:
+    """Exponential moving average of a sample stream"""
+
+    def __init__(self, alpha: float):
+        """Creates a smoother
+
+        Args:
+            alpha (float): Weight of each new sample, from 0 (ignore new samples) to 1 (no smoothing)
+        """
+        self.alpha = alpha
+        self.value = None
+        """Current smoothed value, None until the first sample"""
+        self.count = 0
+        """Number of samples seen"""
+        self.rejected = 0
+        """Always 0, smoothing never rejects a sample"""
+
+    def reset(self):
+        """Starts again from the next sample"""
+        self.value = None
+
+    def update(self, value: float) -> float:
+        """Adds a sample
+
+        Args:
+            value (float): newest sample
+
+        Returns:
+            float: the smoothed value
+        """
+        self.count += 1
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class FilterChain:
+    """Runs samples through filter stages in turn. A sample a stage rejects doesn't reach later stages."""
+
+    def __init__(self, *stages):
+        """Creates a chain
+
+        Args:
+            stages: filter stages, each with update(value) returning the filtered value or None to reject it, and
+                count and rejected sample counts
+        """
+        self.stages = list(stages)
+
+    @property
+    def count(self) -> int:
+        """Number of samples fed into the chain"""
+        return self.stages[0].count if len(self.stages) > 0 else 0
+
+    @property
+    def rejected(self) -> int:
+        """Number of samples rejected by any stage"""
+        return sum(stage.rejected for stage in self.stages)
+
+    def reset(self):
+        """Resets every stage"""
+        for stage in self.stages:
+            stage.reset()
+
+    def update(self, value: float) -> float:
+        """Filters a sample
+
+        Args:
+            value (float): newest sample
+
+        Returns:
+            float: the filtered value, or None if a stage rejected it
+        """
+        for stage in self.stages:
+            value = stage.update(value)
+            if value is None:
+                return None
+        return value
+
+    def report(self) -> str:
+        """Summarises how many samples were rejected
+
+        Returns:
+            str: rejected and total sample counts
+        """
+        return "Force filter rejected {:d} of {:d} samples ({:.2%})".format(
+            self.rejected, self.count, self.rejected / self.count if self.count else 0
+        )
+
+
+def filter_from_settings(settings: dict) -> FilterChain:
+    """Builds a filter chain from settings
+
+    Args:
+        settings (dict): has the Hampel filter's "window", "n_sigmas" and "min_deviation", and optionally
+            "replace" and "smoothing_alpha" for exponential smoothing after it (null for none)
+
+    Returns:
+        FilterChain: the filter
+    """
+    stages = [
+        HampelFilter(
+            settings["window"],
+            settings["n_sigmas"],
+            settings["min_deviation"],
+            settings.get("replace", False),
+        )
+    ]
+    if settings.get("smoothing_alpha") is not None:
+        stages.append(ExponentialSmoother(settings["smoothing_alpha"]))
+    return FilterChain(*stages)
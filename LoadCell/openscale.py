@@ -1,20 +1,334 @@
 import serial
-from time import time
+from time import time, sleep, perf_counter
 import json
 import re
+import threading
+import bisect
 import numpy as np
-import matplotlib.pyplot as plt
 import math
 
+try:
+    from LoadCell.calibrationstats import (
+        CalibrationReport,
+        CreepModel,
+        ReadingStatistics,
+        StreamingStatistics,
+        fit_creep,
+        mean_temperature,
+        plot_deviations,
+        reading_statistics,
+    )
+    from LoadCell.tempcompensation import TemperatureModel, fit_temperature_model
+    from LoadCell.calibrationcurve import CalibrationCurve, fit_linear_calibration
+except ImportError:  # run as a script from inside LoadCell/
+    from calibrationstats import (
+        CalibrationReport,
+        CreepModel,
+        ReadingStatistics,
+        StreamingStatistics,
+        fit_creep,
+        mean_temperature,
+        plot_deviations,
+        reading_statistics,
+    )
+    from tempcompensation import TemperatureModel, fit_temperature_model
+    from calibrationcurve import CalibrationCurve, fit_linear_calibration
+
+
+class SampleRingBuffer:
+    """Fixed-capacity ring buffer of timestamped raw load cell readings, backed by NumPy arrays.
+
+    There is a single writer (the serial reader thread) and any number of readers. The writer fills in
+    the arrays before bumping the sample count, so readers never need a lock: they read the count,
+    copy what they need and then check that the writer has not lapped them in the meantime.
+    Samples are addressed by absolute index, i.e. the number of samples pushed before them.
+    """
+
+    def __init__(self, capacity: int = 2**16):
+        """Creates an empty ring buffer
+
+        Args:
+            capacity (int, optional): Number of samples retained before the oldest get overwritten. Defaults to 2**16.
+        """
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        """Monotonic receive time of each sample (s), from time.perf_counter()"""
+        self.readings = np.zeros(capacity, dtype=np.int64)
+        """Raw reading of each sample"""
+        self.temperatures = np.full(capacity, np.nan)
+        """Temperature reported with each sample, NaN if the OpenScale didn't report one"""
+        self.count = 0
+        """Total number of samples ever pushed. The newest sample has index count - 1"""
+        self._claimed = 0
+        """Sample count once the write in progress is done. Slots older than this minus capacity may be garbage"""
+
+    def push(self, t: float, reading: int, temperature: float = np.nan):
+        """Adds one sample to the buffer
+
+        Args:
+            t (float): monotonic receive time of the sample (s)
+            reading (int): raw load cell reading
+            temperature (float, optional): temperature reported with the reading. Defaults to NaN, none reported.
+        """
+        i = self.count % self.capacity
+        self._claimed = (
+            self.count + 1
+        )  # let readers know this slot is being overwritten
+        self.times[i] = t
+        self.readings[i] = reading
+        self.temperatures[i] = temperature
+        self.count += 1  # publish only once the sample is fully written
+
+    def extend(
+        self, times: np.ndarray, readings: np.ndarray, temperatures: np.ndarray = None
+    ):
+        """Adds a batch of samples to the buffer
+
+        Args:
+            times (np.ndarray): monotonic receive times of the samples (s)
+            readings (np.ndarray): raw load cell readings
+            temperatures (np.ndarray, optional): temperatures reported with the readings. Defaults to none reported.
+        """
+        n = len(readings)
+        if n <= 0:
+            return
+        if temperatures is None:
+            temperatures = np.full(n, np.nan)
+        if n > self.capacity:  # only the newest samples would survive anyway
+            times = times[-self.capacity :]
+            readings = readings[-self.capacity :]
+            temperatures = temperatures[-self.capacity :]
+            self._claimed = self.count + n
+            self.count += n - self.capacity
+            n = self.capacity
+        start = self.count % self.capacity
+        first = min(n, self.capacity - start)
+        self._claimed = self.count + n
+        self.times[start : start + first] = times[:first]
+        self.readings[start : start + first] = readings[:first]
+        self.temperatures[start : start + first] = temperatures[:first]
+        self.times[: n - first] = times[first:]
+        self.readings[: n - first] = readings[first:]
+        self.temperatures[: n - first] = temperatures[first:]
+        self.count += n
+
+    def oldest_index(self) -> int:
+        """Index of the oldest sample still held in the buffer
+
+        Returns:
+            int: absolute index of the oldest retained sample
+        """
+        return max(0, self.count - self.capacity)
+
+    def get(
+        self, start: int, stop: int = None, with_temperatures: bool = False
+    ) -> tuple[np.ndarray, ...]:
+        """Copies out the samples with absolute indices in [start, stop). Samples that have already been
+        overwritten are silently left out, so check the length of the result if that matters.
+
+        Args:
+            start (int): absolute index of the first sample wanted
+            stop (int, optional): absolute index one past the last sample wanted. Defaults to the newest sample.
+            with_temperatures (bool, optional): Whether to copy out the temperatures too. Defaults to False.
+
+        Returns:
+            tuple[np.ndarray, ...]: receive times and raw readings of those samples, then their temperatures if asked for
+        """
+        count = self.count
+        stop = count if stop is None else min(stop, count)
+        start = max(start, count - self.capacity)
+        if stop <= start:
+            empty = (np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64))
+            return empty + (np.empty(0),) if with_temperatures else empty
+
+        idx = np.arange(start, stop) % self.capacity
+        columns = (self.times[idx], self.readings[idx])
+        if with_temperatures:
+            columns += (self.temperatures[idx],)
+
+        # If the writer lapped us while copying, the front of the copy may hold newer samples
+        lapped = self._claimed - self.capacity - start
+        if lapped > 0:
+            columns = tuple(column[lapped:] for column in columns)
+        return columns
+
+    def read_since(
+        self, index: int, with_temperatures: bool = False
+    ) -> tuple[np.ndarray, ...]:
+        """Copies out every sample newer than a given index. Meant for consumers that want every sample exactly once.
+
+        Args:
+            index (int): absolute index of the first sample not yet consumed
+            with_temperatures (bool, optional): Whether to copy out the temperatures too. Defaults to False.
+
+        Returns:
+            tuple[np.ndarray, ...]: receive times, raw readings, temperatures if asked for, and the index to pass in next time
+        """
+        stop = self.count
+        return self.get(index, stop, with_temperatures) + (stop,)
+
+    def latest(self) -> tuple[float, int]:
+        """Gets the newest sample
+
+        Returns:
+            tuple[float, int]: receive time and raw reading of the newest sample, or None if there are no samples yet
+        """
+        count = self.count
+        if count <= 0:
+            return None
+        i = (count - 1) % self.capacity
+        return float(self.times[i]), int(self.readings[i])
+
+    def index_at_time(self, t: float) -> int:
+        """Finds the index of the first retained sample received at or after a given time
+
+        Args:
+            t (float): monotonic time (s)
+
+        Returns:
+            int: absolute index of that sample, or the current count if all samples are older
+        """
+        count = self.count
+        return bisect.bisect_left(
+            range(max(0, count - self.capacity), count),
+            t,
+            key=lambda i: self.times[i % self.capacity],
+        ) + max(0, count - self.capacity)
+
+    def window(
+        self, t_start: float, t_end: float = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Copies out the samples received within a time window
+
+        Args:
+            t_start (float): start of the window, monotonic time (s)
+            t_end (float, optional): end of the window, monotonic time (s). Defaults to now.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: receive times and raw readings of those samples
+        """
+        start = self.index_at_time(t_start)
+        stop = None if t_end is None else self.index_at_time(t_end)
+        return self.get(start, stop)
+
+    def wait_for_samples(
+        self, index: int, timeout: float = 1, poll_interval: float = 0.0005
+    ) -> bool:
+        """Waits until there is at least one sample at or after a given index
+
+        Args:
+            index (int): absolute index of the sample to wait for
+            timeout (float, optional): Longest time to wait (s). Defaults to 1.
+            poll_interval (float, optional): Time between checks (s). Defaults to 0.0005.
+
+        Returns:
+            bool: True if the sample is available, False if the wait timed out
+        """
+        end_time = perf_counter() + timeout
+        while self.count <= index:
+            if perf_counter() >= end_time:
+                return False
+            sleep(poll_interval)
+        return True
+
+
+class OpenScaleReader(threading.Thread):
+    """Background thread that drains the OpenScale serial port in bulk and stores every reading,
+    stamped with its receive time, in a SampleRingBuffer.
+
+    A serial read usually brings several lines at once. The last line of a read is stamped with the read's time and
+    the ones before it are spread back towards the previous read, at most one report period apart, so consecutive
+    samples never share a time.
+    """
+
+    def __init__(self, scale, buffer: SampleRingBuffer, read_timeout: float = 0.1):
+        """Creates the reader thread. Call start() to begin reading.
+
+        Args:
+            scale (OpenScale): the scale whose serial port to read
+            buffer (SampleRingBuffer): where to put the readings
+            read_timeout (float, optional): Longest a single serial read can block (s), bounds how long stop() takes. Defaults to 0.1.
+        """
+        super().__init__(name="openscale_reader", daemon=True)
+        self.scale = scale
+        self.buffer = buffer
+        self.read_timeout = read_timeout
+        self.bad_lines = 0
+        """Number of lines that could not be parsed into a reading"""
+        self.report_period = None
+        """Running estimate of the time between the OpenScale's reports (s), None until two reads have had lines"""
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Asks the reader to stop and waits for it to finish"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        ser = self.scale.ser
+        old_timeout = ser.timeout
+        ser.timeout = self.read_timeout
+
+        pending = b""
+        last_time = None
+        """Time of the last read that had lines"""
+        synced = (
+            False  # the first line is probably partial, so skip up to the first newline
+        )
+        try:
+            while not self._stop_event.is_set():
+                chunk = ser.read(max(1, ser.in_waiting))
+                t = perf_counter()
+                if not chunk:
+                    continue
+                if not synced:
+                    newline = chunk.find(b"\n")
+                    if newline < 0:
+                        continue
+                    chunk = chunk[newline + 1 :]
+                    synced = True
+
+                readings, malformed, pending, temperatures = OpenScale.parse_frames(
+                    chunk, pending, True
+                )
+                if len(readings) <= 0:
+                    continue
+                self.bad_lines += int(np.count_nonzero(malformed))
+                n = len(readings)
+                spacing = 0
+                if last_time is not None:
+                    spacing = (t - last_time) / n
+                    if self.report_period is None:
+                        self.report_period = spacing
+                    else:
+                        self.report_period += 0.01 * (spacing - self.report_period)
+                    # after a stall the lines were sent a report period apart, not spread over the stall
+                    spacing = min(spacing, self.report_period)
+                last_time = t
+                times = t - spacing * np.arange(n - 1, -1, -1)
+                self.buffer.extend(
+                    times[~malformed], readings[~malformed], temperatures[~malformed]
+                )
+        finally:
+            ser.timeout = old_timeout
+
 
 class OpenScale:
     OLD_READING_KEEP_AMOUNT = 2
     """How many old readings to keep"""
     OUTLIER_JUMP_THRESHOLD = 10
     """The maximum acceptable jump in grams between two force readings"""
+    MAX_CALIBRATION_POINTS = 20
+    """How many of the latest tares, and of the latest calibrations, the temperature model is fitted to"""
+
+    def __init__(self, ser=None):
+        """Connects to the OpenScale and loads the load cell config
 
-    def __init__(self):
-        self.ser = serial.Serial("COM5", 115200)
+        Args:
+            ser (serial.Serial, optional): already-open serial port, or anything that acts like one. Defaults to opening COM5.
+        """
+        self.ser = ser if ser is not None else serial.Serial("COM5", 115200)
         self.config_path = "LoadCell\config.json"
         self.outlier_threshold = (
             100  # g, if a measurement is beyond this limit, throw it out
@@ -24,6 +338,21 @@ class OpenScale:
             OpenScale.OLD_READING_KEEP_AMOUNT + 1
         )  # also have to store current value
 
+        self.samples = None
+        """Ring buffer of timestamped raw readings, filled by the reader thread once start_reader() is called"""
+        self.reader = None
+        """Background thread draining the serial port into self.samples"""
+        self.filter = None
+        """Streaming filter for calibrated measurements, see LoadCell/forcefilter.py. If None, outliers are found with check_if_outlier()"""
+        self.last_temperature = math.nan
+        """Temperature reported with the last line read by get_reading(), NaN if there wasn't one"""
+        self.temperature_model = None
+        """How zero and span change with temperature, see LoadCell/tempcompensation.py. If None, readings aren't temperature compensated"""
+        self.calibration_curve = None
+        """Nonlinearity correction from calibrate_multipoint(), see LoadCell/calibrationcurve.py. If None, the calibration is linear"""
+        self.last_report = None
+        """CalibrationReport of the last tare() or calibrate(), None if there hasn't been one"""
+
         try:
             with open(self.config_path, "r") as read_file:
                 self.config = json.load(read_file)
@@ -32,6 +361,14 @@ class OpenScale:
                 self.units = self.config["units"]
         except:
             self.config = {}
+        if "temperature_model" in self.config:
+            self.temperature_model = TemperatureModel.from_dict(
+                self.config["temperature_model"]
+            )
+        if "calibration_curve" in self.config:
+            self.calibration_curve = CalibrationCurve.from_dict(
+                self.config["calibration_curve"]
+            )
 
     def flush_old_lines(self):
         """Clears existing serial buffer"""
@@ -45,28 +382,130 @@ class OpenScale:
         """
         return self.ser.readline()
 
-    def ser_to_reading(serial_line: bytes) -> int:
+    def ser_to_reading(serial_line: bytes, verbose: bool = True) -> int:
         """Takes in serial line and returns raw reading reported therein
 
         Args:
                 serial_line (bytes): a line of load cell serial input
+                verbose (bool, optional): Whether to print lines that can't be parsed. Defaults to True.
 
         Returns:
                 int: the load cell reading in that line
         """
         try:
-            numString = serial_line.decode("utf-8")[:-3]  # just get the actual content
+            fields = serial_line.decode("utf-8").split(",")
+            numString = fields[0]  # just get the reading, not the temperature
             reading = int(numString)
             return reading
         except:
-            print(serial_line)
+            if verbose:
+                print(serial_line)
             return None
 
-    def reading_to_units(self, reading: int) -> float:
-        """Takes in raw load cell reading and returns calibrated measurement
+    def ser_to_temperature(serial_line: bytes) -> float:
+        """Takes in serial line and returns the temperature reported therein, the field after the raw reading
+
+        Args:
+                serial_line (bytes): a line of load cell serial input
+
+        Returns:
+                float: the temperature in that line, NaN if there isn't one
+        """
+        try:
+            return float(serial_line.split(b",")[1])
+        except (IndexError, ValueError):
+            return math.nan
+
+    def parse_frames(
+        chunk: bytes, carry: bytes = b"", with_temperatures: bool = False
+    ) -> tuple[np.ndarray, np.ndarray, bytes]:
+        """Parses every complete line of a chunk of serial input in one go
+
+        Args:
+            chunk (bytes): raw bytes read from the OpenScale, may hold many lines
+            carry (bytes, optional): incomplete line left over from the previous chunk. Defaults to b"".
+            with_temperatures (bool, optional): Whether to also parse the temperature the OpenScale reports after the raw reading. Defaults to False.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, bytes]: raw reading of each complete line (0 where malformed),
+                mask that is True for each malformed line, and the incomplete trailing line to pass in with the next chunk,
+                then if asked for, the temperature of each line (NaN where there isn't one)
+        """
+        data = carry + chunk
+        end = data.rfind(b"\n")
+        if end < 0:
+            parsed = np.empty(0, dtype=np.int64), np.empty(0, dtype=bool), data
+            return parsed + (np.empty(0),) if with_temperatures else parsed
+
+        frames = np.array(data[:end].split(b"\n"))
+        fields = np.char.strip(
+            np.char.partition(frames, b",")[:, 0]
+        )  # first field of each line
+        readings = np.zeros(len(frames), dtype=np.int64)
+        if fields.dtype.itemsize == 0:  # only empty lines
+            parsed = readings, np.ones(len(frames), dtype=bool), data[end + 1 :]
+            return (
+                parsed + (np.full(len(frames), np.nan),)
+                if with_temperatures
+                else parsed
+            )
+
+        # Check characters as a byte matrix: optional leading minus sign, then digits, then null padding
+        chars = fields.view(np.uint8).reshape(len(fields), fields.dtype.itemsize)
+        is_digit = (chars >= ord("0")) & (chars <= ord("9"))
+        is_pad = chars == 0
+        n_digits = np.count_nonzero(is_digit, axis=1)
+        valid = (
+            (is_digit[:, 0] | (chars[:, 0] == ord("-")))
+            & np.all(is_digit[:, 1:] | is_pad[:, 1:], axis=1)
+            & (n_digits > 0)
+            & (n_digits <= 18)  # anything longer is garbage and would overflow int64
+        )
+
+        readings[valid] = fields[valid].astype(np.int64)
+        parsed = readings, ~valid, data[end + 1 :]
+        return (
+            parsed + (OpenScale.parse_temperatures(frames),)
+            if with_temperatures
+            else parsed
+        )
+
+    def parse_temperatures(frames: np.ndarray) -> np.ndarray:
+        """Parses the temperature field, the one after the raw reading, of many lines in one go
+
+        Args:
+            frames (np.ndarray): lines of serial input, as a bytes array
+
+        Returns:
+            np.ndarray: temperature of each line, NaN where there isn't one
+        """
+        rest = np.char.partition(frames, b",")[:, 2]
+        fields = np.char.strip(np.char.partition(rest, b",")[:, 0])
+        temperatures = np.full(len(frames), np.nan)
+        if fields.dtype.itemsize == 0:  # no line has a temperature
+            return temperatures
+
+        # Optional leading minus sign, then digits with at most one decimal point, then null padding
+        chars = fields.view(np.uint8).reshape(len(fields), fields.dtype.itemsize)
+        is_digit = (chars >= ord("0")) & (chars <= ord("9"))
+        is_point = chars == ord(".")
+        is_pad = chars == 0
+        valid = (
+            (is_digit[:, 0] | is_point[:, 0] | (chars[:, 0] == ord("-")))
+            & np.all(is_digit[:, 1:] | is_point[:, 1:] | is_pad[:, 1:], axis=1)
+            & (np.count_nonzero(is_digit, axis=1) > 0)
+            & (np.count_nonzero(is_point, axis=1) <= 1)
+        )
+        temperatures[valid] = fields[valid].astype(np.float64)
+        return temperatures
+
+    def reading_to_units(self, reading: int, temperature: float = None) -> float:
+        """Takes in raw load cell reading and returns calibrated measurement. Works on whole NumPy arrays of readings too.
 
         Args:
                 reading (int): raw value from load cell input
+                temperature (float, optional): temperature reported with the reading, to compensate for with
+                    self.temperature_model. NaN or None for no compensation. Defaults to None.
 
         Raises:
             Exception: If load cell has not been calibrated, cannot give a calibrated measurement.
@@ -83,17 +522,74 @@ class OpenScale:
             raise Exception(
                 "Load cell has not been calibrated, cannot report a calibrated measurement."
             )
-        if reading == None:
+        if reading is None:
             return None
-        return (reading - self.tare_value) / self.calibration
+        if (
+            temperature is None
+            or self.temperature_model is None
+            or self.config.get("tare_temperature") is None
+            or self.config.get("calibration_temperature") is None
+        ):
+            measurement = (reading - self.tare_value) / self.calibration
+        else:
+            measurement = self.temperature_model.to_units(
+                reading,
+                temperature,
+                self.tare_value,
+                self.config["tare_temperature"],
+                self.calibration,
+                self.config["calibration_temperature"],
+            )
+        if self.calibration_curve is not None:
+            measurement = self.calibration_curve.correct(measurement)
+        return measurement
+
+    def zero_reading(self, temperature: float = None) -> float:
+        """Gets the raw reading with no force applied, compensated for temperature if possible
+
+        Args:
+            temperature (float, optional): current temperature. Defaults to None, giving the tare value.
+
+        Returns:
+            float: the zero reading
+        """
+        if (
+            temperature is None
+            or self.temperature_model is None
+            or self.config.get("tare_temperature") is None
+        ):
+            return self.tare_value
+        return self.temperature_model.zero(
+            temperature, self.tare_value, self.config["tare_temperature"]
+        )
+
+    def parse_weight(weight_str: str) -> tuple[float, str]:
+        """Separates a weight from its units
+
+        Args:
+            weight_str (str): weight with units (ex: 50g)
+
+        Raises:
+            ValueError: if there's no weight followed by units
+
+        Returns:
+            tuple[float, str]: the weight and its units
+        """
+        match = re.match("([0-9.]+)([a-zA-Z]+)", weight_str.replace(" ", ""))
+        if match is None:
+            raise ValueError("Can't read a weight with units from " + weight_str)
+        weight, units = match.groups()
+        return abs(float(weight)), units
 
     def get_reading(self) -> int:
-        """Grabs the next serial line and returns the reading
+        """Grabs the next serial line and returns the reading. Keeps the temperature in self.last_temperature.
 
         Returns:
             int: raw reading from OpenScale
         """
-        return OpenScale.ser_to_reading(self.get_line())
+        line = self.get_line()
+        self.last_temperature = OpenScale.ser_to_temperature(line)
+        return OpenScale.ser_to_reading(line)
 
     def wait_for_reading(self) -> int:
         reading = None
@@ -101,7 +597,7 @@ class OpenScale:
             reading = self.get_reading()
 
         self.old_readings.pop(0)
-        self.old_readings.append(self.reading_to_units(reading))
+        self.old_readings.append(self.reading_to_units(reading, self.last_temperature))
         return reading
 
     def get_calibrated_measurement(self) -> float:
@@ -110,7 +606,7 @@ class OpenScale:
         Returns:
             float: force measurement in units chosen during calibration
         """
-        meas = self.reading_to_units(self.get_reading())
+        meas = self.reading_to_units(self.get_reading(), self.last_temperature)
         self.old_readings.pop(0)
         self.old_readings.append(meas)
         return meas
@@ -119,20 +615,95 @@ class OpenScale:
         """Waits for the next valid reading and returns the calibrated measurement
 
         Args:
-            non_outlier (bool, optional): Whether to wait for a force within a reasonable margin. Defaults to True.
+            non_outlier (bool, optional): Whether to wait for a force that passes self.filter, or is within a reasonable margin if there isn't one. Defaults to True.
 
         Returns:
             float: force measurement in units chosen during calibration
         """
         meas = None
         while meas is None:
-            meas = self.reading_to_units(self.wait_for_reading())
-            if self.check_if_outlier(
+            meas = self.reading_to_units(self.wait_for_reading(), self.last_temperature)
+            if not non_outlier:
+                break
+            if self.filter is not None:
+                meas = self.filter.update(meas)
+            elif self.check_if_outlier(
                 meas
             ):  # if it's too far from all of the previous readings
                 meas = None
         return meas
 
+    def start_reader(self, capacity: int = 2**16) -> SampleRingBuffer:
+        """Starts a background thread that reads every line the OpenScale sends into a ring buffer.
+        While it runs, don't use get_line() or the other direct serial read functions.
+
+        Args:
+            capacity (int, optional): Number of samples the ring buffer keeps. Defaults to 2**16.
+
+        Returns:
+            SampleRingBuffer: the ring buffer being filled, also available as self.samples
+        """
+        if self.reader is not None and self.reader.is_alive():
+            return self.samples
+        self.samples = SampleRingBuffer(capacity)
+        self.reader = OpenScaleReader(self, self.samples)
+        self.reader.start()
+        return self.samples
+
+    def stop_reader(self):
+        """Stops the background reader thread, if there is one"""
+        if self.reader is not None:
+            self.reader.stop()
+            self.reader = None
+
+    def accept_measurement(self, measurement: float) -> bool:
+        """Adds a measurement to the history of recent readings and checks whether it is believable
+
+        Args:
+            measurement (float): calibrated measurement
+
+        Returns:
+            bool: True if the measurement is not an outlier
+        """
+        self.old_readings.pop(0)
+        self.old_readings.append(measurement)
+        return not self.check_if_outlier(measurement)
+
+    def get_new_calibrated_measurements(
+        self, index: int, non_outlier: bool = True, timeout: float = 1
+    ) -> tuple[list[float], list[float], int]:
+        """Waits for samples from the reader thread and returns all of them that arrived since the given index, calibrated
+
+        Args:
+            index (int): absolute index of the first sample not yet consumed
+            non_outlier (bool, optional): Whether to run forces through self.filter, or leave out forces beyond a reasonable margin if there isn't one. Defaults to True.
+            timeout (float, optional): Longest time to wait for a new sample (s). Defaults to 1.
+
+        Returns:
+            tuple[list[float], list[float], int]: receive times (s), force measurements in calibrated units, and the index to pass in next time
+        """
+        self.samples.wait_for_samples(index, timeout)
+        sample_times, readings, temperatures, index = self.samples.read_since(
+            index, True
+        )
+
+        times = []
+        measurements = []
+        for t, meas in zip(
+            sample_times.tolist(),
+            self.reading_to_units(readings, temperatures).tolist(),
+        ):
+            if non_outlier:
+                if self.filter is not None:
+                    meas = self.filter.update(meas)
+                elif not self.accept_measurement(meas):
+                    meas = None
+                if meas is None:
+                    continue
+            times.append(t)
+            measurements.append(meas)
+        return times, measurements, index
+
     def check_if_outlier(self, measurement: float) -> bool:
         """Checks if a measurement is too far from any of the previous stored values.
 
@@ -143,18 +714,11 @@ class OpenScale:
             bool: True if it's an outlier (too far from prior measurements), False if it's a real measurement
         """
         return not any(
-            [
-                (
-                    (old is not None)  # make sure we're comparing to an actual value
-                    and (
-                        abs(measurement - (old if old is not None else 0))
-                        <= OpenScale.OUTLIER_JUMP_THRESHOLD
-                    )
-                )
-                for old in self.old_readings[
-                    0:-1
-                ]  # don't include current reading, which is the last one in the list
-            ]
+            (old is not None)  # make sure we're comparing to an actual value
+            and (abs(measurement - old) <= OpenScale.OUTLIER_JUMP_THRESHOLD)
+            for old in self.old_readings[
+                0:-1
+            ]  # don't include current reading, which is the last one in the list
         )  # if it's too far from any of the previous readings
 
     def grams_to_N(f: float) -> float:
@@ -168,108 +732,275 @@ class OpenScale:
         """
         return 0.00980665 * f
 
-    def tare(self, wait_time: int = 120, N: int = 1000) -> float:
-        """Performs taring of the load cell. Saves tare value
+    def _raw_chunks(self, N: int = None, duration: float = None, chunk: int = 100):
+        """Reads raw readings straight from the serial port a chunk at a time, until there are N of them or
+        duration has passed. Works before the load cell has been calibrated.
 
         Args:
-            wait_time (int, optional): Time to wait for load cell creep to occur. Defaults to 120.
-            N (int, optional): Number of samples to average over. Defaults to 1000.
+            N (int, optional): Number of readings to take. Defaults to no limit.
+            duration (float, optional): Time to keep reading (s). Defaults to no limit.
+            chunk (int, optional): Readings per chunk. Defaults to 100.
+
+        Yields:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: receive times (s), raw readings and temperatures (NaN
+                where there was none) of each chunk
+        """
+        start_time = perf_counter()
+        count = 0
+        while N is None or count < N:
+            size = chunk if N is None else min(chunk, N - count)
+            times = np.empty(size, dtype=np.float64)
+            readings = np.empty(size, dtype=np.int64)
+            temperatures = np.empty(size, dtype=np.float64)
+            for i in range(size):
+                reading = None
+                while reading is None:
+                    line = self.get_line()
+                    reading = OpenScale.ser_to_reading(line, False)
+                times[i] = perf_counter()
+                readings[i] = reading
+                temperatures[i] = OpenScale.ser_to_temperature(line)
+            count += size
+            yield times, readings, temperatures
+            if duration is not None and perf_counter() - start_time >= duration:
+                return
+
+    def collect_readings(
+        self, N: int, keep_readings: bool = True, verbose: bool = True
+    ) -> tuple[np.ndarray, ReadingStatistics]:
+        """Takes raw readings and summarises them
+
+        Args:
+            N (int): Number of readings to take
+            keep_readings (bool, optional): Whether to keep every reading, which the trimmed statistics need.
+                Otherwise only running statistics are kept. Defaults to True.
+            verbose (bool, optional): Whether to print progress. Defaults to True.
 
         Returns:
-            float: tare value - the average reading when the load cell has no force applied
+            tuple[np.ndarray, ReadingStatistics]: the readings (None if not kept) and their statistics
+        """
+        all_times = []
+        all_readings = []
+        all_temperatures = []
+        streaming = StreamingStatistics()
+        for times, readings, temperatures in self._raw_chunks(N):
+            if keep_readings:
+                all_times.append(times)
+                all_readings.append(readings)
+                all_temperatures.append(temperatures)
+            else:
+                streaming.add(times, readings, temperatures)
+            if verbose:
+                print(
+                    "{:5d}: mean of last {:d} = {:10.1f}".format(
+                        streaming.n + sum(len(r) for r in all_readings),
+                        len(readings),
+                        np.mean(readings),
+                    )
+                )
+
+        if not keep_readings:
+            return None, streaming.statistics()
+        readings = np.concatenate(all_readings)
+        return readings, reading_statistics(
+            readings,
+            np.concatenate(all_times),
+            temperatures=np.concatenate(all_temperatures),
+        )
+
+    def wait_for_creep(
+        self,
+        wait_time: float,
+        verbose: bool = True,
+        max_residual_drift: float = None,
+        min_wait: float = 10,
+    ) -> tuple[ReadingStatistics, CreepModel]:
+        """Waits for load cell creep to settle, keeping running statistics of the readings in the meantime.
+        Adaptively, fits an exponential decay to the readings as they come in and stops waiting once the creep
+        still to come is predicted to be small enough twice in a row. A fit that finds no creep says nothing about
+        what's still to come, so it doesn't count, and with no creep ever found it waits the whole wait_time.
+
+        Args:
+            wait_time (float): Longest time to wait (s)
+            verbose (bool, optional): Whether to print progress. Defaults to True.
+            max_residual_drift (float, optional): Creep still to come that's small enough to stop waiting, in
+                calibrated units, or raw reading if the load cell hasn't been calibrated. Defaults to always waiting wait_time.
+            min_wait (float, optional): Shortest time to wait (s) when adaptive, so the fit has data to work with. Defaults to 10.
+
+        Returns:
+            tuple[ReadingStatistics, CreepModel]: statistics of the readings while waiting, including how fast
+                they drifted, and the creep fitted to them (None if not adaptive)
         """
+        threshold = max_residual_drift
+        if threshold is not None and "calibration" in self.config:
+            threshold = max_residual_drift * abs(self.calibration)
 
-        total = 0
+        start_time = perf_counter()
+        streaming = StreamingStatistics()
+        chunk_times = []
+        chunk_means = []
+        model = None
+        settled = 0
+        for times, readings, temperatures in self._raw_chunks(duration=wait_time):
+            streaming.add(times, readings, temperatures)
+            remaining_time = wait_time - (perf_counter() - start_time)
+            if threshold is None:
+                if verbose:
+                    print("{:5.1f}: {:}".format(remaining_time, readings[-1]))
+                continue
 
-        print(
-            "Taking first {:d} seconds to let load cell creep happen. This will lead to a more accurate tare value.".format(
-                wait_time
+            chunk_times.append(np.mean(times))
+            chunk_means.append(np.mean(readings))
+            if perf_counter() - start_time < min_wait:
+                if verbose:
+                    print("{:5.1f}: {:}".format(remaining_time, readings[-1]))
+                continue
+            model = fit_creep(chunk_times, chunk_means)
+            remaining_creep = model.remaining(times[-1])
+            if verbose:
+                print(
+                    "{:5.1f}: {:}, creep still to come {:.1f}, time constant {:.1f}s".format(
+                        remaining_time,
+                        readings[-1],
+                        remaining_creep,
+                        model.time_constant,
+                    )
+                )
+            settled = (
+                settled + 1 if model.found() and remaining_creep <= threshold else 0
             )
-        )
-        START_TIME = time()
-        while time() - START_TIME <= wait_time:
-            remaining = wait_time - (time() - START_TIME)
-            line = self.get_line()
-            print("{:5.1f}: {:}".format(remaining, line))
+            if settled >= 2:
+                if verbose:
+                    print(
+                        "Creep has settled after {:.1f}s".format(
+                            perf_counter() - start_time
+                        )
+                    )
+                break
         self.flush_old_lines()  # and clear any extra lines that may have been generated, we don't need them
+        return streaming.statistics(), model
 
-        readings = [0] * N
-        print("Now recording values for taring")
-        for i in range(N):
-            try:
-                reading = self.wait_for_reading()
-            except:
-                pass  # I don't care if the load cell hasn't yet been calibrated when I'm taring
-            readings[i] = reading
-            print("{:5d}: {:8d}".format(i, reading))
-
-        # Throw out top 1% and bottom 1%
-        remove_rate = 0.01
-        readings_sorted = sorted(readings)
-        readings = readings_sorted[
-            math.floor(remove_rate * N) : math.floor((1 - remove_rate) * N)
-        ]
-        print(
-            "Keeping the middle {:.0%} of samples to remove outliers due to noise".format(
-                1 - 2 * remove_rate
-            )
-        )
+    def tare(
+        self,
+        wait_time: int = 120,
+        N: int = 1000,
+        keep_readings: bool = True,
+        plot: bool = True,
+        verbose: bool = True,
+        adaptive: bool = False,
+        max_residual_drift: float = 0.01,
+    ) -> float:
+        """Performs taring of the load cell. Saves tare value, and the statistics behind it in last_report
 
-        # tare_value = total / N
-        tare_value = sum(readings) / len(readings)
-        print("The tare value is {:.2f}".format(tare_value))
+        Args:
+            wait_time (int, optional): Time to wait for load cell creep to occur, the longest wait if adaptive. Defaults to 120.
+            N (int, optional): Number of samples to average over. Defaults to 1000.
+            keep_readings (bool, optional): Whether to keep every sample and use their trimmed mean, rather than
+                just their running mean. Defaults to True.
+            plot (bool, optional): Whether to show a histogram of the samples, which blocks until it's closed. Defaults to True.
+            verbose (bool, optional): Whether to print progress and statistics. Defaults to True.
+            adaptive (bool, optional): Whether to stop waiting for creep as soon as it's predicted to have settled. Defaults to False.
+            max_residual_drift (float, optional): Creep still to come that counts as settled when adaptive, in
+                calibrated units. Defaults to 0.01.
 
-        reading_std = np.std(readings)
-        max_reading = max(readings)
-        min_reading = min(readings)
-        print(
-            "min: {:}, max: {:}, standard dev: {:}".format(
-                min_reading, max_reading, reading_std
-            )
-        )
-        readings_over = sorted(i for i in readings if i >= tare_value + reading_std)
-        readings_under = sorted(
-            (i for i in readings if i <= tare_value - reading_std), reverse=True
-        )
-        print(
-            "Number over 1std: {:}, Number under 1std: {:}, total outside 1std: {:}".format(
-                len(readings_over),
-                len(readings_under),
-                len(readings_over) + len(readings_under),
-            )
-        )
-        print(
-            "Number within 1std: {:}".format(
-                len(readings) - len(readings_over) - len(readings_under)
+        Returns:
+            float: tare value - the average reading when the load cell has no force applied
+        """
+        creep = creep_model = None
+        if wait_time > 0:
+            if verbose:
+                print(
+                    "Taking {:}{:d} seconds to let load cell creep happen. This will lead to a more accurate tare value.".format(
+                        "up to " if adaptive else "first ", wait_time
+                    )
+                )
+            creep, creep_model = self.wait_for_creep(
+                wait_time, verbose, max_residual_drift if adaptive else None
             )
+
+        if verbose:
+            print("Now recording values for taring")
+        readings, stats = self.collect_readings(N, keep_readings, verbose)
+        report = CalibrationReport(
+            "tare", stats.center, stats, creep=creep, creep_model=creep_model
         )
-        # print(readings_over)
-        # print(readings_under)
-        plt.hist(sorted(np.array(readings) - tare_value), 50)
-        plt.xlabel("Deviation from the mean")
-        plt.ylabel("Number of samples")
-        plt.title("Middle {:.0%} of readings".format(1 - 2 * remove_rate))
-        plt.show()
-
-        self.config["tare"] = tare_value
+        if verbose:
+            print(report.summary())
+        if plot and readings is not None:
+            plot_deviations(readings, stats)
+
+        self.config["tare"] = report.value
+        self.config["tare_report"] = report.to_dict()
+        self.config["tare_temperature"] = stats.temperature
+        self.update_temperature_model(stats, 0, verbose)
         with open(self.config_path, "w") as write_file:
             json.dump(self.config, write_file)
 
-        self.tare_value = tare_value
-        return tare_value
+        self.tare_value = report.value
+        self.last_report = report
+        return report.value
+
+    def update_temperature_model(
+        self, stats: ReadingStatistics, measurement: float, verbose: bool = True
+    ):
+        """Adds a tare or calibration to the calibration points in the config and refits the temperature model
+        to them. Only the latest MAX_CALIBRATION_POINTS tares and calibrations are kept, so the config doesn't grow
+        forever and the model follows the load cell as it ages. Does nothing if the load cell didn't report a
+        temperature.
+
+        Args:
+            stats (ReadingStatistics): statistics of the raw readings taken
+            measurement (float): calibrated measurement the readings should give, 0 for a tare
+            verbose (bool, optional): Whether to print the model. Defaults to True.
+        """
+        if stats.temperature is None:
+            return
+        points = self.config.get("calibration_points", [])
+        points.append([stats.temperature, stats.center, measurement])
+        kept = []
+        counts = {False: 0, True: 0}  # of tares and of calibrations kept
+        for point in reversed(points):
+            loaded = point[2] != 0
+            if counts[loaded] < OpenScale.MAX_CALIBRATION_POINTS:
+                kept.append(point)
+                counts[loaded] += 1
+        points = kept[::-1]
+        self.config["calibration_points"] = points
+        model = fit_temperature_model(points)
+        if model is None:
+            return
+        self.temperature_model = model
+        self.config["temperature_model"] = model.to_dict()
+        if verbose:
+            print(model.summary())
 
     def calibrate(
-        self, tare_first: bool = False, N: int = 1000, report_duration: int = 10
+        self,
+        tare_first: bool = False,
+        N: int = 1000,
+        report_duration: int = 10,
+        cal_weight_str: str = None,
+        keep_readings: bool = True,
+        plot: bool = True,
+        verbose: bool = True,
     ) -> float:
-        """Performs calibration of load cell
+        """Performs calibration of load cell. Saves the calibration, and the statistics behind it in last_report
 
         Args:
+            tare_first (bool, optional): Whether to tare before calibrating. Defaults to False, unless the load cell has never been calibrated.
             N (int, optional): Number of samples to average over. Defaults to 1000.
             report_duration (int, optional): Amount of time to report values after calibration is complete. Defaults to 10.
+            cal_weight_str (str, optional): Calibration weight with units (ex: 50g), already in place. Giving it
+                runs the calibration without asking for anything. Defaults to asking the user.
+            keep_readings (bool, optional): Whether to keep every sample and use their trimmed mean, rather than
+                just their running mean. Defaults to True.
+            plot (bool, optional): Whether to show histograms of the samples, which block until they're closed. Defaults to True.
+            verbose (bool, optional): Whether to print progress and statistics. Defaults to True.
 
         Returns:
-            float: _description_
+            float: calibration - raw reading per unit of weight
         """
+        interactive = cal_weight_str is None
         if (
             ("tare" not in self.config)
             or ("calibration" not in self.config)
@@ -278,120 +1009,203 @@ class OpenScale:
             print("Load cell has not been tared, will now perform taring.")
             tare_first = True
         if tare_first:
-            input(
-                "Please remove any weights you had placed. Press enter to being taring process."
-            )
-            self.tare(N=N)
+            if interactive:
+                input(
+                    "Please remove any weights you had placed. Press enter to being taring process."
+                )
+            self.tare(N=N, keep_readings=keep_readings, plot=plot, verbose=verbose)
             print("Taring complete. Now to calibrate.")
 
-        total = 0
-
-        # Have the user place the calibration weight and ask what the weight is
-        print("Please place the calibration weight(s).")
-        cal_weight_str = input(
-            "Enter the total calibration weight with units (ex: 50g): "
-        )
-
-        cal_weight_str = cal_weight_str.replace(" ", "")  # filter out spaces
+        if interactive:
+            # Have the user place the calibration weight and ask what the weight is
+            print("Please place the calibration weight(s).")
+            cal_weight_str = input(
+                "Enter the total calibration weight with units (ex: 50g): "
+            )
 
-        # separate weight from units
-        temp = re.compile("([0-9.]+)([a-zA-Z]+)")
-        res = temp.match(cal_weight_str).groups()
-        cal_weight = abs(float(res[0]))
-        units = res[1]
+        cal_weight, units = OpenScale.parse_weight(cal_weight_str)
         self.config["units"] = units
 
         for i in range(10):  # ignore the first few lines, they're not data
             self.get_line()
         self.flush_old_lines()  # and clear any extra lines that may have been generated, we don't need them
 
-        readings = [0] * N
-        for i in range(N):
-            # reading = self.get_reading()
-            reading = self.wait_for_reading() - self.tare_value
-            readings[i] = reading
-            print("{:5d}: {:10.1f}".format(i, reading))
-            total += reading - self.tare_value
-
-        # Throw out top 1% and bottom 1%
-        remove_rate = 0.01
-        readings_sorted = sorted(readings)
-        readings = readings_sorted[
-            math.floor(remove_rate * N) : math.floor((1 - remove_rate) * N)
-        ]
-        print(
-            "Keeping the middle {:.0%} of samples to remove outliers due to noise".format(
-                1 - 2 * remove_rate
-            )
+        readings, stats = self.collect_readings(N, keep_readings, verbose)
+        # the zero may have moved with temperature since taring
+        average = stats.center - self.zero_reading(stats.temperature)
+        calibration = -average / cal_weight
+        report = CalibrationReport(
+            "calibration", calibration, stats, units=units, weight=cal_weight
         )
+        if verbose:
+            print(report.summary())
+        if plot and readings is not None:
+            plot_deviations(readings, stats)
 
-        # average = total / N
-        average = sum(readings) / len(readings)
-        print("The calibration average is {:.2f}".format(average))
-
-        reading_std = np.std(readings)
-        max_reading = max(readings)
-        min_reading = min(readings)
-        print(
-            "min: {:}, max: {:}, standard dev: {:}".format(
-                min_reading, max_reading, reading_std
+        self.config["calibration"] = calibration
+        self.config["calibration_report"] = report.to_dict()
+        self.config["calibration_temperature"] = stats.temperature
+        # calibrated measurements of a weight come out negative, see reading_to_units()
+        self.update_temperature_model(stats, -cal_weight, verbose)
+        if self.calibration_curve is not None:
+            print(
+                "Dropping the multi-point calibration curve, it was fitted to the old calibration."
             )
-        )
-        readings_over = sorted(i for i in readings if i >= average + reading_std)
-        readings_under = sorted(
-            (i for i in readings if i <= average - reading_std), reverse=True
-        )
-        print(
-            "Number over 1std: {:}, Number under 1std: {:}, total outside 1std: {:}".format(
-                len(readings_over),
-                len(readings_under),
-                len(readings_over) + len(readings_under),
+            self.calibration_curve = None
+            del self.config["calibration_curve"]
+        with open(self.config_path, "w") as write_file:
+            json.dump(self.config, write_file)
+        self.calibration = calibration
+        self.units = units
+        self.last_report = report
+
+        if interactive and report_duration > 0:
+            input(
+                "You should now change the weights. For the next 10 seconds, I will print out the weight I am measuring. Press enter to begin."
             )
-        )
-        print(
-            "Number within 1std: {:}".format(
-                len(readings) - len(readings_over) - len(readings_under)
+            self.flush_old_lines()
+
+            START_TIME = time()
+            while time() - START_TIME <= report_duration:
+                weight = -self.wait_for_calibrated_measurement()
+                if weight is None:  # if startup garbage not gone yet
+                    continue
+                print("{:6.2f}{:}".format(weight, units))
+
+        return calibration
+
+    def calibrate_multipoint(
+        self,
+        cal_weight_strs: list[str] = None,
+        degree: int = 2,
+        tare_first: bool = True,
+        N: int = 1000,
+        keep_readings: bool = True,
+        plot: bool = True,
+        verbose: bool = True,
+    ) -> CalibrationCurve:
+        """Calibrates the load cell with several weights, for when one linear factor isn't accurate across the
+        whole range of forces. Fits the best linear calibration to all the weights, then a polynomial correcting
+        what's left, compiled into a lookup table so reading_to_units() costs the same as before.
+
+        Args:
+            cal_weight_strs (list[str], optional): Calibration weights with units (ex: ["5g", "20g", "50g"]). The
+                user is asked to place each in turn. Defaults to asking the user for each weight until they enter nothing.
+            degree (int, optional): Degree of the correcting polynomial, lowered if there are too few weights. Defaults to 2.
+            tare_first (bool, optional): Whether to tare before calibrating. The tare is one of the curve's points. Defaults to True.
+            N (int, optional): Number of samples to average over for each weight. Defaults to 1000.
+            keep_readings (bool, optional): Whether to keep every sample and use their trimmed mean, rather than
+                just their running mean. Defaults to True.
+            plot (bool, optional): Whether to show histograms of the samples, which block until they're closed. Defaults to True.
+            verbose (bool, optional): Whether to print progress and statistics. Defaults to True.
+
+        Raises:
+            ValueError: if the weights aren't all in the same units, or there are none
+
+        Returns:
+            CalibrationCurve: the fitted curve
+        """
+        if tare_first or "tare" not in self.config:
+            input(
+                "Please remove any weights you had placed. Press enter to being taring process."
             )
-        )
-        # print(readings_over)
-        # print(readings_under)
-        plt.hist(sorted(np.array(readings) - average), 50)
-        plt.xlabel("Deviation from the mean")
-        plt.ylabel("Number of samples")
-        plt.title("Middle {:.0%} of readings".format(1 - 2 * remove_rate))
-        plt.show()
+            self.tare(N=N, keep_readings=keep_readings, plot=plot, verbose=verbose)
+            print("Taring complete. Now to calibrate.")
+
+        weights = []
+        offsets = []
+        all_stats = []
+        units = None
+        i = 0
+        while cal_weight_strs is None or i < len(cal_weight_strs):
+            if cal_weight_strs is None:
+                cal_weight_str = input(
+                    "Place the next calibration weight(s) and enter their total weight with units (ex: 50g), or nothing to finish: "
+                )
+                if cal_weight_str.strip() == "":
+                    break
+            else:
+                cal_weight_str = cal_weight_strs[i]
+                input(
+                    "Please place {:} of calibration weight(s). Press enter when they're in place.".format(
+                        cal_weight_str
+                    )
+                )
+            i += 1
+            cal_weight, weight_units = OpenScale.parse_weight(cal_weight_str)
+            if units is not None and weight_units != units:
+                raise ValueError(
+                    "Calibration weights must all be in {:}, got {:}".format(
+                        units, cal_weight_str
+                    )
+                )
+            units = weight_units
+
+            for _ in range(10):  # ignore the first few lines, they're not data
+                self.get_line()
+            self.flush_old_lines()  # and clear any extra lines that may have been generated, we don't need them
+            readings, stats = self.collect_readings(N, keep_readings, verbose)
+            if plot and readings is not None:
+                plot_deviations(readings, stats)
+            weights.append(cal_weight)
+            # the zero may have moved with temperature since taring
+            offsets.append(stats.center - self.zero_reading(stats.temperature))
+            all_stats.append(stats)
+        if len(weights) == 0:
+            raise ValueError("No calibration weights were given")
+
+        calibration = fit_linear_calibration(weights, offsets)
+        linear = np.asarray(offsets) / calibration
+        # calibrated measurements of a weight come out negative, see reading_to_units()
+        points = [[0, 0]] + [[m, -w] for m, w in zip(linear, weights)]
+        curve = CalibrationCurve(points, min(degree, len(points) - 1))
+        reports = [
+            CalibrationReport("calibration point", offset, stats, units, weight)
+            for offset, stats, weight in zip(offsets, all_stats, weights)
+        ]
+        if verbose:
+            for report in reports:
+                print(report.summary())
+            print("The calibration value is {:.2f}".format(calibration))
+            print(curve.summary())
 
-        calibration = -average / cal_weight
         self.config["calibration"] = calibration
+        self.config["units"] = units
+        self.config["calibration_report"] = reports[-1].to_dict()
+        self.config["calibration_point_reports"] = [r.to_dict() for r in reports]
+        self.config["calibration_curve"] = curve.to_dict()
+        self.config["calibration_temperature"] = mean_temperature(
+            [np.nan if s.temperature is None else s.temperature for s in all_stats]
+        )
+        for stats, m in zip(all_stats, linear):
+            # the temperature model works on linear measurements, before the curve corrects them
+            self.update_temperature_model(stats, float(m), verbose)
         with open(self.config_path, "w") as write_file:
             json.dump(self.config, write_file)
+        self.calibration = calibration
+        self.units = units
+        self.calibration_curve = curve
+        return curve
 
-        print("The calibration value is {:.2f}".format(calibration))
-        input(
-            "You should now change the weights. For the next 10 seconds, I will print out the weight I am measuring. Press enter to begin."
-        )
-        self.flush_old_lines()
-
-        START_TIME = time()
-        while time() - START_TIME <= report_duration:
-            # reading = int(ser.readline().decode("utf-8")[:-3])
-            # weight = -(reading - self.tare_value) / calibration
-            weight = -self.get_calibrated_measurement()
-            weight = -self.wait_for_calibrated_measurement()
-            if weight is None:  # if startup garbage not gone yet
-                continue
-            print("{:6.2f}{:}".format(weight, units))
+    def check_tare(self, auto_tare: bool = None):
+        """Check if load cell is within tare, otherwise tare it.
 
-        return calibration
-
-    def check_tare(self):
-        """Check if load cell is within tare, otherwise tare it."""
+        Args:
+            auto_tare (bool, optional): What to do when it's out of tare without asking: True to tare it, without
+            showing the tare's histogram, False to leave it. Defaults to None, which asks the user.
+        """
         weight = self.wait_for_calibrated_measurement(True)
         if abs(weight) > 0.5:
-            ans = input(
-                "The load cell is out of tare! Current reading is {:.2f}{:}. Do you want to tare it now? (y/n) ".format(
+            message = (
+                "The load cell is out of tare! Current reading is {:.2f}{:}.".format(
                     weight, self.units
                 )
             )
+            if auto_tare is None:
+                ans = input(message + " Do you want to tare it now? (y/n) ")
+            else:
+                print(message + (" Taring it now." if auto_tare else " Leaving it."))
+                ans = "y" if auto_tare else "n"
             if ans == "y":
-                self.tare()
+                # don't block an unattended run on the histogram window
+                self.tare(adaptive=True, plot=auto_tare is None)
@@ -1,4 +1,4 @@
 from openscale import OpenScale
 
 scale = OpenScale()
-scale.tare(wait_time=120, N=3000)
+scale.tare(wait_time=120, N=3000, adaptive=True)
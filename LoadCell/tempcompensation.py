@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class TemperatureModel:
+    """How the load cell's zero and span change with temperature, fitted across calibration sessions.
+
+    The latest tare and calibration stay the reference point; the model only moves them to the current
+    temperature, so a fresh tare still takes effect straight away:
+
+        zero(T) = tare + zero_slope * (T - tare_temperature)
+        span(T) = calibration * (1 + span_slope * (T - calibration_temperature))
+        measurement = (reading - zero(T)) / span(T)
+    """
+
+    def __init__(self, zero_slope: float = 0, span_slope: float = 0):
+        """Creates a model
+
+        Args:
+            zero_slope (float, optional): Change in zero reading per degree. Defaults to 0.
+            span_slope (float, optional): Relative change in span per degree. Defaults to 0.
+        """
+        self.zero_slope = zero_slope
+        self.span_slope = span_slope
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        """Builds a model saved with to_dict()
+
+        Args:
+            values (dict): the saved model
+
+        Returns:
+            TemperatureModel: the model
+        """
+        return cls(values["zero_slope"], values["span_slope"])
+
+    def to_dict(self) -> dict:
+        """Gets the model as plain numbers, e.g. for saving as JSON
+
+        Returns:
+            dict: the model's coefficients
+        """
+        return {
+            "zero_slope": float(self.zero_slope),
+            "span_slope": float(self.span_slope),
+        }
+
+    def zero(self, temperature, tare: float, tare_temperature: float):
+        """Gets the zero reading at a temperature. Where the temperature is NaN it isn't compensated.
+
+        Args:
+            temperature (float | np.ndarray): temperature
+            tare (float): latest tare value
+            tare_temperature (float): temperature of the latest tare
+
+        Returns:
+            float | np.ndarray: raw reading with no force applied
+        """
+        return tare + self.zero_slope * np.nan_to_num(temperature - tare_temperature)
+
+    def to_units(
+        self,
+        reading,
+        temperature,
+        tare: float,
+        tare_temperature: float,
+        calibration: float,
+        calibration_temperature: float,
+    ):
+        """Converts raw readings to calibrated measurements at the temperatures they were taken. Works on single
+        values or whole NumPy arrays. Where the temperature is NaN it isn't compensated.
+
+        Args:
+            reading (int | np.ndarray): raw readings
+            temperature (float | np.ndarray): temperature of each reading
+            tare (float): latest tare value
+            tare_temperature (float): temperature of the latest tare
+            calibration (float): latest calibration, raw reading per unit
+            calibration_temperature (float): temperature of the latest calibration
+
+        Returns:
+            float | np.ndarray: calibrated measurements
+        """
+        zero = self.zero(temperature, tare, tare_temperature)
+        span_change = np.nan_to_num(temperature - calibration_temperature)
+        span = calibration * (1 + self.span_slope * span_change)
+        return (reading - zero) / span
+
+    def summary(self) -> str:
+        """Describes the model in a line
+
+        Returns:
+            str: the description
+        """
+        return "Zero moves {:.2f} per degree, span moves {:.4%} per degree".format(
+            self.zero_slope, self.span_slope
+        )
+
+
+def fit_temperature_model(
+    points: list[list[float]], min_temperature_span: float = 1
+) -> TemperatureModel:
+    """Fits how zero and span change with temperature to points from past tares and calibrations by least squares,
+    reading = z0 + zero_slope * dT + s0 * (1 + span_slope * dT) * measurement. A slope is only fitted if its points
+    (the tares for the zero, the rest for the span) cover enough of a temperature range to tell, otherwise it's 0.
+
+    Args:
+        points (list[list[float]]): [temperature, mean raw reading, known measurement] of each session, the
+            measurement being 0 for a tare
+        min_temperature_span (float, optional): Smallest temperature range (degrees) to fit a slope over. Defaults to 1.
+
+    Returns:
+        TemperatureModel: the model, or None if there aren't enough points to fit even a zero and span
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    temperatures, readings, measurements = points.T
+    loaded = measurements != 0
+    if len(points) < 2 or not np.any(loaded) or np.all(loaded):
+        return None
+
+    dT = temperatures - np.mean(temperatures)
+    columns = [np.ones(len(points)), measurements]
+    fit_zero = np.ptp(temperatures[~loaded]) >= min_temperature_span
+    fit_span = np.ptp(temperatures[loaded]) >= min_temperature_span
+    if fit_zero:
+        columns.append(dT)
+    if fit_span:
+        columns.append(measurements * dT)
+    coeffs = np.linalg.lstsq(np.column_stack(columns), readings, rcond=None)[0]
+
+    span = coeffs[1]
+    zero_slope = coeffs[2] if fit_zero else 0
+    span_slope = coeffs[-1] / span if fit_span else 0
+    return TemperatureModel(zero_slope, span_slope)
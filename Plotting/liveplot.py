@@ -0,0 +1,207 @@
+import numpy as np
+
+
+def minmax_decimate(
+    x: np.ndarray, y: np.ndarray, n_bins: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Shrinks a series to the smallest and largest point in each of n_bins equal runs of samples.
+    Drawn as a line it looks the same as the full series at n_bins pixels wide, spikes included.
+
+    Args:
+        x (np.ndarray): x values, in order
+        y (np.ndarray): y values
+        n_bins (int): number of bins, about the plot's width in pixels
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: at most 2 * n_bins x and y values, still in order
+    """
+    n = len(y)
+    if n <= 2 * n_bins:
+        return x, y
+
+    per_bin = -(-n // n_bins)  # ceiling division
+    n_full = n // per_bin
+    binned = y[: n_full * per_bin].reshape(n_full, per_bin)
+    offsets = np.arange(n_full) * per_bin
+    i_min = offsets + np.argmin(binned, axis=1)
+    i_max = offsets + np.argmax(binned, axis=1)
+    # Keep each bin's min and max in the order they happened
+    idx = np.stack([np.minimum(i_min, i_max), np.maximum(i_min, i_max)], axis=1).ravel()
+    if n_full * per_bin < n:  # leftover samples make one last, shorter bin
+        tail = y[n_full * per_bin :]
+        last = n_full * per_bin + np.sort([np.argmin(tail), np.argmax(tail)])
+        idx = np.concatenate([idx, last])
+    return x[idx], y[idx]
+
+
+class LivePlot:
+    """Live figure of a few series against time that costs the same to redraw however long the run gets.
+
+    Lines are persistent artists updated with set_data() and drawn by blitting over a cached background.
+    Each series is min/max decimated to the width of its axes in pixels first. Axis limits only grow, with
+    headroom, so the full redraw needed to change them happens a handful of times per run.
+    """
+
+    HEADROOM = 0.2
+    """Fraction of the data range added beyond the data when an axis limit has to grow"""
+    X_START_TOLERANCE = 0.25
+    """Fraction of the time shown the oldest sample may move past the left edge before the time axis moves up to it,
+    so a full history dropping its oldest samples doesn't cost a redraw every frame"""
+
+    def __init__(self, fig, x_window: float = 30, follow_time: bool = True):
+        """Sets up a live plot on a figure whose axes are already styled
+
+        Args:
+            fig (Figure): the figure
+            x_window (float, optional): Narrowest time window shown (s). Defaults to 30.
+            follow_time (bool, optional): Whether x is time, shown from the oldest sample on. Otherwise the x limits grow to fit the data like the y limits do. Defaults to True.
+        """
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.x_window = x_window
+        self.follow_time = follow_time
+        self.lines = []
+        self._y_limits = []
+        self._background = None
+        self._timer = None
+        self._source = None
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add_line(self, ax, color: str, label: str, y_limits=None):
+        """Adds a series to draw
+
+        Args:
+            ax (Axes): axes to draw it on
+            color (str): line color
+            label (str): legend label
+            y_limits (function, optional): Takes the series' y values and returns the (bottom, top) it wants shown. Defaults to the data's range.
+
+        Returns:
+            Line2D: the line
+        """
+        (line,) = ax.plot([], [], color, label=label, animated=True)
+        self.lines.append(line)
+        self._y_limits.append(y_limits)
+        return line
+
+    def _on_draw(self, event):
+        """Caches the background after a full redraw and puts the lines back on top"""
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for line in self.lines:
+            self.fig.draw_artist(line)
+
+    def _grow(self, current: tuple[float, float], lo: float, hi: float):
+        """New axis limits covering lo to hi, or None if the current ones already do
+
+        Args:
+            current (tuple[float, float]): current limits
+            lo (float): lowest value that must be shown
+            hi (float): highest value that must be shown
+
+        Returns:
+            tuple[float, float]: new limits, or None
+        """
+        if current[0] <= lo and hi <= current[1]:
+            return None
+        span = max(hi - lo, 1e-9)
+        new_lo = current[0] if current[0] <= lo else lo - LivePlot.HEADROOM * span
+        new_hi = current[1] if hi <= current[1] else hi + LivePlot.HEADROOM * span
+        return new_lo, new_hi
+
+    def _set_data(self, x: np.ndarray, *ys: np.ndarray) -> bool:
+        """Puts the latest data in the lines, growing the axis limits if needed
+
+        Args:
+            x (np.ndarray): times
+            ys (np.ndarray): values of each series, in the order they were added
+
+        Returns:
+            bool: whether any axis limits changed, which needs a full redraw
+        """
+        limits_changed = False
+        for line, y, y_limits in zip(self.lines, ys, self._y_limits):
+            ax = line.axes
+            n_bins = max(1, int(ax.bbox.width))
+            line.set_data(*minmax_decimate(x, y, n_bins))
+
+            lo, hi = y_limits(y) if y_limits is not None else (np.min(y), np.max(y))
+            new_ylim = self._grow(ax.get_ylim(), lo, hi)
+            if new_ylim is not None:
+                ax.set_ylim(new_ylim)
+                limits_changed = True
+
+        ax = self.lines[0].axes
+        x_lo, x_hi = ax.get_xlim()
+        if not self.follow_time:
+            new_xlim = self._grow((x_lo, x_hi), np.min(x), np.max(x))
+            if new_xlim is not None:
+                ax.set_xlim(new_xlim)
+                limits_changed = True
+        elif (
+            x[-1] > x_hi
+            or x[0] < x_lo
+            or x[0] - x_lo > LivePlot.X_START_TOLERANCE * (x_hi - x_lo)
+        ):
+            # Double the time shown each time the data runs off the right, rather than creeping along
+            span = x[-1] - x[0]
+            ax.set_xlim(
+                x[0], x[0] + (self.x_window if span < self.x_window else 2 * span)
+            )
+            limits_changed = True
+        return limits_changed
+
+    def update(self, x: np.ndarray, *ys: np.ndarray):
+        """Draws the latest data
+
+        Args:
+            x (np.ndarray): times
+            ys (np.ndarray): values of each series, in the order they were added
+        """
+        if len(x) <= 0:
+            return
+
+        if self._set_data(x, *ys) or self._background is None:
+            self.canvas.draw()  # _on_draw caches the new background and draws the lines
+        else:
+            self.canvas.restore_region(self._background)
+            for line in self.lines:
+                self.fig.draw_artist(line)
+        self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+
+    def start(self, source, interval: int = 50):
+        """Redraws from a data source on a GUI timer. Call before plt.show().
+
+        Args:
+            source (function): returns the times and then each series' values, in the order they were added
+            interval (int, optional): Time between redraws (ms). Defaults to 50.
+        """
+        self._source = source
+        self._timer = self.canvas.new_timer(interval=interval)
+        self._timer.add_callback(lambda: self.update(*source()))
+        self._timer.start()
+
+    def stop(self):
+        """Stops redrawing on the GUI timer"""
+        if self._timer is not None:
+            self._timer.stop()
+
+    def savefig(self, path: str, **kwargs):
+        """Saves the figure with the live lines in it, which a normal draw leaves out, brought up to date
+        with the data source if there is one
+
+        Args:
+            path (str): where to save it
+            kwargs: passed on to Figure.savefig()
+        """
+        if self._source is not None:
+            data = self._source()
+            if len(data[0]) > 0:
+                self._set_data(*data)
+        for line in self.lines:
+            line.set_animated(False)
+        try:
+            self.fig.savefig(path, **kwargs)
+        finally:
+            for line in self.lines:
+                line.set_animated(True)
@@ -0,0 +1,279 @@
+"""Live plot in its own process, so drawing it never competes with the control loop for the GIL.
+
+The acquisition side writes samples into a SharedSampleHistory in shared memory. PlotViewer starts
+
+    python -m Plotting.plotviewer <settings JSON>
+
+which attaches to the same memory and draws it with LivePlot. Requests to save the figure go over the same
+shared memory.
+"""
+
+import json
+import subprocess
+import sys
+from multiprocessing import shared_memory
+from time import sleep, time
+import numpy as np
+from Control.sharedstate import SampleHistory
+
+HEADER_LEN = 8
+"""Number of int64s at the start of the shared memory"""
+COUNT, START, SAVE_REQUESTED, SAVE_DONE, CLOSED, ATTACHED = range(6)
+"""Where each value lives in the header"""
+PATH_BYTES = 1024
+"""Space for the path of a requested figure save, after the header"""
+
+
+class SharedSampleHistory(SampleHistory):
+    """SampleHistory kept in shared memory, so another process can read it while this one writes"""
+
+    def __init__(self, columns: list[str], capacity: int = 2**18, name: str = None):
+        """Creates a new shared history, or attaches to an existing one
+
+        Args:
+            columns (list[str]): column names
+            capacity (int, optional): Number of most recent samples kept. Defaults to 2**18.
+            name (str, optional): Shared memory name of an existing history to attach to. Defaults to creating a new one.
+        """
+        self.columns = tuple(columns)
+        self.capacity = capacity
+        header_size = HEADER_LEN * 8 + PATH_BYTES
+        size = header_size + len(columns) * 2 * capacity * 8
+        self.owner = name is None
+        """Whether this process created the shared memory, and so should free it"""
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        if not self.owner and sys.platform != "win32":
+            # Only the creator should free the memory, don't let this process's resource tracker do it on exit
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        self.header = np.ndarray((HEADER_LEN,), dtype=np.int64, buffer=self.shm.buf)
+        self._path = np.ndarray(
+            (PATH_BYTES,), dtype=np.uint8, buffer=self.shm.buf, offset=HEADER_LEN * 8
+        )
+        self._data = np.ndarray(
+            (len(columns), 2 * capacity),
+            dtype=np.float64,
+            buffer=self.shm.buf,
+            offset=header_size,
+        )
+        if self.owner:
+            self.header[:] = 0
+        else:
+            self.header[ATTACHED] = 1
+
+    @property
+    def count(self) -> int:
+        """Total number of samples appended, including ones since overwritten"""
+        return int(self.header[COUNT])
+
+    @count.setter
+    def count(self, value: int):
+        self.header[COUNT] = value
+
+    @property
+    def start(self) -> int:
+        """Index of the oldest sample still wanted, see discard()"""
+        return int(self.header[START])
+
+    @start.setter
+    def start(self, value: int):
+        self.header[START] = value
+
+    def close(self):
+        """Detaches from the shared memory. If this process created it, tells readers no more samples are coming
+        and frees it. Readers that have already attached keep their view of it, but one that hasn't yet can't
+        attach any more, so wait for them first, see PlotViewer.close()."""
+        if self.owner:
+            self.header[CLOSED] = 1
+        self.header = self._path = self._data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class PlotViewer:
+    """Acquisition side handle to a live plot running in another process"""
+
+    def __init__(self, columns: list[str], capacity: int = 2**18):
+        """Creates the shared history to plot from. Append samples to history, then call start().
+
+        Args:
+            columns (list[str]): column names
+            capacity (int, optional): Number of most recent samples kept. Defaults to 2**18.
+        """
+        self.history = SharedSampleHistory(columns, capacity)
+        """Samples to plot"""
+        self.process = None
+
+    def start(self, plot_settings: dict):
+        """Opens the plot window in a new process
+
+        Args:
+            plot_settings (dict): what to plot, see plot_from_settings()
+        """
+        settings = dict(plot_settings)
+        settings["shared_memory"] = self.history.shm.name
+        settings["columns"] = list(self.history.columns)
+        settings["capacity"] = self.history.capacity
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "Plotting.plotviewer", json.dumps(settings)]
+        )
+
+    def request_save(self, path: str, timeout: float = 10) -> bool:
+        """Asks the viewer to save the figure, as a transparent image, and waits until it has
+
+        Args:
+            path (str): where to save it
+            timeout (float, optional): Longest to wait (s). Defaults to 10.
+
+        Returns:
+            bool: whether the figure was saved
+        """
+        header = self.history.header
+        encoded = path.encode()[: PATH_BYTES - 1]
+        self.history._path[:] = 0
+        self.history._path[: len(encoded)] = np.frombuffer(encoded, dtype=np.uint8)
+        header[SAVE_REQUESTED] += 1
+
+        end_time = time() + timeout
+        while header[SAVE_DONE] != header[SAVE_REQUESTED]:
+            if (
+                time() >= end_time
+                or self.process is None
+                or self.process.poll() is not None
+            ):
+                print("Live plot didn't save the figure to {:}".format(path))
+                return False
+            sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 10):
+        """Tells the viewer no more samples are coming. The window stays open until the user closes it. Waits for the
+        viewer to attach to the shared history first, or to exit, so freeing the history can't pull it out from under
+        a viewer that's still starting up.
+
+        Args:
+            timeout (float, optional): Longest to wait for the viewer to attach (s). Defaults to 10.
+        """
+        header = self.history.header
+        end_time = time() + timeout
+        while (
+            self.process is not None
+            and not header[ATTACHED]
+            and self.process.poll() is None
+        ):
+            if time() >= end_time:
+                print("Live plot never attached to its data, closing it anyway")
+                break
+            sleep(0.01)
+        self.history.close()
+
+
+def plot_from_settings(settings: dict):
+    """Draws a shared history live until the window is closed. Runs in the viewer process.
+
+    Args:
+        settings (dict): has "shared_memory", "columns" and "capacity" to attach to the history, an optional
+            "title", "x" with the "column", "label", optional "scale", "window" (s) and "follow_time" of the
+            x axis, and "series", a list with the "column", "label", "axis_label", "color", and optional
+            "scale", "bottom" and "top_at_least" ({"column", "scale"}) of each line. Each series gets its own
+            y axis.
+    """
+    import matplotlib.pyplot as plt
+    from Plotting.liveplot import LivePlot
+
+    history = SharedSampleHistory(
+        settings["columns"], settings["capacity"], settings["shared_memory"]
+    )
+    index = {name: i for i, name in enumerate(history.columns)}
+
+    fig = plt.figure(figsize=(7.2, 4.8))
+    x_settings = settings["x"]
+    ax1 = fig.add_subplot(1, 1, 1)
+    ax1.set_xlabel(x_settings["label"])
+    if "title" in settings:
+        plt.title(settings["title"])
+
+    live_plot = LivePlot(
+        fig, x_settings.get("window", 30), x_settings.get("follow_time", True)
+    )
+    for i, series in enumerate(settings["series"]):
+        color = series["color"]
+        if i == 0:
+            ax = ax1
+            ax.grid(True)
+            ax.spines["left"].set_color(color)
+        else:
+            ax = ax1.twinx()
+            ax.grid(False)
+            ax.spines["left"].set_alpha(
+                0
+            )  # hide extra left y axes to show the first one
+            ax.spines["right"].set_color(color)
+            if i > 1:
+                ax.spines["right"].set_position(
+                    ("outward", 10 * (i - 1))
+                )  # move it further right to prevent overlap
+        ax.set_ylabel(series["axis_label"], color=color)
+        ax.tick_params(axis="y", colors=color)
+        live_plot.add_line(ax, color, series["label"], y_limits(series, history, index))
+
+    def plot_data():
+        """Gets the latest samples, scaled for display"""
+        columns = history.view()
+        x = columns[index[x_settings["column"]]] * x_settings.get("scale", 1)
+        ys = [
+            columns[index[s["column"]]] * s.get("scale", 1) for s in settings["series"]
+        ]
+        return (x, *ys)
+
+    def check_requests():
+        """Saves the figure if the acquisition side asked for it, and stops redrawing once it's finished"""
+        header = history.header
+        requested = header[SAVE_REQUESTED]
+        if requested != header[SAVE_DONE]:
+            path = bytes(history._path).split(b"\0", 1)[0].decode()
+            live_plot.savefig(path, transparent=True)
+            header[SAVE_DONE] = requested
+        elif header[CLOSED]:
+            live_plot.update(*plot_data())
+            live_plot.stop()
+            request_timer.stop()
+
+    live_plot.start(plot_data, interval=50)
+    request_timer = fig.canvas.new_timer(interval=100)
+    request_timer.add_callback(check_requests)
+    request_timer.start()
+    plt.show()
+    history.close()
+
+
+def y_limits(series: dict, history: SharedSampleHistory, index: dict):
+    """Builds the y limits function for one series' settings
+
+    Args:
+        series (dict): the series' settings, see plot_from_settings()
+        history (SharedSampleHistory): the shared history, for "top_at_least"
+        index (dict): column index of each column name
+
+    Returns:
+        function: takes the series' y values and returns the (bottom, top) to show
+    """
+    bottom = series.get("bottom")
+    top_at_least = series.get("top_at_least")
+
+    def limits(y: np.ndarray) -> tuple[float, float]:
+        lo = bottom if bottom is not None else np.min(y)
+        hi = np.max(y)
+        if top_at_least is not None and history.count > 0:
+            latest = history.view(1)[index[top_at_least["column"]]][-1]
+            hi = max(hi, top_at_least.get("scale", 1) * latest)
+        return lo, hi
+
+    return limits
+
+
+if __name__ == "__main__":
+    plot_from_settings(json.loads(sys.argv[1]))
@@ -0,0 +1,282 @@
+"""What a test protocol provides for ExperimentRunner to run it, see Runner/runner.py"""
+
+from time import time
+
+
+class Protocol:
+    """One kind of test. ExperimentRunner reads the load cell, logs, plots, checks the safety limits and saves the
+    figure the same way for every protocol, so a protocol only decides how the actuator moves. It does that through
+    hooks the runner's control thread calls, each given the runner for its actuator, scale, and the actuator state
+    and gap read at the start of the cycle:
+
+    - approach() every control cycle until it returns True, to bring the hammer to where the test starts
+    - start() once, when the test becomes active
+    - control_step() every control cycle while the test is active
+    - step_transition() whenever step_complete() says the current step is over, returning False after the last one
+    - teardown() once the test is over, however it ended
+
+    A new protocol subclasses this, or ContactProtocol, overrides what it needs, and is added to PROTOCOLS in
+    Runner/protocols.py.
+    """
+
+    name = "run"
+    """Start of the run's file names, after the date"""
+    settings_path = "test_settings.json"
+    """Settings file the protocol's defaults come from"""
+    data_dir = "data"
+    """Folder the run's files are saved in"""
+    target_label = None
+    """CSV label of the target column, formatted with the load cell units, or None if the protocol has no target"""
+    max_force = 80
+    """Force beyond which the test stops (load cell units), or None to not check"""
+    home_margin_mm = None
+    """Closest the actuator may come back to home during the test before it stops (mm), or None to not check"""
+    check_hard_stop = True
+    """Whether the test stops if the hammer reaches the hard stop"""
+    keep_history = 100
+    """Number of plotted samples from before the test kept once it starts"""
+
+    def __init__(
+        self,
+        settings: dict,
+        sample_str: str = "",
+        sample_volume: float = 0,
+        start_gap: float = 0,
+        step_duration: float = None,
+    ):
+        """Creates a protocol for one run
+
+        Args:
+            settings (dict): settings from settings_path
+            sample_str (str, optional): What the sample is made of, used in file names. Defaults to "".
+            sample_volume (float, optional): Amount of sample (m^3). Defaults to 0.
+            start_gap (float, optional): Gap between hammer and hard stop at the actuator's home (mm). Defaults to 0.
+            step_duration (float, optional): Length of each step (s). Defaults to steps not ending on time.
+        """
+        self.settings = settings
+        self.sample_str = sample_str
+        self.sample_volume = sample_volume
+        self.start_gap = start_gap
+        self.step_duration = step_duration
+
+    def parameters(self) -> dict:
+        """Gets what the run was set up with, saved in the run's metadata
+
+        Returns:
+            dict: the parameters, JSON serializable
+        """
+        return {
+            "protocol": self.name,
+            "sample_str": self.sample_str,
+            "sample_volume": self.sample_volume,
+            "start_gap": self.start_gap,
+            "step_duration": self.step_duration,
+        }
+
+    def file_label(self, units: str) -> str:
+        """Gets what goes between the date and "-data" in the run's file names
+
+        Args:
+            units (str): load cell units
+
+        Returns:
+            str: the label
+        """
+        return "{:}_{:}_{:d}mL".format(
+            self.name, self.sample_str, round(self.sample_volume * 1e6)
+        )
+
+    def step_mode(self) -> int:
+        """Gets the actuator microstepping mode the protocol runs in
+
+        Returns:
+            int: the step mode
+        """
+        return self.settings.get("actuator_step_mode", 4)
+
+    def configure_actuator(self, actuator):
+        """Sets the actuator's speed and acceleration limits before the run
+
+        Args:
+            actuator (TicActuator): the actuator
+        """
+        actuator.set_max_accel_mmss(
+            self.settings.get("actuator_max_accel_mmss", 20), True
+        )
+        actuator.set_max_speed_mms(self.settings.get("actuator_max_speed_mms", 5))
+
+    def columns(self, units: str) -> list[tuple]:
+        """Gets the protocol's own log columns, added after the ones every run has
+
+        Args:
+            units (str): load cell units
+
+        Returns:
+            list[tuple]: DataLogger columns
+        """
+        return []
+
+    def row(self, runner, shared) -> tuple:
+        """Gets the values of the protocol's own log columns, other than constants. Called from the logging thread.
+
+        Args:
+            runner (ExperimentRunner): the runner
+            shared: the runner's live values as read for the row
+
+        Returns:
+            tuple: one value per column
+        """
+        return ()
+
+    def plot(self, units: str) -> dict:
+        """Gets the live plot's settings, see plot_from_settings() in Plotting/plotviewer.py. The history has time,
+        force, gap, yield_stress and target columns. Plots plot_series() against time by default.
+
+        Args:
+            units (str): load cell units
+
+        Returns:
+            dict: the plot's title, x axis and series
+        """
+        return {
+            "title": "Sample: {:}".format(self.sample_str),
+            "x": {"column": "time", "label": "Time [s]", "window": 30},
+            "series": self.plot_series(units),
+        }
+
+    def plot_series(self, units: str) -> list[dict]:
+        """Gets what to draw against time on the live plot
+
+        Args:
+            units (str): load cell units
+
+        Returns:
+            list[dict]: the series
+        """
+        return [
+            {
+                "column": "force",
+                "label": "Force",
+                "axis_label": "Force [{:}]".format(units),
+                "color": "C0",
+            },
+            {
+                "column": "gap",
+                "label": "Gap",
+                "axis_label": "Gap [mm]",
+                "color": "C1",
+                "scale": 1000,
+                "bottom": 0,
+            },
+        ]
+
+    def on_force(self, force: float, dt: float) -> float:
+        """Takes every force measurement as it arrives. Called from the load cell thread.
+
+        Args:
+            force (float): force measurement
+            dt (float): time since the previous measurement (s)
+
+        Returns:
+            float: control error to share with the other threads
+        """
+        return 0
+
+    def first_target(self) -> float:
+        """Gets the target shown before the test starts
+
+        Returns:
+            float: the target
+        """
+        return 0
+
+    def approach(self, runner) -> bool:
+        """Brings the hammer to where the test starts, a control cycle at a time
+
+        Args:
+            runner (ExperimentRunner): the runner
+
+        Returns:
+            bool: True once the test should start
+        """
+        return True
+
+    def start(self, runner):
+        """Starts the test
+
+        Args:
+            runner (ExperimentRunner): the runner
+        """
+        pass
+
+    def control_step(self, runner):
+        """Commands the actuator for one control cycle of the test
+
+        Args:
+            runner (ExperimentRunner): the runner
+        """
+        pass
+
+    def step_complete(self, runner) -> bool:
+        """Checks whether the current step is over. Steps end after step_duration by default.
+
+        Args:
+            runner (ExperimentRunner): the runner
+
+        Returns:
+            bool: True if it's time for step_transition()
+        """
+        return (
+            self.step_duration is not None
+            and time() - runner.step_start_time >= self.step_duration
+        )
+
+    def step_transition(self, runner) -> bool:
+        """Moves on to the next step. runner.step_id is still the step that ended. There's only one step by default.
+
+        Args:
+            runner (ExperimentRunner): the runner
+
+        Returns:
+            bool: False if the step that ended was the last, which ends the test
+        """
+        return False
+
+    def teardown(self, runner) -> bool:
+        """Parks the actuator after the test
+
+        Args:
+            runner (ExperimentRunner): the runner
+
+        Returns:
+            bool: whether the actuator got back home
+        """
+        return runner.actuator.go_home_quiet_down()
+
+    def hold(self, runner):
+        """Stops the actuator where it is after the test, instead of teardown(), when the next stage of a sequence
+        carries on with the same sample
+
+        Args:
+            runner (ExperimentRunner): the runner
+        """
+        runner.actuator.set_vel_mms(0)
+
+
+class ContactProtocol(Protocol):
+    """Protocol that starts once the hammer touches the sample: the approach moves down at a fixed speed until
+    the force passes a threshold"""
+
+    approach_velocity = -1
+    """Speed to approach the sample at (mm/s)"""
+    force_threshold = 0.6
+    """Force that means the hammer has touched the sample (load cell units)"""
+    home_margin_mm = 1
+
+    def approach(self, runner) -> bool:
+        if runner.cycle == 0:
+            runner.actuator.set_vel_mms(self.approach_velocity)
+        if runner.live.force > self.force_threshold:
+            print("Force threshold met, starting the test.")
+            return True
+        return False
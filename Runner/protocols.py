@@ -0,0 +1,832 @@
+"""The test protocols ExperimentRunner can run, one small class each. See Runner/protocol.py for the hooks."""
+
+import importlib
+import math
+from time import time
+import numpy as np
+from squeezeflowrheometer import SqueezeFlowRheometer as sfr
+from Control.forcecontroller import ForcePIDController
+from Control.squeezeflowmodel import SqueezeFlowModel
+from Control.steadystate import SteadyStateDetector
+from LoadCell.openscale import OpenScale
+from Runner.protocol import Protocol, ContactProtocol
+
+HAMMER_RADIUS = 25e-3  # m
+HAMMER_AREA = math.pi * HAMMER_RADIUS**2  # m^2
+
+
+class ForceStepsProtocol(ContactProtocol):
+    """Holds the force at each of a series of increasing targets for a set time, with ForcePIDController.
+    One target with no step duration is the old PID_squeeze_flow_1.py test.
+
+    With "enabled": true in the "feedforward" block of the settings, the controller adds the velocity a
+    SqueezeFlowModel fitted during the test says holds the target, see ForcePIDController.
+
+    With "enabled": true in the "steady_state" block of the settings, a step also ends once it has lasted min_step_s
+    and the yield stress estimate, gap and force have all settled over the last window_s, see SteadyStateDetector.
+    The step duration is then the longest a step lasts. Otherwise every step lasts the step duration.
+    """
+
+    name = "PID_squeeze_flow_1"
+    target_label = "Target Force ({:})"
+    multistep_control = True
+    """Whether to use ForcePIDController's multistep control law, rather than the single target one"""
+
+    def __init__(self, settings: dict, targets: list[float], **kwargs):
+        """Creates a force steps protocol
+
+        Args:
+            settings (dict): test settings, with the controller gains
+            targets (list[float]): strictly increasing target forces (load cell units)
+            kwargs: sample_str, sample_volume, start_gap and step_duration, see Protocol
+        """
+        super().__init__(settings, **kwargs)
+        self.targets = list(targets)
+        self.controller = ForcePIDController.from_settings(
+            settings, multistep=self.multistep_control
+        )
+        """Force control law, holds the gains as well as the error and its integral and derivative"""
+        self.controller.target = self.targets[0]
+        self.detectors = {}
+        """SteadyStateDetector of the yield stress, gap and force by name, empty if steps only end on time"""
+        steady_state = settings.get("steady_state", {})
+        if steady_state.get("enabled", False):
+            window = steady_state["window_s"]
+            self.detectors = {
+                "yield_stress": SteadyStateDetector(
+                    window,
+                    steady_state["yield_stress_drift"],
+                    steady_state.get("yield_stress_noise"),
+                ),
+                "gap": SteadyStateDetector(window, steady_state["gap_drift"]),
+                "force": SteadyStateDetector(
+                    window,
+                    steady_state["force_drift"],
+                    steady_state.get("force_noise"),
+                ),
+            }
+
+    @classmethod
+    def from_input(cls, scale, settings: dict):
+        """Asks the user for the protocol's details
+
+        Args:
+            scale (OpenScale): the load cell
+            settings (dict): test settings
+
+        Returns:
+            ForceStepsProtocol: the protocol
+        """
+        targets = sfr.input_targets(scale.units, settings)
+        protocol = cls(settings, targets)
+        protocol.start_gap = sfr.input_start_gap(scale)
+        protocol.step_duration = sfr.input_step_duration(settings["test_duration"])
+        protocol.sample_volume = sfr.input_sample_volume()
+        protocol.sample_str = input(
+            "What's the sample made of? This will be used for file naming. "
+        )
+        return protocol
+
+    def parameters(self) -> dict:
+        return {**super().parameters(), "targets": self.targets}
+
+    def file_label(self, units: str) -> str:
+        return "{:}_{:}_{:d}mL_{:d}{:}".format(
+            self.name,
+            self.sample_str,
+            round(self.sample_volume * 1e6),
+            round(self.targets[0]),
+            units,
+        )
+
+    def columns(self, units: str) -> list[tuple]:
+        return [
+            # never estimated in a force controlled test, kept so the CSV reads as it always has
+            ("eta_guess", "Viscosity (Pa.s)", "f8", 0),
+            ("spread_beyond_hammer", " Spread beyond hammer?", "?", False),
+            ("error", " Error", "f8"),
+            ("K_P", " K_P", "f8"),
+            ("int_error", " Integrated Error", "f8"),
+            ("K_I", " K_I", "f8", self.controller.K_I),
+            ("der_error", " Error Derivative", "f8"),
+            ("K_D", " K_D", "f8", self.controller.K_D),
+            ("vel_FF", " Feedforward Velocity (mm/s)", "f8"),
+            ("model_yield_stress", " Model Yield Stress (Pa)", "f8"),
+            ("model_consistency", " Model Consistency (Pa.s^n)", "f8"),
+            ("steady", " Steady?", "?"),
+        ]
+
+    def row(self, runner, shared) -> tuple:
+        controller = self.controller
+        model = controller.model
+        return (
+            shared.error,
+            controller.variable_K_P(shared.error, shared.target),
+            controller.int_error,
+            controller.der_error,
+            controller.vel_FF,
+            model.yield_stress if model is not None else math.nan,
+            model.consistency if model is not None else math.nan,
+            self.steady(),
+        )
+
+    def plot_series(self, units: str) -> list[dict]:
+        force, gap = super().plot_series(units)
+        force["bottom"] = -0.5
+        force["top_at_least"] = {"column": "target", "scale": 2}
+        return [
+            force,
+            gap,
+            {
+                "column": "yield_stress",
+                "label": "Yield Stress",
+                "axis_label": "Yield Stress [Pa]",
+                "color": "C2",
+            },
+        ]
+
+    def on_force(self, force: float, dt: float) -> float:
+        self.controller.update_error(force, dt)
+        return self.controller.error
+
+    def first_target(self) -> float:
+        return self.targets[0]
+
+    def approach(self, runner) -> bool:
+        if super().approach(runner):
+            return True
+        # reset integrated error - prevent integral windup
+        self.controller.reset_integral()
+        return False
+
+    def start(self, runner):
+        if self.settings.get("feedforward", {}).get("enabled", False):
+            self.controller.model = SqueezeFlowModel.from_settings(
+                self.settings["feedforward"],
+                self.sample_volume,
+                HAMMER_RADIUS,
+                OpenScale.grams_to_N(1),
+            )
+        self.controller.start(self.targets[0], runner.gap)
+        for detector in self.detectors.values():
+            detector.reset()
+
+    def control_step(self, runner):
+        controller = self.controller
+        controller.update_model(
+            runner.live.force,
+            runner.gap,
+            runner.state.velocity_mms,
+            1 / runner.control_rate,
+        )
+        v_new, vel_P, vel_I, vel_D = controller.velocity(runner.gap)
+        runner.actuator.set_vel_mms(v_new)
+
+        out_str = "{:6.2f}{:}, err = {:6.2f}, errI = {:6.2f}, errD = {:7.2f}, gap = {:6.2f}, v = {:11.5f} : vP = {:6.2f}, vI = {:6.2f}, vD = {:6.2f}, vFF = {:8.5f}".format(
+            runner.live.force,
+            runner.scale.units,
+            controller.error,
+            controller.int_error,
+            controller.der_error,
+            runner.gap * 1000,
+            v_new,
+            vel_P,
+            vel_I,
+            vel_D,
+            controller.vel_FF,
+        )
+        print(out_str)
+
+        now = time()
+        force = runner.live.force
+        self.detectors_update(
+            now,
+            yield_stress=sfr.yield_stress_guess(force, runner.gap, self.sample_volume),
+            gap=runner.gap,
+            force=force,
+        )
+
+    def detectors_update(self, t: float, **values):
+        """Adds a sample to each steady state detector
+
+        Args:
+            t (float): time of the sample (s)
+            values: sample for each detector, by name
+        """
+        for name, detector in self.detectors.items():
+            detector.update(t, values[name])
+
+    def steady(self) -> bool:
+        """Whether every steady state detector says its signal has settled
+
+        Returns:
+            bool: True if steady, always False if steps only end on time
+        """
+        return len(self.detectors) > 0 and all(
+            detector.steady() for detector in self.detectors.values()
+        )
+
+    def step_complete(self, runner) -> bool:
+        if super().step_complete(runner):
+            return True
+        if len(self.detectors) == 0:
+            return False
+        step_time = time() - runner.step_start_time
+        if step_time < self.settings["steady_state"].get("min_step_s", 0):
+            return False
+        if not self.steady():
+            return False
+        print("Steady after {:.1f}s.".format(step_time))
+        return True
+
+    def step_transition(self, runner) -> bool:
+        for detector in self.detectors.values():
+            detector.reset()
+        step_id = runner.step_id + 1
+        if step_id >= len(self.targets):
+            return False
+        target = self.targets[step_id]
+        self.controller.next_step(target)
+        runner.live.write(target=target)
+        return True
+
+
+class ForceHoldProtocol(ForceStepsProtocol):
+    """Holds the force at one target for a set time with the single target control law of PID_squeeze_flow_1.py and
+    PID_squeeze_flow_timed.py: the full PID, not scaled by the gap, only ever moving down.
+    """
+
+    multistep_control = False
+
+    @classmethod
+    def from_input(cls, scale, settings: dict):
+        """Asks the user for the protocol's details
+
+        Args:
+            scale (OpenScale): the load cell
+            settings (dict): test settings
+
+        Returns:
+            ForceHoldProtocol: the protocol
+        """
+        target = sfr.find_num_in_str(
+            input("Please give the target force in [{:}]: ".format(scale.units))
+        )
+        protocol = cls(settings, [target])
+        protocol.start_gap = sfr.input_start_gap(scale)
+        protocol.step_duration = sfr.input_step_duration(settings["test_duration"])
+        protocol.sample_volume = sfr.input_sample_volume()
+        protocol.sample_str = input(
+            "What's the sample made of? This will be used for file naming. "
+        )
+        return protocol
+
+    def step_mode(self) -> int:
+        return 4
+
+    def configure_actuator(self, actuator):
+        actuator.set_max_accel_mmss(20, True)
+        actuator.set_max_speed_mms(5)
+
+
+class ConstantStrainRateProtocol(ContactProtocol):
+    """Squeezes the sample from where it's touched down to a minimum gap at a constant strain rate"""
+
+    name = "constant_strain_rate_squeeze_flow"
+    approach_velocity = -0.5
+
+    def __init__(self, settings: dict, min_gap: float, **kwargs):
+        """Creates a constant strain rate protocol
+
+        Args:
+            settings (dict): test settings
+            min_gap (float): gap to squeeze down to (mm)
+            kwargs: sample_str, sample_volume, start_gap and step_duration, the time to reach min_gap in, see Protocol
+        """
+        super().__init__(settings, **kwargs)
+        self.min_gap = min_gap
+        self.strain_rate = 0
+        """Strain rate (1/s) worked out when the sample is touched"""
+
+    @classmethod
+    def from_input(cls, scale, settings: dict):
+        """Asks the user for the protocol's details
+
+        Args:
+            scale (OpenScale): the load cell
+            settings (dict): test settings
+
+        Returns:
+            ConstantStrainRateProtocol: the protocol
+        """
+        min_gap = sfr.find_num_in_str(input("What's the target minimum gap in mm? "))
+        protocol = cls(settings, min_gap)
+        protocol.start_gap = sfr.input_start_gap(scale)
+        protocol.step_duration = sfr.input_step_duration(settings["test_duration"])
+        protocol.sample_volume = sfr.input_sample_volume()
+        protocol.sample_str = input(
+            "What's the sample made of? This will be used for file naming. "
+        )
+        return protocol
+
+    def parameters(self) -> dict:
+        return {**super().parameters(), "min_gap": self.min_gap}
+
+    def file_label(self, units: str) -> str:
+        return "{:}_{:}mm".format(super().file_label(units), self.min_gap)
+
+    def columns(self, units: str) -> list[tuple]:
+        return [("strain_rate", "Strain Rate (1/s)", "f8")]
+
+    def row(self, runner, shared) -> tuple:
+        return (self.strain_rate,)
+
+    def start(self, runner):
+        initial_gap = runner.gap * 1000
+        self.strain_rate = math.log(initial_gap / self.min_gap) / self.step_duration
+        print(
+            "Squeezing from {:.2f}mm to {:.2f}mm at {:.5f}/s".format(
+                initial_gap, self.min_gap, self.strain_rate
+            )
+        )
+
+    def control_step(self, runner):
+        v = -(1000 * runner.gap) * self.strain_rate
+        runner.actuator.set_vel_mms(v)
+        print(
+            "{:6.2f}{:}, gap = {:6.2f}, v = {:11.5f}, strain rate = {:}".format(
+                runner.live.force,
+                runner.scale.units,
+                runner.gap * 1000,
+                v,
+                self.strain_rate,
+            )
+        )
+
+    def step_complete(self, runner) -> bool:
+        return super().step_complete(runner) or 1000 * runner.gap <= self.min_gap
+
+
+class FixedSpeedProtocol(Protocol):
+    """Moves to a start gap, then squeezes the sample at a fixed speed until a safety limit stops it, estimating
+    the Newtonian viscosity as it goes"""
+
+    name = "fixed_speed_squeeze_flow"
+    target_label = "Target Speed (mm/s)"
+    home_margin_mm = 1
+    approach_velocity = -2
+    """Speed to move to the test's start gap at (mm/s)"""
+
+    def __init__(self, settings: dict, speed: float, test_gap: float, **kwargs):
+        """Creates a fixed speed protocol
+
+        Args:
+            settings (dict): test settings
+            speed (float): squeezing speed (mm/s)
+            test_gap (float): gap to start squeezing at (mm)
+            kwargs: sample_str, sample_volume and start_gap, the gap when loaded, see Protocol
+        """
+        super().__init__(settings, **kwargs)
+        self.speed = abs(speed)
+        self.test_gap = abs(test_gap)
+        self.eta_guess = 0
+        """Estimate of newtonian viscosity of sample (Pa.s)"""
+        self.spread_beyond_hammer = False
+        """Whether or not the sample has spread beyond the hammer. This will happen if gap gets too thin."""
+
+    @classmethod
+    def from_input(cls, scale, settings: dict):
+        """Asks the user for the protocol's details
+
+        Args:
+            scale (OpenScale): the load cell
+            settings (dict): test settings
+
+        Returns:
+            FixedSpeedProtocol: the protocol
+        """
+        speed = sfr.find_num_in_str(input("Enter the target velocity in [mm/s]: "))
+        print("Target velocity is {:.2f}mm/s".format(speed))
+        start_gap = sfr.input_start_gap(scale)
+        test_gap = sfr.find_num_in_str(
+            input(
+                "Enter the gap to start the test at in [mm]. Rheometer will move from current loading gap to the start gap and then start the test: "
+            )
+        )
+        print("Test start gap is {:.2f}mm".format(test_gap))
+        protocol = cls(settings, speed, test_gap, start_gap=start_gap)
+        protocol.sample_volume = sfr.input_sample_volume()
+        protocol.sample_str = input(
+            "What's the sample made of? This will be used for file naming. "
+        )
+        return protocol
+
+    def parameters(self) -> dict:
+        return {**super().parameters(), "speed": self.speed, "test_gap": self.test_gap}
+
+    def file_label(self, units: str) -> str:
+        return "{:}_{:g}mms".format(super().file_label(units), self.speed)
+
+    def step_mode(self) -> int:
+        return 4
+
+    def configure_actuator(self, actuator):
+        actuator.set_max_accel_mmss(20, True)
+        actuator.set_max_speed_mms(5)
+
+    def columns(self, units: str) -> list[tuple]:
+        return [
+            ("eta_guess", "Viscosity (Pa.s)", "f8"),
+            ("spread_beyond_hammer", " Spread beyond hammer?", "?"),
+        ]
+
+    def row(self, runner, shared) -> tuple:
+        return (self.eta_guess, self.spread_beyond_hammer)
+
+    def first_target(self) -> float:
+        return self.speed
+
+    def approach(self, runner) -> bool:
+        if runner.cycle == 0:
+            runner.actuator.set_vel_mms(self.approach_velocity)
+        if runner.gap * 1000 <= self.test_gap:
+            print("Reached start gap, test now active.")
+            return True
+        return False
+
+    def start(self, runner):
+        runner.actuator.set_vel_mms(-self.speed)
+
+    def control_step(self, runner):
+        gap = runner.gap
+        force = runner.live.force
+        velocity_mms = runner.state.velocity_mms
+
+        # Check if sample spread beyond hammer, but only perform the check if it hasn't already
+        hammer_volume = gap * HAMMER_AREA  # volume under hammer
+        if not self.spread_beyond_hammer:
+            self.spread_beyond_hammer = self.sample_volume > hammer_volume
+
+        # Guess Newtonian viscosity
+        visc_volume = min(self.sample_volume, hammer_volume)
+        if visc_volume > 0 and velocity_mms != 0:
+            self.eta_guess = abs(
+                2
+                * math.pi
+                * gap**5
+                * OpenScale.grams_to_N(force)
+                / 3
+                / visc_volume**2
+                / (velocity_mms / 1000)
+            )  # Pa.s
+
+        print(
+            "{:6.2f}{:}, v = {:11.5f}, pos = {:6.2f}, gap = {:6.2f}".format(
+                force,
+                runner.scale.units,
+                velocity_mms,
+                runner.state.position_mm,
+                gap * 1000.0,
+            )
+        )
+
+
+class SetGapStepsProtocol(Protocol):
+    """Steps down through a series of gaps, resting at each one, without force control"""
+
+    name = "set_gap_squeeze_flow"
+    target_label = "Target Gap (mm)"
+
+    def __init__(
+        self,
+        settings: dict,
+        gaps: list[float] = None,
+        rest_time: float = 45,
+        max_strain_rate: float = 0.05,
+        **kwargs,
+    ):
+        """Creates a set gap protocol
+
+        Args:
+            settings (dict): test settings
+            gaps (list[float], optional): Gaps to step through (mm). Defaults to 20 evenly spaced in log from 3mm
+                down to half the gap the sample would fill the hammer at.
+            rest_time (float, optional): How long to sit at each gap once it's reached (s). Defaults to 45.
+            max_strain_rate (float, optional): Strain rate each move is limited to (1/s). Defaults to 0.05.
+            kwargs: sample_str, sample_volume and start_gap, see Protocol
+        """
+        super().__init__(settings, **kwargs)
+        if gaps is None:
+            min_gap = self.sample_volume / HAMMER_AREA * 1000  # mm
+            gaps = np.geomspace(3, 0.5 * min_gap, 20).tolist()
+        self.gaps = list(gaps)
+        self.rest_time = rest_time
+        self.max_strain_rate = max_strain_rate
+        self.reached_time = None
+        """When the current gap was reached, or None if the actuator is still moving"""
+
+    @classmethod
+    def from_input(cls, scale, settings: dict):
+        """Asks the user for the protocol's details
+
+        Args:
+            scale (OpenScale): the load cell
+            settings (dict): test settings
+
+        Returns:
+            SetGapStepsProtocol: the protocol
+        """
+        start_gap = sfr.input_start_gap(scale)
+        sample_volume = sfr.input_sample_volume()
+        sample_str = input(
+            "What's the sample made of? This will be used for file naming. "
+        )
+        return cls(
+            settings,
+            start_gap=start_gap,
+            sample_volume=sample_volume,
+            sample_str=sample_str,
+        )
+
+    def parameters(self) -> dict:
+        return {
+            **super().parameters(),
+            "gaps": self.gaps,
+            "rest_time": self.rest_time,
+            "max_strain_rate": self.max_strain_rate,
+        }
+
+    def configure_actuator(self, actuator):
+        super().configure_actuator(actuator)
+        actuator.set_max_speed_mms(5)
+
+    def first_target(self) -> float:
+        return self.gaps[0]
+
+    def move_to_gap(self, runner, gap: float):
+        """Starts moving to a gap at the strain rate limit
+
+        Args:
+            runner (ExperimentRunner): the runner
+            gap (float): the gap (mm)
+        """
+        print("Target gap is {:.2f}mm".format(gap))
+        runner.actuator.set_max_speed_mms(self.max_strain_rate * gap)
+        runner.actuator.start_move_to_mm(gap - self.start_gap)
+        runner.live.write(target=gap)
+        self.reached_time = None
+
+    def start(self, runner):
+        self.move_to_gap(runner, self.gaps[0])
+
+    def control_step(self, runner):
+        state = runner.state
+        if self.reached_time is None and state.position == state.target_position:
+            print("Reached position, waiting")
+            self.reached_time = time()
+
+    def step_complete(self, runner) -> bool:
+        return (
+            self.reached_time is not None
+            and time() - self.reached_time >= self.rest_time
+        )
+
+    def step_transition(self, runner) -> bool:
+        step_id = runner.step_id + 1
+        if step_id >= len(self.gaps):
+            return False
+        self.move_to_gap(runner, self.gaps[step_id])
+        return True
+
+    def teardown(self, runner) -> bool:
+        actuator = runner.actuator
+        # Come back up through the gaps as slowly as going down
+        for gap in reversed(self.gaps):
+            actuator.set_max_speed_mms(self.max_strain_rate * gap)
+            actuator.heartbeat()
+            actuator.move_to_mm(gap - self.start_gap)
+            actuator.heartbeat()
+
+        actuator.set_max_speed_mms(5)
+        return actuator.go_home_quiet_down()
+
+
+class RetractionProtocol(Protocol):
+    """Moves to a gap, pauses, then pulls the hammer back up at a set speed"""
+
+    name = "retraction"
+    settings_path = "Retraction/retraction_settings.json"
+    data_dir = "Retraction/data"
+
+    def __init__(
+        self, settings: dict, approach_gap: float, retract_speed: float, **kwargs
+    ):
+        """Creates a retraction protocol
+
+        Args:
+            settings (dict): retraction settings
+            approach_gap (float): gap to retract from (mm)
+            retract_speed (float): speed to retract at (mm/s)
+            kwargs: sample_str, sample_volume and start_gap, see Protocol
+        """
+        super().__init__(settings, **kwargs)
+        self.approach_gap = approach_gap
+        self.retract_speed = abs(retract_speed)
+        self.paused_time = None
+        """When the hammer reached the approach gap, or None if it's still on its way"""
+
+    @classmethod
+    def from_input(cls, scale, settings: dict):
+        """Asks the user for the protocol's details
+
+        Args:
+            scale (OpenScale): the load cell
+            settings (dict): retraction settings
+
+        Returns:
+            RetractionProtocol: the protocol
+        """
+        start_gap = sfr.input_start_gap(scale)
+        sample_volume = sfr.input_sample_volume()
+        approach_gap = sfr.input_retract_start_gap(sample_volume, settings)
+        retract_speed = sfr.input_retract_speed(settings)
+        sample_str = input(
+            "What's the sample made of? This will be used for file naming. "
+        )
+        return cls(
+            settings,
+            approach_gap,
+            retract_speed,
+            start_gap=start_gap,
+            sample_volume=sample_volume,
+            sample_str=sample_str,
+        )
+
+    def parameters(self) -> dict:
+        return {
+            **super().parameters(),
+            "approach_gap": self.approach_gap,
+            "retract_speed": self.retract_speed,
+        }
+
+    def file_label(self, units: str) -> str:
+        return "{:}_{:d}mm_{:d}mms".format(
+            super().file_label(units),
+            round(self.approach_gap),
+            round(self.retract_speed),
+        )
+
+    def approach(self, runner) -> bool:
+        actuator = runner.actuator
+        if runner.cycle == 0:
+            retract_start_pos = -self.start_gap + self.approach_gap
+            print("Moving to start position of {:.1f}mm".format(retract_start_pos))
+            actuator.set_max_speed_mms(self.settings["approach_max_speed_mms"])
+            actuator.start_move_to_mm(retract_start_pos)
+            self.paused_time = None
+            return False
+
+        state = runner.state
+        pause_time = self.settings["pause_time_at_gap"]
+        if self.paused_time is None:
+            if state.position != state.target_position:
+                return False
+            print(
+                "Reached start position. Pausing for {:} second(s).".format(pause_time)
+            )
+            actuator.set_max_speed_mms(self.retract_speed)
+            self.paused_time = time()
+        return time() - self.paused_time >= pause_time
+
+    def start(self, runner):
+        print("Starting retraction.")
+        runner.actuator.start_move_to_mm(0)
+
+    def step_complete(self, runner) -> bool:
+        state = runner.state
+        return state.target_position == 0 and state.position == 0
+
+    def teardown(self, runner) -> bool:
+        print("Retraction complete.")
+        return super().teardown(runner)
+
+
+class RigidityProtocol(Protocol):
+    """Measures the frame's stiffness: creeps the hammer down onto the plate, with no sample, until the force
+    reaches end_force"""
+
+    name = "rigidity_test"
+    max_force = None
+    check_hard_stop = False
+    keep_history = 1
+    approach_velocity = -0.002
+    """Speed to perform rigidity test at (mm/s)"""
+    backoff_dist = 0.2
+    """How far above the plate the slow approach starts (mm)"""
+    end_force = 80
+    """Force in grams to push to"""
+
+    @classmethod
+    def from_input(cls, scale, settings: dict):
+        """Asks the user for the protocol's details
+
+        Args:
+            scale (OpenScale): the load cell
+            settings (dict): test settings
+
+        Returns:
+            RigidityProtocol: the protocol
+        """
+        return cls(settings, start_gap=sfr.input_start_gap(scale))
+
+    def file_label(self, units: str) -> str:
+        return self.name
+
+    def plot(self, units: str) -> dict:
+        return {
+            "title": "Rigidity Test",
+            "x": {
+                "column": "gap",
+                "label": "Distance past zero-point [mm]",
+                "scale": -1000,
+                "follow_time": False,
+            },
+            "series": [
+                {
+                    "column": "force",
+                    "label": "Force",
+                    "axis_label": "Force [{:}]".format(units),
+                    "color": "C0",
+                    "bottom": -0.5,
+                },
+            ],
+        }
+
+    def step_mode(self) -> int:
+        return 5
+
+    def configure_actuator(self, actuator):
+        actuator.set_max_accel_mmss(self.settings["actuator_max_accel_mmss"], True)
+        actuator.set_max_speed_mms(5)
+
+    def approach(self, runner) -> bool:
+        # Move to just above the plate
+        if runner.cycle == 0:
+            print("Approaching start point")
+            runner.actuator.start_move_to_mm(-abs(self.start_gap - self.backoff_dist))
+            return False
+        state = runner.state
+        return state.position == state.target_position
+
+    def start(self, runner):
+        print("Reached start point. Now approaching the plate slowly.")
+        runner.actuator.set_vel_mms(self.approach_velocity)
+
+    def control_step(self, runner):
+        print(
+            "F = {:7.3f}{:}, pos = {:8.3f}mm".format(
+                runner.live.force, runner.scale.units, runner.gap * 1000
+            )
+        )
+
+    def step_complete(self, runner) -> bool:
+        return abs(runner.live.force) >= self.end_force
+
+    def teardown(self, runner) -> bool:
+        runner.actuator.set_vel_mms(0)
+        runner.actuator.set_max_speed_mms(5)
+        return super().teardown(runner)
+
+
+PROTOCOLS = {
+    "force_steps": ForceStepsProtocol,
+    "force_hold": ForceHoldProtocol,
+    "constant_strain_rate": ConstantStrainRateProtocol,
+    "fixed_speed": FixedSpeedProtocol,
+    "set_gap_steps": SetGapStepsProtocol,
+    "retraction": RetractionProtocol,
+    "rigidity": RigidityProtocol,
+}
+"""Protocols by the name they're run with"""
+
+
+def protocol_class(name: str) -> type:
+    """Looks up a protocol by name
+
+    Args:
+        name (str): name in PROTOCOLS, or module:Class for a protocol defined elsewhere, e.g. mytests:CreepProtocol
+
+    Raises:
+        ValueError: if there's no such protocol
+
+    Returns:
+        type: the protocol's class
+    """
+    if name in PROTOCOLS:
+        return PROTOCOLS[name]
+    if ":" in name:
+        module_name, class_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), class_name)
+    raise ValueError(
+        "No protocol called {:}, choose from {:}".format(name, ", ".join(PROTOCOLS))
+    )
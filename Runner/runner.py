@@ -0,0 +1,585 @@
+"""Runs any test protocol on the rheometer with one shared acquisition, logging and plotting pipeline.
+
+Three threads do the work: the load cell thread takes every sample the OpenScale sends, the control thread paces
+the protocol's hooks at a fixed rate and checks the safety limits, and the logging thread writes rows to a binary
+run log and feeds the live plot, which draws in its own process. The log becomes the usual CSV once the run ends.
+
+    python -m Runner.runner force_steps [--simulate] [--headless RUN_FILE]
+
+runs a protocol from Runner/protocols.py, asking for its details as the old scripts did, or with --headless, taking
+them from a run file and asking for nothing. A run file is a one-stage sequence, see Runner/sequence.py: the sample
+details with the protocol's "parameters" and any "settings" to change, e.g.
+
+    {"sample_str": "CarbopolB", "sample_volume_mL": 2, "start_gap_mm": "config",
+     "parameters": {"targets": [5, 10, 20], "step_duration": 300}}
+"""
+
+import argparse
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from time import sleep, time
+from Actuator.ticactuator import TicTimeoutError
+from Control.scheduler import FixedRateScheduler
+from Control.sharedstate import SampleHistory, SeqLockRecord
+from DataLogger.datalogger import DataLogger, LOG_EXTENSION, log_to_csv
+from LoadCell.forcefilter import filter_from_settings
+from LoadCell.openscale import OpenScale
+from Plotting.plotviewer import PlotViewer
+from squeezeflowrheometer import SqueezeFlowRheometer as sfr
+
+FORCE_UP_SIGN = 1
+"""Sign of a positive force. This should be 1 or -1, and is used to compute velocity based on force"""
+MAX_RUN_TIME = 7200
+"""Longest a run may last before every thread stops (s)"""
+
+
+class ExperimentRunner:
+    """Runs one protocol, see Runner/protocol.py for the hooks it calls"""
+
+    def __init__(
+        self,
+        protocol,
+        scale: OpenScale,
+        actuator,
+        control_rate: float = 50,
+        log_rate: float = 50,
+        zero_actuator: bool = True,
+        home_after: bool = True,
+        metadata: dict = None,
+        plot: bool = True,
+    ):
+        """Gets a run ready: zeroes the actuator, names the run's files and opens its log
+
+        Args:
+            protocol (Protocol): what to run
+            scale (OpenScale): the load cell, tared
+            actuator (TicActuator): the actuator, configured by the protocol
+            control_rate (float, optional): Rate the protocol's hooks are called at (Hz). Defaults to 50.
+            log_rate (float, optional): Rate rows are logged at (Hz). Defaults to 50.
+            zero_actuator (bool, optional): Whether the actuator is at home and its position should be zeroed,
+                rather than carrying on from an earlier run. Defaults to True.
+            home_after (bool, optional): Whether to park the actuator with the protocol's teardown() after the test,
+                rather than hold() it where it is for another run. It's parked anyway if the test stops early. Defaults to True.
+            metadata (dict, optional): Anything else to save in the run's metadata. Defaults to None.
+            plot (bool, optional): Whether to show the live plot, which needs a display. Defaults to True.
+        """
+        self.protocol = protocol
+        self.scale = scale
+        self.actuator = actuator
+        self.control_rate = control_rate
+        # the control and logging threads share a read within half a control cycle, each cycle still gets a new one
+        actuator.snapshot_max_age = 0.5 / control_rate
+        self.log_rate = log_rate
+        self.home_after = home_after
+
+        self.live = SeqLockRecord(
+            force=0, error=0, target=protocol.first_target(), gap=0, test_active=False
+        )
+        """Latest values shared between threads. force is the current force reading, negative is a force pushing
+        up on the load cell. error is the protocol's control error for that force. target is the current target.
+        gap is the current gap (m) between hammer and hard stop as the actuator last saw it. test_active is whether
+        the test has started and not yet ended."""
+        self.state = None
+        """Actuator state read at the start of the current control cycle"""
+        self.gap = 0
+        """Gap (m) at the start of the current control cycle"""
+        self.cycle = 0
+        """Number of control cycles run so far in the current phase, approach or test"""
+        self.step_id = 0
+        """Which step the test is on, 0 is the first"""
+        self.step_start_time = 0
+        """When the current step started"""
+        self.test_start_time = 0
+        """When the test started"""
+        self.stop_reason = None
+        """Why the test ended early, or None if it hasn't"""
+        self.homed = None
+        """Whether park() got the actuator back home, None if it hasn't been parked, e.g. held for another run"""
+        self.deenergized = False
+        """Whether park() de-energized the actuator"""
+        self.control_scheduler = None
+        """Paces the control loop and records its timing"""
+
+        history_columns = ["time", "force", "gap", "yield_stress", "target"]
+        self.viewer = PlotViewer(history_columns) if plot else None
+        """Live plot, drawn in its own process, or None if there's no plot"""
+        self.history = (
+            self.viewer.history if plot else SampleHistory(history_columns, 2**12)
+        )
+        """Elapsed time, force, gap, yield stress estimate and target as logged, shared with the live plot"""
+
+        if zero_actuator:
+            # Zero current motor position
+            actuator.halt_and_set_position(0)
+        actuator.heartbeat()
+
+        self.date = datetime.now()
+        """When the run started"""
+        self.csv_name = (
+            self.date.strftime("%Y-%m-%d_%H-%M-%S")
+            + "_"
+            + protocol.file_label(scale.units)
+            + "-data.csv"
+        )
+        self.data_dir = Path(protocol.data_dir)
+        self.figure_dir = self.data_dir / "Figures" / self.date.strftime("%Y-%m-%d")
+        # Make sure the data folder as well as the figures folder exists before trying to save anything there
+        self.figure_dir.mkdir(parents=True, exist_ok=True)
+
+        self.log_path = str(
+            self.data_dir / self.csv_name.replace(".csv", LOG_EXTENSION)
+        )
+        self.logger = self._open_log(metadata if metadata is not None else {})
+        """Binary run log, converted to the usual CSV once the run ends"""
+
+    def _open_log(self, metadata: dict) -> DataLogger:
+        """Opens the run's log with the columns every run has followed by the protocol's own"""
+        protocol = self.protocol
+        units = self.scale.units
+        actuator_state = self.actuator.snapshot()
+        columns = [
+            ("cur_time", "Current Time", "f8"),
+            ("cur_duration", "Elapsed Time", "f8"),
+            ("cur_pos_mm", "Current Position (mm)", "f8"),
+            ("cur_pos", "Current Position", "i8"),
+            ("tar_pos", "Target Position", "i8"),
+            ("cur_vel_mms", "Current Velocity (mm/s)", "f8"),
+            ("cur_vel", "Current Velocity", "i8"),
+            ("tar_vel", "Target Velocity", "i8"),
+            ("max_speed", "Max Speed", "i8"),
+            # settings that don't change during the run are kept once, in the header
+            ("max_decel", "Max Decel", "i8", actuator_state.max_decel),
+            ("max_accel", "Max Accel", "i8", actuator_state.max_accel),
+            ("step_mode", "Step Mode", "i8", actuator_state.step_mode),
+            ("vin_voltage", "Voltage In (mV)", "i8"),
+            ("force", "Current Force ({:})".format(units), "f8"),
+        ]
+        if protocol.target_label is not None:
+            columns.append(("target", protocol.target_label.format(units), "f8"))
+        columns += [
+            ("start_gap", "Start Gap (m)", "f8", protocol.start_gap / 1000.0),
+            ("gap", "Current Gap (m)", "f8"),
+            ("yield_stress_guess", "Yield Stress (Pa)", "f8"),
+            ("sample_volume", "Sample Volume (m^3)", "f8", protocol.sample_volume),
+            ("visc_volume", "Viscosity Volume (m^3)", "f8"),
+            ("test_active", " Test Active?", "?"),
+        ]
+        columns += protocol.columns(units)
+
+        return DataLogger(
+            self.log_path,
+            columns,
+            {
+                **protocol.parameters(),
+                "settings": protocol.settings,
+                "load_cell": self.scale.config,
+                **metadata,
+            },
+        )
+
+    def run(self):
+        """Runs the protocol and waits until the run's files are saved"""
+        lc = threading.Thread(name="loadcell", target=self.load_cell_thread)
+        ac = threading.Thread(name="actuator", target=self.actuator_thread)
+        bkg = threading.Thread(name="background", target=self.background)
+        self._threads = (lc, ac, bkg)
+        for thread in self._threads:
+            thread.start()
+
+        if self.viewer is not None:
+            self.viewer.start(self.protocol.plot(self.scale.units))
+        for thread in self._threads:
+            thread.join()
+
+    def stop(self, reason: str):
+        """Ends the test early, e.g. when a safety limit is hit
+
+        Args:
+            reason (str): why, printed and saved in the run's metadata
+        """
+        print(reason)
+        self.stop_reason = reason
+
+    def load_cell_thread(self):
+        """Continuously reads load cell and reports the upward force on the load cell"""
+        _, ac, bkg = self._threads
+        scale = self.scale
+        start_time = time()
+
+        for _ in range(10):  # get rid of first few lines that aren't readings
+            scale.get_line()
+        scale.flush_old_lines()  # and get rid of any others that were generated when we were busy setting up
+
+        # Read every sample the OpenScale reports, rather than just the latest one
+        samples = scale.start_reader()
+        sample_index = samples.count
+
+        prev_time = None
+        while True:
+            sample_times, measurements, sample_index = (
+                scale.get_new_calibrated_measurements(sample_index)
+            )
+            for sample_time, meas in zip(sample_times, measurements):
+                force = meas * FORCE_UP_SIGN
+                # receive time of the sample, not when we got to it
+                dt_force = (sample_time - prev_time) if prev_time is not None else 0
+                prev_time = sample_time
+
+                error = self.protocol.on_force(force, dt_force)
+                self.live.write(force=force, error=error)
+
+            if (time() - start_time) >= MAX_RUN_TIME or (
+                (not ac.is_alive())
+                and (not bkg.is_alive())
+                and (time() - start_time) > 1
+            ):
+                print("Stopping load cell reading")
+                scale.stop_reader()
+                break
+
+    def check_limits(self, test_active: bool) -> bool:
+        """Checks the safety limits at the start of a control cycle
+
+        Args:
+            test_active (bool): whether the test has started, rather than the hammer still approaching
+
+        Returns:
+            bool: True if it's safe to carry on, otherwise stop() has been called
+        """
+        protocol = self.protocol
+        force = self.live.force
+        if protocol.max_force is not None and abs(force) > protocol.max_force:
+            self.stop(
+                "Force was too large, stopping - {:3.2f}{:}".format(
+                    force, self.scale.units
+                )
+            )
+        elif protocol.check_hard_stop and self.gap <= 0:
+            if test_active:
+                self.stop("Hit the hard-stop, stopping.")
+            else:
+                self.stop(
+                    "Hit the hard-stop without ever exceeding threshold force, stopping."
+                )
+        elif (
+            test_active
+            and protocol.home_margin_mm is not None
+            and abs(self.state.position_mm) <= protocol.home_margin_mm
+        ):
+            self.stop("Returned too close to home, stopping.")
+        return self.stop_reason is None
+
+    def _next_cycle(self) -> bool:
+        """Waits for the next control cycle and reads the actuator
+
+        Returns:
+            bool: False if the actuator couldn't be read, which stops the test
+        """
+        self.control_scheduler.wait()
+        try:
+            self.state = self.actuator.snapshot()
+        except TicTimeoutError as e:
+            self.stop("Lost contact with the actuator, stopping. {:}".format(e))
+            return False
+        self.gap = (self.state.position_mm + self.protocol.start_gap) / 1000.0
+        self.live.write(gap=self.gap)
+        return True
+
+    def actuator_thread(self):
+        """Drives actuator through the protocol's hooks"""
+        protocol = self.protocol
+        actuator = self.actuator
+
+        print("Waiting 2 seconds before starting")
+        for _ in range(20):
+            actuator.heartbeat()  # keep a held actuator from timing out
+            sleep(0.1)
+
+        # - Motion Command Sequence ----------------------------------
+
+        actuator.startup()
+        self.control_scheduler = FixedRateScheduler(self.control_rate)
+
+        self.cycle = 0
+        while True:
+            if not self._next_cycle():
+                self.park()
+                return
+            actuator.heartbeat()
+            if not self.check_limits(False):
+                self.park()
+                return
+            if protocol.approach(self):
+                break
+            self.cycle = self.cycle + 1
+
+        # Now that test is active, throw away most of the pre-test data.
+        self.history.discard(protocol.keep_history)
+
+        self.test_start_time = self.step_start_time = time()
+        self.step_id = 0
+        self.live.write(test_active=True)
+        protocol.start(self)
+
+        self.cycle = 0
+        while True:
+            if not self._next_cycle():
+                self.live.write(test_active=False)
+                self.park()
+                return
+            if not self.check_limits(True):
+                break
+            if protocol.step_complete(self):
+                if not protocol.step_transition(self):
+                    print("Last step complete. Test is done.")
+                    break
+                print("Step complete, next step.")
+                self.step_id = self.step_id + 1
+                self.step_start_time = time()
+            protocol.control_step(self)
+            actuator.heartbeat()
+            self.cycle = self.cycle + 1
+
+        self.live.write(test_active=False)
+
+        # Save fig out before it retracts at end of test
+        if self.viewer is not None:
+            self.viewer.request_save(
+                str(
+                    self.figure_dir
+                    / self.csv_name.replace("-data.csv", "-livePlottedFigure.png")
+                )
+            )
+        if self.home_after or self.stop_reason is not None:
+            self.park()
+        else:
+            protocol.hold(self)
+
+    def park(self):
+        """Parks the actuator with the protocol's teardown(). If that fails, e.g. the actuator can't be read, at
+        least de-energizes it, since the Tic's command timeout only stops the motor. Sets homed and deenergized.
+        """
+        try:
+            self.homed = self.protocol.teardown(self) is not False
+            self.deenergized = True
+        except Exception as e:
+            print("Couldn't park the actuator: {:}".format(e))
+            self.homed = False
+            try:
+                self.actuator.deenergize()
+                self.deenergized = True
+            except Exception as e:
+                print("Couldn't de-energize the actuator either: {:}".format(e))
+
+    def background(self):
+        """Records data to the run log"""
+        _, ac, _ = self._threads
+        protocol = self.protocol
+        logger = self.logger
+        has_target = protocol.target_label is not None
+        sample_volume = protocol.sample_volume
+        start_gap = protocol.start_gap
+
+        scheduler = FixedRateScheduler(self.log_rate)
+        start_time = time()
+        while True:
+            scheduler.wait()
+            try:
+                state = self.actuator.snapshot()
+            except TicTimeoutError as e:
+                print("Couldn't read the actuator, skipping a row. {:}".format(e))
+                if not ac.is_alive():
+                    break
+                continue
+            shared = self.live.read()  # one consistent set of values for the whole row
+            force = shared.force
+            target = shared.target
+            gap = (
+                state.position_mm + start_gap
+            ) / 1000.0  # set gap whether or not test is active
+
+            # visc_volume = min(sample_volume, HAMMER_AREA * gap)
+            visc_volume = (
+                sample_volume  # Carbopol keeps being predicted to over spread too soon
+            )
+            yield_stress_guess = sfr.yield_stress_guess(force, gap, visc_volume)
+
+            cur_time = time()
+            cur_duration = cur_time - start_time
+            row = [
+                cur_time,
+                cur_duration,
+                state.position_mm,
+                state.position,
+                state.target_position,
+                state.velocity_mms,
+                state.velocity,
+                state.target_velocity,
+                state.max_speed,
+                state.vin_voltage,
+                force,
+            ]
+            if has_target:
+                row.append(target)
+            logger.log(
+                *row,
+                gap,
+                yield_stress_guess,
+                visc_volume,
+                shared.test_active,
+                *protocol.row(self, shared),
+            )
+
+            self.history.append(cur_duration, force, gap, yield_stress_guess, target)
+
+            if (time() - start_time) >= MAX_RUN_TIME or (
+                (not ac.is_alive()) and (time() - start_time) > 1
+            ):
+                print("Time since started: {:.0f}".format(time() - start_time))
+                print("Actuator thread dead? {:}".format(not ac.is_alive()))
+                print("end of background")
+                break
+
+        print(self.actuator.latency_report())
+        if self.scale.filter is not None:
+            print(self.scale.filter.report())
+        if self.control_scheduler is not None:
+            print("Control loop timing:")
+            print(self.control_scheduler.report())
+        print("Background loop timing:")
+        print(scheduler.report())
+        logger.update_metadata(
+            stop_reason=self.stop_reason,
+            homed=self.homed,
+            deenergized=self.deenergized,
+            timing={
+                "control_loop": (
+                    self.control_scheduler.stats()
+                    if self.control_scheduler is not None
+                    else {}
+                ),
+                "background_loop": scheduler.stats(),
+                "actuator_reads": self.actuator.latency_stats(),
+            },
+        )
+        if self.scale.filter is not None:
+            logger.update_metadata(
+                force_filter={
+                    "count": self.scale.filter.count,
+                    "rejected": self.scale.filter.rejected,
+                }
+            )
+        if self.viewer is not None:
+            self.viewer.close()
+        logger.close()
+        log_to_csv(self.log_path, str(self.data_dir / self.csv_name))
+
+        print("=" * 20 + " BACKGROUND IS DONE " + "=" * 20)
+
+
+def hardware(simulate: bool = False) -> tuple[type, type]:
+    """Gets the load cell and actuator classes to use
+
+    Args:
+        simulate (bool, optional): Whether to stand in simulated hardware, see Simulator/simulator_settings.json. Defaults to False.
+
+    Returns:
+        tuple[type, type]: OpenScale and TicActuator classes
+    """
+    if simulate:
+        from Simulator.simopenscale import SimOpenScale
+        from Simulator.simticactuator import SimTicActuator
+
+        return SimOpenScale, SimTicActuator
+    from Actuator.ticactuator import TicActuator
+
+    return OpenScale, TicActuator
+
+
+def main(protocol_name: str, simulate: bool = False, run_file: str = None):
+    """Asks for a protocol's details, then runs it
+
+    Args:
+        protocol_name (str): name of a protocol in PROTOCOLS, or module:Class of one elsewhere
+        simulate (bool, optional): Whether to use simulated hardware. Defaults to False.
+        run_file (str, optional): Run file to take the details from instead, running without asking the user
+        anything. Defaults to None.
+    """
+    from Runner.protocols import protocol_class
+
+    if run_file is not None:
+        from Runner.sequence import run_sequence
+
+        with open(run_file, "r") as read_file:
+            run = json.load(read_file)
+        stage = {"protocol": protocol_name}
+        for key in ("settings_path", "settings", "parameters"):
+            if key in run:
+                stage[key] = run.pop(key)
+        run.setdefault("name", str(run_file))
+        run_sequence(dict(run, stages=[stage]), simulate, headless=True)
+        return
+
+    protocol_type = protocol_class(protocol_name)
+    scale_class, actuator_class = hardware(simulate)
+    scale = scale_class()
+
+    # Input test values from external settings file
+    with open(protocol_type.settings_path, "r") as read_file:
+        settings = json.load(read_file)
+    if "force_filter" in settings:
+        scale.filter = filter_from_settings(settings["force_filter"])
+
+    # Get test details from user
+    protocol = protocol_type.from_input(scale, settings)
+
+    scale.check_tare()
+
+    actuator = actuator_class(step_mode=protocol.step_mode())
+    protocol.configure_actuator(actuator)
+
+    runner = ExperimentRunner(
+        protocol, scale, actuator, control_rate=settings.get("control_rate_Hz", 50)
+    )
+    runner.run()
+
+
+def command_line(protocol_name: str = None):
+    """Runs a protocol with the options given on the command line: --simulate and --headless RUN_FILE, plus the
+    protocol's name if it isn't given
+
+    Args:
+        protocol_name (str, optional): the protocol to run. Defaults to None, to take it from the command line.
+    """
+    from Runner.protocols import PROTOCOLS
+
+    parser = argparse.ArgumentParser(
+        description="Run {:} on the rheometer".format(
+            protocol_name if protocol_name is not None else "a protocol"
+        )
+    )
+    if protocol_name is None:
+        parser.add_argument(
+            "protocol",
+            help="one of {:}, or module:Class".format(", ".join(PROTOCOLS)),
+        )
+    parser.add_argument(
+        "--simulate", action="store_true", help="use the simulated hardware"
+    )
+    parser.add_argument(
+        "--headless",
+        metavar="RUN_FILE",
+        help="take the details from a run file and ask for nothing",
+    )
+    args = parser.parse_args()
+    main(
+        protocol_name if protocol_name is not None else args.protocol,
+        args.simulate,
+        args.headless,
+    )
+
+
+if __name__ == "__main__":
+    command_line()
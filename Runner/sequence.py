@@ -0,0 +1,342 @@
+"""Runs several protocols back to back on one loaded sample, from a sequence file, and queues sequences one after
+another:
+
+    python -m Runner.sequence Runner/example_sequence.json [more sequence files...] [--simulate] [--headless]
+
+A sequence file is JSON with the sample and a list of stages, e.g.
+
+    {
+        "sample_str": "CarbopolB",
+        "sample_volume_mL": 2,
+        "start_gap_mm": null,
+        "stages": [
+            {"protocol": "force_steps", "parameters": {"targets": [5, 10, 20], "step_duration": 300}},
+            {"protocol": "retraction", "parameters": {"approach_gap": 15, "retract_speed": 10}}
+        ]
+    }
+
+Each stage runs a protocol from Runner/protocols.py. Its settings come from the protocol's settings file
+(test_settings.json, Retraction/retraction_settings.json, ...) or the stage's "settings_path", with anything in
+the stage's "settings" replacing them, and its "parameters" are passed to the protocol's constructor. The sample
+details apply to every stage, and any that are missing or null are asked for once before the first stage. A
+start_gap_mm of "config" uses the gap in the load cell's config.
+
+The load cell's tare is checked once and the actuator is only zeroed before the first stage. Between stages the
+actuator is held where the last stage left it rather than homed, so each stage carries on with the sample as it is.
+Only the last stage, or one stopped early by a safety limit, homes it, and a stage stopped early ends the sequence.
+Every stage gets its own run files, with its place in the sequence in their metadata.
+
+With --headless nothing is asked for, so runs can go unattended: a sequence missing sample details is an error, the
+load cell is tared if it's out of tare unless the sequence has "auto_tare": false, and the actuator's power being
+off is an error. There's no live plot or tare histogram either, so no display is needed. Every sequence in the
+queue is read and its protocols made before the first one starts, so a mistake in any of them shows up before
+anything moves. The queue stops at the first sequence stopped early by a safety limit, unless --keep-going is given.
+It always stops after a sequence that didn't get the actuator back home, e.g. after losing contact with it, since
+the next sequence zeroes the actuator where it is.
+"""
+
+import argparse
+import json
+import sys
+from squeezeflowrheometer import SqueezeFlowRheometer as sfr
+from LoadCell.forcefilter import filter_from_settings
+from Runner.protocols import protocol_class
+from Runner.runner import ExperimentRunner, hardware
+
+
+def load_sequence(path: str) -> dict:
+    """Reads a sequence file and checks every stage names a protocol
+
+    Args:
+        path (str): path to the sequence file
+
+    Raises:
+        ValueError: if the sequence has no stages or a stage's protocol doesn't exist
+
+    Returns:
+        dict: the sequence
+    """
+    with open(path, "r") as read_file:
+        sequence = json.load(read_file)
+    check_sequence(sequence, path)
+    return sequence
+
+
+def check_sequence(sequence: dict, source: str):
+    """Checks a sequence has stages and every stage names a protocol
+
+    Args:
+        sequence (dict): the sequence
+        source (str): where the sequence came from, for error messages
+
+    Raises:
+        ValueError: if the sequence has no stages or a stage's protocol doesn't exist
+    """
+    stages = sequence.get("stages", [])
+    if len(stages) == 0:
+        raise ValueError("{:} has no stages".format(source))
+    for stage in stages:
+        protocol_class(stage["protocol"])
+
+
+def input_sample(sequence: dict, scale, headless: bool = False) -> dict:
+    """Gets the sample details from the sequence, asking the user for any it leaves out
+
+    Args:
+        sequence (dict): the sequence
+        scale (OpenScale): the load cell, for the gap in its config
+        headless (bool, optional): Whether to raise an error rather than ask. Defaults to False.
+
+    Raises:
+        ValueError: if headless and the sequence leaves out a sample detail
+
+    Returns:
+        dict: sample_str, sample_volume (m^3) and start_gap (mm), as protocols take them
+    """
+    if headless:
+        missing = [
+            key
+            for key in ("sample_str", "sample_volume_mL", "start_gap_mm")
+            if sequence.get(key) is None
+        ]
+        if len(missing) > 0:
+            raise ValueError(
+                "Can't ask for {:} when headless, put them in the sequence".format(
+                    ", ".join(missing)
+                )
+            )
+
+    start_gap = sequence.get("start_gap_mm")
+    if start_gap is None:
+        start_gap = sfr.input_start_gap(scale)
+    elif str(start_gap).lower() == "config":
+        start_gap = scale.config["gap"]
+    sample_volume = sequence.get("sample_volume_mL")
+    if sample_volume is None:
+        sample_volume = sfr.input_sample_volume()
+    else:
+        sample_volume = sample_volume * 1e-6  # m^3
+    sample_str = sequence.get("sample_str")
+    if sample_str is None:
+        sample_str = input(
+            "What's the sample made of? This will be used for file naming. "
+        )
+    return {
+        "sample_str": sample_str,
+        "sample_volume": sample_volume,
+        "start_gap": float(start_gap),
+    }
+
+
+def build_stages(sequence: dict, sample: dict) -> list:
+    """Makes the protocol of every stage, so a mistake in any of them shows up before anything moves
+
+    Args:
+        sequence (dict): the sequence
+        sample (dict): sample details from input_sample()
+
+    Returns:
+        list[Protocol]: protocol of each stage
+    """
+    protocols = []
+    for stage in sequence["stages"]:
+        protocol_type = protocol_class(stage["protocol"])
+        with open(
+            stage.get("settings_path", protocol_type.settings_path), "r"
+        ) as read_file:
+            settings = json.load(read_file)
+        settings.update(stage.get("settings", {}))
+        protocols.append(
+            protocol_type(settings, **sample, **stage.get("parameters", {}))
+        )
+    return protocols
+
+
+def run_stages(
+    sequence: dict,
+    protocols: list,
+    scale,
+    actuator,
+    source: str = "",
+    plot: bool = True,
+) -> list[ExperimentRunner]:
+    """Runs a sequence's stages back to back, once its protocols are made and the tare is checked
+
+    Args:
+        sequence (dict): the sequence
+        protocols (list[Protocol]): protocol of each stage, from build_stages()
+        scale (OpenScale): the load cell
+        actuator (TicActuator): the actuator
+        source (str, optional): where the sequence came from, for the runs' metadata. Defaults to "".
+        plot (bool, optional): Whether to show the live plot of each stage. Defaults to True.
+
+    Returns:
+        list[ExperimentRunner]: runner of each stage that ran
+    """
+    runners = []
+    for i, protocol in enumerate(protocols):
+        print(
+            "=" * 20
+            + " STAGE {:d} OF {:d}: {:} ".format(
+                i + 1, len(protocols), sequence["stages"][i]["protocol"]
+            )
+            + "=" * 20
+        )
+        if protocol.step_mode() != actuator.get_variable_by_name("step_mode"):
+            actuator.change_step_mode(protocol.step_mode())
+        protocol.configure_actuator(actuator)
+        if "force_filter" in protocol.settings:
+            scale.filter = filter_from_settings(protocol.settings["force_filter"])
+
+        runner = ExperimentRunner(
+            protocol,
+            scale,
+            actuator,
+            control_rate=protocol.settings.get("control_rate_Hz", 50),
+            zero_actuator=i == 0,
+            home_after=i == len(protocols) - 1,
+            metadata={
+                "sequence": {
+                    "file": source,
+                    "name": sequence.get("name"),
+                    "stage": i + 1,
+                    "stages": len(protocols),
+                }
+            },
+            plot=plot,
+        )
+        runner.run()
+        runners.append(runner)
+        if runner.stop_reason is not None and i < len(protocols) - 1:
+            print(
+                "Stage {:d} stopped early, skipping the rest of the sequence.".format(
+                    i + 1
+                )
+            )
+            break
+    return runners
+
+
+def run_batch(
+    sequences: list,
+    simulate: bool = False,
+    headless: bool = False,
+    keep_going: bool = False,
+) -> list[list[ExperimentRunner]]:
+    """Runs sequences one after another, homing between them. Every sequence is read and its protocols made before
+    the first one starts.
+
+    Args:
+        sequences (list[str | dict]): paths to sequence files, or the sequences themselves
+        simulate (bool, optional): Whether to use simulated hardware. Defaults to False.
+        headless (bool, optional): Whether to run without asking the user anything, see the module docstring.
+        Defaults to False.
+        keep_going (bool, optional): Whether to carry on with the queue after a sequence is stopped early by a safety
+        limit. The queue stops anyway if the actuator didn't get back home. Defaults to False.
+
+    Returns:
+        list[list[ExperimentRunner]]: runners of each sequence that ran
+    """
+    scale_class, actuator_class = hardware(simulate)
+    scale = scale_class()
+
+    queue = []
+    for i, sequence in enumerate(sequences):
+        if isinstance(sequence, dict):
+            source = sequence.get("name") or "sequence {:d}".format(i + 1)
+            check_sequence(sequence, source)
+        else:
+            source = str(sequence)
+            sequence = load_sequence(sequence)
+        if len(sequences) > 1:
+            print("Sequence {:d} of {:d}: {:}".format(i + 1, len(sequences), source))
+        sample = input_sample(sequence, scale, headless)
+        queue.append((source, sequence, build_stages(sequence, sample)))
+
+    actuator = actuator_class(
+        step_mode=queue[0][2][0].step_mode(), wait_for_power=not headless
+    )
+
+    results = []
+    for i, (source, sequence, protocols) in enumerate(queue):
+        if len(queue) > 1:
+            print(
+                "#" * 20
+                + " SEQUENCE {:d} OF {:d}: {:} ".format(i + 1, len(queue), source)
+                + "#" * 20
+            )
+        scale.check_tare(sequence.get("auto_tare", True) if headless else None)
+        runners = run_stages(
+            sequence, protocols, scale, actuator, source, plot=not headless
+        )
+        results.append(runners)
+        if runners[-1].homed is not True:
+            if i < len(queue) - 1:
+                print(
+                    "{:} didn't get the actuator back home, stopping the queue rather than zero it where it is.".format(
+                        source
+                    )
+                )
+            break
+        if runners[-1].stop_reason is not None and not keep_going:
+            if i < len(queue) - 1:
+                print("{:} stopped early, stopping the queue.".format(source))
+            break
+
+    if len(queue) > 1:
+        print("=" * 20 + " QUEUE SUMMARY " + "=" * 20)
+        for (source, sequence, protocols), runners in zip(queue, results):
+            for runner in runners:
+                print(
+                    "{:}: {:} - {:}".format(
+                        source, runner.csv_name, runner.stop_reason or "completed"
+                    )
+                )
+        for source, sequence, protocols in queue[len(results) :]:
+            print("{:}: not run".format(source))
+    return results
+
+
+def run_sequence(
+    sequence, simulate: bool = False, headless: bool = False
+) -> list[ExperimentRunner]:
+    """Runs every stage of a sequence on one loaded sample
+
+    Args:
+        sequence (str | dict): path to the sequence file, or the sequence itself
+        simulate (bool, optional): Whether to use simulated hardware. Defaults to False.
+        headless (bool, optional): Whether to run without asking the user anything, see the module docstring.
+        Defaults to False.
+
+    Returns:
+        list[ExperimentRunner]: runner of each stage that ran
+    """
+    return run_batch([sequence], simulate, headless)[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run sequences of protocols, one after another"
+    )
+    parser.add_argument("sequences", nargs="+", help="sequence files, run in order")
+    parser.add_argument(
+        "--simulate", action="store_true", help="use the simulated hardware"
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="never ask for anything, so runs can go unattended",
+    )
+    parser.add_argument(
+        "--keep-going",
+        action="store_true",
+        help="carry on with the queue after a sequence stops early",
+    )
+    args = parser.parse_args()
+
+    results = run_batch(args.sequences, args.simulate, args.headless, args.keep_going)
+    if len(results) < len(args.sequences) or any(
+        runners[-1].stop_reason is not None or runners[-1].homed is not True
+        for runners in results
+    ):
+        sys.exit(1)
@@ -0,0 +1,347 @@
+"""Faster-than-real-time tuning sweeps of the multistep force controller.
+
+Runs the force control law from PID_squeeze_flow_timed_multistep.py against the simulated rig on a virtual
+clock, for every combination of the parameters in a grid, spread across a process pool. Run from the
+repository root with
+
+    python -m Simulator.controltuning
+
+which reads the grid from Simulator/tuning_settings.json, or from the settings file given as an argument,
+and writes one row per target step to a CSV.
+"""
+
+import csv
+import itertools
+import json
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from Control.forcecontroller import ForcePIDController
+from Control.squeezeflowmodel import SqueezeFlowModel
+from Simulator.simclock import VirtualClock
+from Simulator.simrig import GRAMS_TO_N, SimRig
+from Simulator.simticactuator import SimTicActuator
+
+TUNING_SETTINGS_PATH = "Simulator/tuning_settings.json"
+"""Default sweep settings file"""
+
+APPROACH_VELOCITY = -1
+"""mm/s, speed to approach bath of fluid at"""
+FORCE_THRESHOLD = 0.6
+"""g, force must exceed this for control system to kick in"""
+MAX_FORCE = 80
+"""g, if force greater than this, stop test"""
+
+
+def step_metrics(
+    times: list[float],
+    forces: list[float],
+    target: float,
+    previous_target: float,
+    settle_tolerance: float = 0.05,
+    steady_fraction: float = 0.2,
+) -> dict:
+    """Computes how well one target step was tracked
+
+    Args:
+        times (list[float]): time of each force sample since the step started (s)
+        forces (list[float]): force samples
+        target (float): target force of the step
+        previous_target (float): target force of the step before, 0 for the first step
+        settle_tolerance (float, optional): Settled means within this fraction of the target. Defaults to 0.05.
+        steady_fraction (float, optional): Fraction at the end of the step used for steady state error. Defaults to 0.2.
+
+    Returns:
+        dict: settling time (s, nan if it never settled), overshoot past the target, overshoot as a
+            percentage of the step size, mean steady state error and RMS error over the whole step
+    """
+    if len(forces) <= 0:
+        return {
+            "settling_time": math.nan,
+            "overshoot": math.nan,
+            "overshoot_pct": math.nan,
+            "steady_state_error": math.nan,
+            "rms_error": math.nan,
+        }
+
+    band = settle_tolerance * abs(target)
+    settling_time = 0
+    for t, f in zip(reversed(times), reversed(forces)):
+        if abs(f - target) > band:
+            settling_time = t
+            break
+    if abs(forces[-1] - target) > band:
+        settling_time = math.nan
+
+    step_size = target - previous_target
+    overshoot = max(0, (max(forces) - target) * math.copysign(1, step_size))
+    if step_size < 0:
+        overshoot = max(0, target - min(forces))
+
+    steady_start = times[-1] - steady_fraction * (times[-1] - times[0])
+    steady = [target - f for t, f in zip(times, forces) if t >= steady_start]
+
+    return {
+        "settling_time": settling_time,
+        "overshoot": overshoot,
+        "overshoot_pct": 100 * overshoot / abs(step_size) if step_size != 0 else 0,
+        "steady_state_error": sum(steady) / len(steady),
+        "rms_error": math.sqrt(sum((target - f) ** 2 for f in forces) / len(forces)),
+    }
+
+
+def simulate_multistep_run(
+    params: dict,
+    test_settings: dict,
+    sim_settings: dict,
+    control_period: float = 0.01,
+) -> dict:
+    """Simulates one multistep squeeze flow run on a virtual clock
+
+    The load cell and actuator loops are interleaved the way their threads would run: every load cell
+    sample updates the error, and every control_period the actuator loop turns the error into a velocity.
+
+    Args:
+        params (dict): test settings to override for this run, e.g. {"K_I": 0.01, "decay_rate_r": -0.2}
+        test_settings (dict): test settings, as in test_settings.json
+        sim_settings (dict): simulator settings, as in Simulator/simulator_settings.json
+        control_period (float, optional): time (s) per actuator loop iteration. Defaults to 0.01.
+
+    Returns:
+        dict: the parameters, whether the run completed, why it stopped if not, and step_metrics() for each step
+    """
+    settings = dict(test_settings)
+    settings.update(params)
+    targets = settings["targets"]
+    test_duration = settings["test_duration"]
+
+    clock = VirtualClock()
+    rig = SimRig.from_settings(sim_settings, clock)
+    start_gap = rig.start_gap
+    actuator = SimTicActuator(step_mode=settings["actuator_step_mode"], rig=rig)
+    actuator.set_max_accel_mmss(settings["actuator_max_accel_mmss"], True)
+    actuator.set_max_speed_mms(settings["actuator_max_speed_mms"])
+    actuator.halt_and_set_position(0)
+    actuator.energize()
+    actuator.exit_safe_start()
+
+    model = None
+    if settings.get("feedforward", {}).get("enabled", False):
+        model = SqueezeFlowModel.from_settings(
+            settings["feedforward"],
+            rig.plant.sample_volume,
+            rig.plant.plate_radius,
+            GRAMS_TO_N,
+        )
+    controller = ForcePIDController.from_settings(settings, model)
+    controller.target = targets[0]
+
+    sample_period = 1 / rig.report_rate
+    next_sample = sample_period
+    next_control = 0
+    prev_sample = None
+    force = 0
+
+    test_active = False
+    abort_reason = None
+    step_id = 0
+    start_time = 0
+    step_times = []
+    step_forces = []
+    results = []
+
+    actuator.set_vel_mms(APPROACH_VELOCITY)
+    while abort_reason is None:
+        if next_sample <= next_control:
+            clock.t = next_sample
+            rig.advance()
+            force = rig.force()
+            controller.update_error(
+                force, (next_sample - prev_sample) if prev_sample is not None else 0
+            )
+            prev_sample = next_sample
+            next_sample += sample_period
+            if test_active:
+                step_times.append(clock.t - start_time)
+                step_forces.append(force)
+            continue
+
+        clock.t = next_control
+        next_control += control_period
+        rig.advance()
+        cur_pos_mm = rig.tic.position_mm()
+        gap_m = (cur_pos_mm + start_gap) / 1000.0  # current gap in m
+
+        if abs(force) > MAX_FORCE:
+            abort_reason = "force too large"
+            break
+
+        if not test_active:
+            if force > FORCE_THRESHOLD:
+                test_active = True
+                start_time = clock.t
+                controller.start(targets[step_id], gap_m)
+            elif abs(cur_pos_mm) >= start_gap:
+                abort_reason = "hit hard stop before threshold force"
+                break
+            else:
+                controller.reset_integral()
+                actuator.heartbeat()
+                continue
+
+        if gap_m <= 0:
+            abort_reason = "hit hard stop"
+            break
+        if abs(cur_pos_mm) <= 1:
+            abort_reason = "returned too close to home"
+            break
+
+        if clock.t - start_time >= test_duration:
+            results.append(
+                step_metrics(
+                    step_times,
+                    step_forces,
+                    targets[step_id],
+                    targets[step_id - 1] if step_id > 0 else 0,
+                )
+            )
+            step_times = []
+            step_forces = []
+            step_id = step_id + 1
+            if step_id >= len(targets):
+                break
+            controller.next_step(targets[step_id])
+            start_time = clock.t
+
+        controller.update_model(
+            force,
+            gap_m,
+            rig.tic.velocity / 2**rig.tic.step_mode * rig.tic.step_size,
+            control_period,
+        )
+        v_new, vel_P, vel_I, vel_D = controller.velocity(gap_m)
+        actuator.set_vel_mms(v_new)
+        actuator.heartbeat()
+
+    return {
+        "params": params,
+        "completed": abort_reason is None,
+        "abort_reason": abort_reason,
+        "targets": targets,
+        "steps": results,
+    }
+
+
+def run_sweep(
+    param_grid: dict,
+    test_settings: dict,
+    sim_settings: dict,
+    control_period: float = 0.01,
+    processes: int = None,
+) -> list[dict]:
+    """Simulates a run for every combination of parameters in a grid, in parallel
+
+    Args:
+        param_grid (dict): list of values to try for each test setting, e.g. {"K_I": [0.005, 0.01], "a": [0.5, 0.7]}
+        test_settings (dict): test settings, as in test_settings.json
+        sim_settings (dict): simulator settings, as in Simulator/simulator_settings.json
+        control_period (float, optional): time (s) per actuator loop iteration. Defaults to 0.01.
+        processes (int, optional): Number of worker processes. Defaults to one per CPU.
+
+    Returns:
+        list[dict]: results of simulate_multistep_run() for each combination, in grid order
+    """
+    names = list(param_grid.keys())
+    combos = [
+        dict(zip(names, values))
+        for values in itertools.product(*(param_grid[name] for name in names))
+    ]
+    run = partial(
+        simulate_multistep_run,
+        test_settings=test_settings,
+        sim_settings=sim_settings,
+        control_period=control_period,
+    )
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(run, combos, chunksize=max(1, len(combos) // 64)))
+
+
+def write_sweep_csv(results: list[dict], csv_path: str):
+    """Writes sweep results with one row per target step
+
+    Args:
+        results (list[dict]): results from run_sweep()
+        csv_path (str): where to write the CSV
+    """
+    if len(results) <= 0:
+        return
+    param_names = list(results[0]["params"].keys())
+    metric_names = [
+        "settling_time",
+        "overshoot",
+        "overshoot_pct",
+        "steady_state_error",
+        "rms_error",
+    ]
+    with open(csv_path, "w", newline="") as write_file:
+        writer = csv.writer(write_file)
+        writer.writerow(
+            ["Run"]
+            + param_names
+            + ["Completed", "Abort Reason", "Step", "Target"]
+            + metric_names
+        )
+        for run_id, result in enumerate(results):
+            params = [result["params"][name] for name in param_names]
+            for step_id, metrics in enumerate(result["steps"]):
+                writer.writerow(
+                    [run_id]
+                    + params
+                    + [
+                        result["completed"],
+                        result["abort_reason"] or "",
+                        step_id,
+                        result["targets"][step_id],
+                    ]
+                    + [metrics[name] for name in metric_names]
+                )
+            if not result["steps"]:  # still record runs that never got going
+                writer.writerow(
+                    [run_id]
+                    + params
+                    + [result["completed"], result["abort_reason"] or "", "", ""]
+                    + [""] * len(metric_names)
+                )
+
+
+if __name__ == "__main__":
+    tuning_settings_path = sys.argv[1] if len(sys.argv) > 1 else TUNING_SETTINGS_PATH
+    with open(tuning_settings_path, "r") as read_file:
+        tuning_settings = json.load(read_file)
+    with open(tuning_settings["test_settings_path"], "r") as read_file:
+        test_settings = json.load(read_file)
+    with open(tuning_settings["simulator_settings_path"], "r") as read_file:
+        sim_settings = json.load(read_file)
+    test_settings.update(tuning_settings.get("test_settings_overrides", {}))
+    sim_settings.update(tuning_settings.get("simulator_settings_overrides", {}))
+
+    n_combos = math.prod(len(v) for v in tuning_settings["param_grid"].values())
+    print("Simulating {:d} parameter combinations".format(n_combos))
+    results = run_sweep(
+        tuning_settings["param_grid"],
+        test_settings,
+        sim_settings,
+        tuning_settings.get("control_period", 1 / test_settings["control_rate_Hz"]),
+        tuning_settings.get("processes"),
+    )
+
+    output_path = tuning_settings["output_csv"]
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    write_sweep_csv(results, output_path)
+    print(
+        "{:d} of {:d} runs completed. Results written to {:}".format(
+            sum(r["completed"] for r in results), len(results), output_path
+        )
+    )
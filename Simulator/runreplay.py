@@ -0,0 +1,69 @@
+import csv
+import numpy as np
+
+
+class RunReplay:
+    """Recorded run loaded from one of the experiment CSVs, sampled at arbitrary times so it can be played back"""
+
+    def __init__(self, csv_path: str, active_only: bool = False):
+        """Loads a recorded run
+
+        Args:
+            csv_path (str): path to a data CSV written by one of the experiment scripts
+            active_only (bool, optional): Whether to only replay rows where the test was active. Defaults to False.
+
+        Raises:
+            ValueError: if the file doesn't have elapsed time, force and position columns
+        """
+        with open(csv_path, "r", newline="") as read_file:
+            reader = csv.reader(read_file)
+            header = [col.strip() for col in next(reader)]
+            rows = [row for row in reader if len(row) == len(header)]
+
+        def find_column(prefix: str) -> int:
+            for i, col in enumerate(header):
+                if col.startswith(prefix):
+                    return i
+            raise ValueError(
+                "{:} has no '{:}' column, can't replay it".format(csv_path, prefix)
+            )
+
+        time_col = find_column("Elapsed Time")
+        force_col = find_column("Current Force")
+        pos_col = find_column("Current Position (mm)")
+        if active_only and "Test Active?" in header:
+            active_col = header.index("Test Active?")
+            rows = [row for row in rows if row[active_col].strip() == "True"]
+
+        self.times = np.array([float(row[time_col]) for row in rows])
+        """Elapsed time of each recorded row (s), starting from zero"""
+        self.forces = np.array([float(row[force_col]) for row in rows])
+        """Recorded force, in the units the load cell was calibrated in"""
+        self.positions_mm = np.array([float(row[pos_col]) for row in rows])
+        """Recorded actuator position (mm)"""
+        if len(self.times) > 0:
+            self.times = self.times - self.times[0]
+
+        self.duration = self.times[-1] if len(self.times) > 0 else 0
+        """Length of the recording (s)"""
+
+    def sample(self, t: float) -> tuple[float, float, float]:
+        """Interpolates the recording at a given time. Holds the last values once the recording ends.
+
+        Args:
+            t (float): time since the start of the recording (s)
+
+        Returns:
+            tuple[float, float, float]: force, actuator position (mm) and actuator velocity (mm/s)
+        """
+        force = float(np.interp(t, self.times, self.forces))
+        pos_mm = float(np.interp(t, self.times, self.positions_mm))
+        i = int(np.searchsorted(self.times, t))
+        if 0 < i < len(self.times):
+            dt = self.times[i] - self.times[i - 1]
+            vel_mms = (
+                (self.positions_mm[i] - self.positions_mm[i - 1]) / dt if dt > 0 else 0
+            )
+        else:
+            vel_mms = 0
+        return force, pos_mm, float(vel_mms)
@@ -0,0 +1,57 @@
+from time import perf_counter, sleep
+
+
+class SimClock:
+    """Clock for the simulator. Runs in step with the wall clock, optionally sped up."""
+
+    def __init__(self, speed: float = 1.0):
+        """Starts a clock at zero
+
+        Args:
+            speed (float, optional): How many simulated seconds pass per real second. Defaults to 1.0 (real time).
+        """
+        self.speed = speed
+        self._start = perf_counter()
+
+    def now(self) -> float:
+        """Current simulated time
+
+        Returns:
+            float: seconds since the clock started
+        """
+        return (perf_counter() - self._start) * self.speed
+
+    def sleep(self, duration: float):
+        """Waits for an amount of simulated time to pass
+
+        Args:
+            duration (float): simulated time to wait (s)
+        """
+        if duration > 0:
+            sleep(duration / self.speed)
+
+
+class VirtualClock(SimClock):
+    """Clock that only moves when told to. Sleeping advances it instantly, so simulations run as fast as the CPU allows."""
+
+    def __init__(self):
+        """Starts a clock at zero"""
+        self.speed = float("inf")
+        self.t = 0.0
+
+    def now(self) -> float:
+        """Current simulated time
+
+        Returns:
+            float: seconds since the clock started
+        """
+        return self.t
+
+    def sleep(self, duration: float):
+        """Advances the clock without waiting
+
+        Args:
+            duration (float): simulated time to skip ahead (s)
+        """
+        if duration > 0:
+            self.t += duration
@@ -0,0 +1,118 @@
+from LoadCell.openscale import OpenScale
+from Simulator.simrig import SimRig
+
+SIM_CONFIG_PATH = "Simulator/sim_config.json"
+"""Where a simulated scale saves its tare and calibration, so the real LoadCell config is never touched"""
+
+
+class SimSerial:
+    """Stands in for the OpenScale's serial port, producing lines at the simulated report rate"""
+
+    def __init__(self, rig: SimRig):
+        """Opens a simulated serial port
+
+        Args:
+            rig (SimRig): the rig whose load cell to report
+        """
+        self.rig = rig
+        self.timeout = None
+        """Longest a read blocks (s of simulated time), None to block until the data arrives"""
+        self.report_period = 1 / rig.report_rate
+        # The firmware prints a header before the first reading
+        self._buffer = b"Readings:\r\n"
+        self._next_report = rig.clock.now()
+
+    def _generate(self):
+        """Adds every line that should have been sent by now to the input buffer"""
+        now = self.rig.clock.now()
+        lines = []
+        while self._next_report <= now:
+            self.rig.advance(self._next_report)
+            temperature = self.rig.temperature()
+            if temperature is None:
+                lines.append(b"%d,\r\n" % self.rig.raw_reading())
+            else:
+                lines.append(b"%d,%.2f,\r\n" % (self.rig.raw_reading(), temperature))
+            self._next_report += self.report_period
+        if lines:
+            self._buffer += b"".join(lines)
+
+    def _wait_for(self, enough) -> bool:
+        """Waits until the input buffer satisfies a condition or the timeout runs out
+
+        Args:
+            enough (function): takes the input buffer and returns whether it has what's needed
+
+        Returns:
+            bool: whether the condition was met
+        """
+        clock = self.rig.clock
+        end_time = None if self.timeout is None else clock.now() + self.timeout
+        self._generate()
+        while not enough(self._buffer):
+            wait = self._next_report - clock.now()
+            if end_time is not None:
+                if clock.now() >= end_time:
+                    return False
+                wait = min(wait, end_time - clock.now())
+            clock.sleep(wait)
+            self._generate()
+        return True
+
+    @property
+    def in_waiting(self) -> int:
+        """Number of bytes ready to be read"""
+        self._generate()
+        return len(self._buffer)
+
+    def read(self, size: int = 1) -> bytes:
+        """Reads up to size bytes, waiting for them unless the timeout runs out first
+
+        Args:
+            size (int, optional): number of bytes to read. Defaults to 1.
+
+        Returns:
+            bytes: the bytes read
+        """
+        self._wait_for(lambda buffer: len(buffer) >= size)
+        data = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return data
+
+    def readline(self) -> bytes:
+        """Reads up to and including the next newline
+
+        Returns:
+            bytes: the line, or whatever arrived before the timeout ran out
+        """
+        if self._wait_for(lambda buffer: b"\n" in buffer):
+            end = self._buffer.index(b"\n") + 1
+        else:
+            end = len(self._buffer)
+        line = self._buffer[:end]
+        self._buffer = self._buffer[end:]
+        return line
+
+    def reset_input_buffer(self):
+        """Throws away everything waiting to be read"""
+        self._generate()
+        self._buffer = b""
+
+
+class SimOpenScale(OpenScale):
+    """Drop-in stand-in for OpenScale that reads a simulated load cell"""
+
+    def __init__(self, rig: SimRig = None):
+        """Connects to a simulated load cell
+
+        Args:
+            rig (SimRig, optional): the simulated rig. Defaults to the shared rig from SimRig.get_default().
+        """
+        self.rig = rig if rig is not None else SimRig.get_default()
+        super().__init__(SimSerial(self.rig))
+
+        self.config_path = SIM_CONFIG_PATH
+        self.config = dict(self.rig.scale_config)
+        self.tare_value = self.config["tare"]
+        self.calibration = self.config["calibration"]
+        self.units = self.config["units"]
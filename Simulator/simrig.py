@@ -0,0 +1,335 @@
+import json
+import math
+import random
+import threading
+from types import SimpleNamespace
+from Simulator.simclock import SimClock
+from Simulator.squeezeflowplant import HerschelBulkleyFluid, SqueezeFlowPlant
+from Simulator.runreplay import RunReplay
+
+SETTINGS_PATH = "Simulator/simulator_settings.json"
+"""Default simulator settings file"""
+
+GRAMS_TO_N = 0.00980665
+
+
+class TicModel:
+    """Motion of a Tic stepper controller: acceleration-limited position and velocity control, safe start,
+    and the 1 second command timeout. Units match the Tic's own (microsteps, microsteps/10,000s, microsteps/100s/s).
+    """
+
+    COMMAND_TIMEOUT = 1
+    """Time (s) without a heartbeat before the Tic stops the motor"""
+    ERROR_COMMAND_TIMEOUT = 1 << 6
+    """Bit in error_status set when the command timeout hits"""
+
+    def __init__(self, step_size: float = 0.01, vin_voltage: int = 12000):
+        """Creates a de-energized Tic at position zero
+
+        Args:
+            step_size (float, optional): Size of the actuator's full step in mm. Defaults to 0.01.
+            vin_voltage (int, optional): Supply voltage to report in mV. Defaults to 12000.
+        """
+        self.step_size = step_size
+        self.vin_voltage = vin_voltage
+        self.step_mode = 0
+        self.current_limit = 576
+        self.position = 0.0
+        """Position in microsteps, kept as a float between steps"""
+        self.velocity = 0.0
+        """Velocity in microsteps/s"""
+        self.target_position = 0
+        self.target_velocity = 0
+        self.planning_mode = 0
+        """0 is off, 1 is target position, 2 is target velocity, as on the Tic"""
+        self.max_speed = 2000000
+        self.max_accel = 40000
+        self.max_decel = 40000
+        self.energized = False
+        self.safe_start = True
+        self.error_status = 0
+        self.last_command_time = 0
+
+    def position_mm(self) -> float:
+        """Current position in mm
+
+        Returns:
+            float: current position in mm
+        """
+        return self.position / 2**self.step_mode * self.step_size
+
+    def advance(self, dt: float, now: float):
+        """Moves the motor forward in time
+
+        Args:
+            dt (float): time step (s)
+            now (float): simulated time at the end of the step (s)
+        """
+        if not self.energized:
+            self.velocity = 0
+            return
+
+        if now - self.last_command_time > TicModel.COMMAND_TIMEOUT:
+            self.error_status |= TicModel.ERROR_COMMAND_TIMEOUT
+
+        max_speed = self.max_speed / 10000
+        if self.safe_start or self.error_status or self.planning_mode == 0:
+            v_des = 0
+        elif self.planning_mode == 2:
+            v_des = max(-max_speed, min(max_speed, self.target_velocity / 10000))
+        else:
+            decel = (self.max_decel or self.max_accel) / 100
+            dist = self.target_position - self.position
+            v_des = math.copysign(
+                min(max_speed, math.sqrt(2 * decel * abs(dist))), dist
+            )
+
+        speeding_up = abs(v_des) > abs(self.velocity) and v_des * self.velocity >= 0
+        accel = (
+            self.max_accel if speeding_up else (self.max_decel or self.max_accel)
+        ) / 100
+        dv = max(-accel * dt, min(accel * dt, v_des - self.velocity))
+        old_velocity = self.velocity
+        self.velocity += dv
+        old_position = self.position
+        self.position += (old_velocity + self.velocity) / 2 * dt
+
+        if self.planning_mode == 1:
+            # Don't overshoot the target position
+            before = self.target_position - old_position
+            after = self.target_position - self.position
+            if before == 0 or before * after <= 0:
+                self.position = float(self.target_position)
+                self.velocity = 0
+
+    def variables(self) -> SimpleNamespace:
+        """Snapshot of the Tic variables, named as in pytic
+
+        Returns:
+            SimpleNamespace: the variables
+        """
+        return SimpleNamespace(
+            operation_state=10 if self.energized else 0,
+            energized=self.energized,
+            error_status=self.error_status,
+            planning_mode=self.planning_mode,
+            target_position=self.target_position,
+            target_velocity=self.target_velocity,
+            max_speed=self.max_speed,
+            max_decel=self.max_decel,
+            max_accel=self.max_accel,
+            current_position=int(round(self.position)),
+            current_velocity=int(round(self.velocity * 10000)),
+            vin_voltage=self.vin_voltage,
+            step_mode=self.step_mode,
+            current_limit_code=self.current_limit,
+        )
+
+
+class SimRig:
+    """Simulated squeeze flow rheometer: a Tic-driven hammer pressing on a sample over a load cell.
+    Both simulated devices share one rig, which brings the physics up to date whenever either is queried.
+    """
+
+    _default = None
+
+    def __init__(
+        self,
+        plant: SqueezeFlowPlant,
+        start_gap: float,
+        scale_config: dict,
+        clock: SimClock = None,
+        report_rate: float = 80,
+        noise_std: float = 0,
+        max_dt: float = 0.001,
+        vin_voltage: int = 12000,
+        replay: RunReplay = None,
+        seed: int = None,
+        temperature: float = None,
+        warming_rate: float = 0,
+        zero_drift: float = 0,
+        span_drift: float = 0,
+    ):
+        """Creates a simulated rig with the actuator at zero
+
+        Args:
+            plant (SqueezeFlowPlant): squeeze flow physics, unused when replaying
+            start_gap (float): distance (mm) from the actuator's zero position to the hard stop
+            scale_config (dict): load cell config as stored by OpenScale (tare, calibration, units, gap)
+            clock (SimClock, optional): simulated time source. Defaults to a real-time SimClock.
+            report_rate (float, optional): OpenScale reports per second. Defaults to 80.
+            noise_std (float, optional): standard deviation of load cell noise, in calibrated units. Defaults to 0.
+            max_dt (float, optional): Longest physics time step (s). Defaults to 0.001.
+            vin_voltage (int, optional): Actuator supply voltage to report in mV. Defaults to 12000.
+            replay (RunReplay, optional): recorded run to play back instead of simulating physics. Defaults to None.
+            seed (int, optional): seed for the load cell noise. Defaults to None.
+            temperature (float, optional): load cell temperature at the start, which the OpenScale reports after
+                each reading. Defaults to not reporting a temperature.
+            warming_rate (float, optional): how fast the temperature rises (degrees/s). Defaults to 0.
+            zero_drift (float, optional): change in the raw zero reading per degree away from the starting temperature. Defaults to 0.
+            span_drift (float, optional): relative change in span per degree away from the starting temperature. Defaults to 0.
+        """
+        self.plant = plant
+        self.start_gap = start_gap
+        self.scale_config = scale_config
+        self.clock = clock if clock is not None else SimClock()
+        self.report_rate = report_rate
+        self.noise_std = noise_std
+        self.max_dt = max_dt
+        self.replay = replay
+        self.tic = TicModel(vin_voltage=vin_voltage)
+        self.lock = threading.RLock()
+        self.t = self.clock.now()
+        self._random = random.Random(seed)
+        self._replay_force = 0
+        self.start_temperature = temperature
+        self.start_time = self.t
+        self.warming_rate = warming_rate
+        self.zero_drift = zero_drift
+        self.span_drift = span_drift
+
+    @classmethod
+    def from_settings(cls, settings: dict, clock: SimClock = None):
+        """Builds a rig from a simulator settings dictionary, see simulator_settings.json
+
+        Args:
+            settings (dict): simulator settings
+            clock (SimClock, optional): simulated time source. Defaults to a SimClock at the settings' time_scale.
+
+        Returns:
+            SimRig: the rig
+        """
+        if clock is None:
+            clock = SimClock(settings.get("time_scale", 1))
+        sample_volume = settings["sample_volume_mL"] * 1e-6  # m^3
+        contact_gap_mm = settings.get("contact_gap_mm")
+        if contact_gap_mm is None:  # a blob of sample is about as tall as it is wide
+            contact_gap_mm = 1000 * sample_volume ** (1 / 3)
+        plant = SqueezeFlowPlant(
+            HerschelBulkleyFluid.from_settings(settings["fluid"]),
+            sample_volume,
+            min(contact_gap_mm, settings["start_gap_mm"]) / 1000,
+            settings["frame_stiffness_N_per_m"],
+            settings.get("wall_slip", True),
+        )
+        load_cell = settings["load_cell"]
+        scale_config = {
+            "tare": load_cell["tare"],
+            "calibration": load_cell["calibration"],
+            "units": load_cell["units"],
+            "gap": settings["start_gap_mm"],
+        }
+        replay = None
+        if settings.get("replay_csv"):
+            replay = RunReplay(settings["replay_csv"])
+        return cls(
+            plant,
+            settings["start_gap_mm"],
+            scale_config,
+            clock,
+            load_cell["report_rate_Hz"],
+            load_cell["noise_std"],
+            settings.get("max_physics_dt", 0.001),
+            settings.get("vin_voltage_mV", 12000),
+            replay,
+            settings.get("seed"),
+            load_cell.get("temperature"),
+            load_cell.get("warming_rate_per_s", 0),
+            load_cell.get("zero_drift_per_degree", 0),
+            load_cell.get("span_drift_per_degree", 0),
+        )
+
+    @staticmethod
+    def get_default():
+        """Gets the rig shared by simulated devices that weren't handed one, building it from SETTINGS_PATH the first time
+
+        Returns:
+            SimRig: the shared rig
+        """
+        if SimRig._default is None:
+            with open(SETTINGS_PATH, "r") as read_file:
+                SimRig._default = SimRig.from_settings(json.load(read_file))
+        return SimRig._default
+
+    def actuator_gap(self) -> float:
+        """Gap the actuator position would give if the frame were perfectly rigid
+
+        Returns:
+            float: gap (m)
+        """
+        return (self.tic.position_mm() + self.start_gap) / 1000.0
+
+    def advance(self, t: float = None):
+        """Brings the simulation up to a given time
+
+        Args:
+            t (float, optional): simulated time (s). Defaults to the clock's current time.
+        """
+        with self.lock:
+            if t is None:
+                t = self.clock.now()
+            if t <= self.t:
+                return
+
+            if self.replay is not None:
+                self.t = t
+                force, pos_mm, vel_mms = self.replay.sample(t)
+                ratio = 2**self.tic.step_mode
+                self.tic.position = pos_mm / self.tic.step_size * ratio
+                self.tic.velocity = vel_mms / self.tic.step_size * ratio
+                self._replay_force = force
+                return
+
+            n_steps = max(1, math.ceil((t - self.t) / self.max_dt))
+            dt = (t - self.t) / n_steps
+            for _ in range(n_steps):
+                self.t += dt
+                self.tic.advance(dt, self.t)
+                self.plant.step(dt, self.actuator_gap())
+
+    def force(self) -> float:
+        """Noisy force on the load cell, in the units the simulated load cell is calibrated in
+
+        Returns:
+            float: force, positive when squeezing the sample
+        """
+        if self.replay is not None:
+            force = self._replay_force
+        else:
+            force = self.plant.force / GRAMS_TO_N
+        if self.noise_std > 0:
+            force += self._random.gauss(0, self.noise_std)
+        return force
+
+    def raw_reading(self) -> int:
+        """Raw reading the OpenScale would report for the current force
+
+        Returns:
+            int: raw load cell reading
+        """
+        change = 0
+        if self.start_temperature is not None:
+            change = self.temperature() - self.start_temperature
+        zero = self.scale_config["tare"] + self.zero_drift * change
+        span = self.scale_config["calibration"] * (1 + self.span_drift * change)
+        return round(zero + span * self.force())
+
+    def temperature(self) -> float:
+        """Temperature the OpenScale would report
+
+        Returns:
+            float: load cell temperature, or None if it isn't reported
+        """
+        if self.start_temperature is None:
+            return None
+        return self.start_temperature + self.warming_rate * (self.t - self.start_time)
+
+    def tic_variables(self) -> SimpleNamespace:
+        """Brings the simulation up to date and reads the Tic variables
+
+        Returns:
+            SimpleNamespace: the Tic variables, named as in pytic
+        """
+        with self.lock:
+            self.advance()
+            return self.tic.variables()
@@ -0,0 +1,140 @@
+from Actuator.ticactuator import TicActuator
+from Simulator.simrig import SimRig
+
+
+class SimTicVariables:
+    """Stands in for pytic's PyTic_Variables. Like the real thing, every attribute read fetches all of the Tic's variables."""
+
+    def __init__(self, rig: SimRig):
+        """Attaches to the simulated Tic
+
+        Args:
+            rig (SimRig): the simulated rig
+        """
+        self._rig = rig
+        self._tic_variables = rig.tic.variables()
+
+    def _update_tic_variables(self):
+        """Fetches all of the Tic's variables at once"""
+        self._tic_variables = self._rig.tic_variables()
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        self._update_tic_variables()
+        return getattr(self._tic_variables, name)
+
+
+class SimTicActuator(TicActuator):
+    """Drop-in stand-in for TicActuator that drives a simulated Tic"""
+
+    def __init__(
+        self,
+        step_size: float = 0.01,
+        step_mode: int = 0,
+        current_limit: int = 576,
+        wait_for_power: bool = True,
+        rig: SimRig = None,
+    ):
+        """Connects to a simulated actuator
+
+        Args:
+            step_size (float, optional): Size of actuator's full step in mm. Defaults to 0.01.
+            step_mode (int, optional): Microstepping mode. Defaults to 0 (full steps).
+            current_limit (int, optional): Current limit in mA. Defaults to 576.
+            wait_for_power (bool, optional): Unused, the simulated actuator always has power. Defaults to True.
+            rig (SimRig, optional): the simulated rig. Defaults to the shared rig from SimRig.get_default().
+        """
+        self.rig = rig if rig is not None else SimRig.get_default()
+        self.rig.tic.step_size = step_size
+        self.variables = SimTicVariables(self.rig)
+        self._init_state(step_size)
+
+        self.my_set_step_mode(step_mode)
+        self.set_current_limit(current_limit)
+
+    def _command(self, func, *args):
+        """Sends a command to the simulated Tic once the simulation is up to date
+
+        Args:
+            func (function): TicModel method carrying out the command
+        """
+        with self.rig.lock:
+            self.rig.advance()
+            func(*args)
+
+    def _set(self, name: str, value):
+        """Sets one of the simulated Tic's settings once the simulation is up to date
+
+        Args:
+            name (str): TicModel attribute to set
+            value (_type_): its new value
+        """
+        self._command(setattr, self.rig.tic, name, value)
+
+    def list_connected_device_serial_numbers(self) -> list[str]:
+        return ["SIM00000"]
+
+    def connect_to_serial_number(self, serial_number: str):
+        pass
+
+    def reset_command_timeout(self):
+        def reset(tic):
+            tic.last_command_time = self.rig.clock.now()
+            tic.error_status &= (
+                ~tic.ERROR_COMMAND_TIMEOUT
+            )  # cleared by the next command, as on the Tic
+
+        self._command(reset, self.rig.tic)
+
+    def set_target_position(self, target: int):
+        self.reset_command_timeout()
+        self._set("target_position", int(target))
+        self._set("planning_mode", 1)
+
+    def set_target_velocity(self, target: int):
+        self.reset_command_timeout()
+        self._set("target_velocity", int(target))
+        self._set("planning_mode", 2)
+
+    def halt_and_set_position(self, position: int):
+        def halt(tic):
+            tic.position = float(position)
+            tic.velocity = 0
+            tic.target_position = int(position)
+            tic.planning_mode = 0
+
+        self._command(halt, self.rig.tic)
+
+    def halt_and_hold(self):
+        self._command(setattr, self.rig.tic, "velocity", 0)
+        self._set("planning_mode", 0)
+
+    def set_max_speed(self, max_speed: int):
+        self._set("max_speed", int(max_speed))
+
+    def set_max_accel(self, max_accel: int):
+        self._set("max_accel", int(max_accel))
+
+    def set_max_decel(self, max_decel: int):
+        self._set("max_decel", int(max_decel))
+
+    def set_step_mode(self, step_mode: int):
+        self._set("step_mode", int(step_mode))
+
+    def set_current_limit(self, current_limit: int):
+        self._set("current_limit", int(current_limit))
+
+    def energize(self):
+        self._set("energized", True)
+
+    def deenergize(self):
+        self._set("energized", False)
+
+    def exit_safe_start(self):
+        self.reset_command_timeout()
+        self._set("error_status", 0)
+        self._set("safe_start", False)
+
+    def enter_safe_start(self):
+        self._set("safe_start", True)
@@ -0,0 +1,186 @@
+import math
+
+HAMMER_RADIUS = 25e-3  # m
+
+
+class HerschelBulkleyFluid:
+    """Yield stress fluid with power law flow above yield, tau = tau_y + K * gamma_dot^n.
+    Newtonian fluids have no yield stress and n = 1, Bingham fluids have n = 1.
+    """
+
+    def __init__(
+        self, yield_stress: float = 0, consistency: float = 1, flow_index: float = 1
+    ):
+        """Creates a fluid model
+
+        Args:
+            yield_stress (float, optional): yield stress tau_y (Pa). Defaults to 0.
+            consistency (float, optional): consistency K (Pa.s^n), the viscosity for n = 1. Defaults to 1.
+            flow_index (float, optional): flow index n, below 1 is shear thinning. Defaults to 1.
+        """
+        self.yield_stress = yield_stress
+        self.consistency = consistency
+        self.flow_index = flow_index
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        """Builds a fluid model from a settings dictionary
+
+        Args:
+            settings (dict): has a "model" of "newtonian", "bingham" or "herschel_bulkley", plus that model's parameters
+
+        Raises:
+            ValueError: if the model is not one of the above
+
+        Returns:
+            HerschelBulkleyFluid: the fluid model
+        """
+        model = settings["model"].lower()
+        if model == "newtonian":
+            return cls(0, settings["viscosity_Pa_s"], 1)
+        if model == "bingham":
+            return cls(
+                settings["yield_stress_Pa"], settings["plastic_viscosity_Pa_s"], 1
+            )
+        if model == "herschel_bulkley":
+            return cls(
+                settings["yield_stress_Pa"],
+                settings["consistency_Pa_sn"],
+                settings["flow_index"],
+            )
+        raise ValueError("Unknown fluid model '{:}'".format(settings["model"]))
+
+
+class SqueezeFlowPlant:
+    """Squeeze flow of a fixed sample volume between the hammer and the bottom plate, seen through a compliant frame.
+
+    The frame and load cell act as a spring between where the actuator puts the hammer and where the hammer
+    actually is, so the measured force is frame_stiffness * (gap - actuator_gap). The sample resists with a
+    plastic force (Meeten (2000) with wall slip, Scott (1935) without) plus a power law viscous squeeze force,
+    and only flows once the spring force exceeds the plastic force. The gap is stepped semi-implicitly, so
+    stiff frames are fine at millisecond time steps.
+    """
+
+    def __init__(
+        self,
+        fluid: HerschelBulkleyFluid,
+        sample_volume: float,
+        contact_gap: float,
+        frame_stiffness: float,
+        wall_slip: bool = True,
+        plate_radius: float = HAMMER_RADIUS,
+    ):
+        """Creates a squeeze flow plant with the hammer not yet touching the sample
+
+        Args:
+            fluid (HerschelBulkleyFluid): the sample's rheology
+            sample_volume (float): sample volume (m^3)
+            contact_gap (float): gap (m) at which the hammer first touches the sample
+            frame_stiffness (float): combined stiffness of frame and load cell (N/m)
+            wall_slip (bool, optional): whether the sample slips at the plates. Defaults to True.
+            plate_radius (float, optional): hammer radius (m). Defaults to HAMMER_RADIUS.
+        """
+        self.fluid = fluid
+        self.sample_volume = sample_volume
+        self.contact_gap = contact_gap
+        self.frame_stiffness = frame_stiffness
+        self.wall_slip = wall_slip
+        self.plate_radius = plate_radius
+
+        self.gap = None
+        """Actual gap (m) between hammer and bottom plate once in contact, None before"""
+        self.force = 0
+        """Force (N) pushing up on the hammer, positive when squeezing"""
+
+    def sample_radius(self, gap: float) -> float:
+        """Radius of the sample under the hammer, assuming it stays a cylinder
+
+        Args:
+            gap (float): gap (m)
+
+        Returns:
+            float: sample radius (m), no more than the hammer radius
+        """
+        return min(self.plate_radius, math.sqrt(self.sample_volume / (math.pi * gap)))
+
+    def yield_force(self, gap: float) -> float:
+        """Force needed to make the sample flow at all
+
+        Args:
+            gap (float): gap (m)
+
+        Returns:
+            float: plastic squeeze force (N)
+        """
+        r = self.sample_radius(gap)
+        if self.wall_slip:  # Meeten (2000)
+            return math.sqrt(3) * self.fluid.yield_stress * math.pi * r**2
+        return 2 * math.pi * self.fluid.yield_stress * r**3 / (3 * gap)  # Scott (1935)
+
+    def viscous_coefficient(self, gap: float) -> float:
+        """Coefficient C in the viscous squeeze force C * v^n, from the power law Stefan equation
+
+        Args:
+            gap (float): gap (m)
+
+        Returns:
+            float: viscous coefficient (N.(s/m)^n)
+        """
+        n = self.fluid.flow_index
+        r = self.sample_radius(gap)
+        return (
+            2
+            * math.pi
+            * self.fluid.consistency
+            / (n + 3)
+            * ((2 * n + 1) / n) ** n
+            * r ** (n + 3)
+            / gap ** (2 * n + 1)
+        )
+
+    def step(self, dt: float, actuator_gap: float) -> float:
+        """Advances the plant by one time step
+
+        Args:
+            dt (float): time step (s)
+            actuator_gap (float): gap (m) the actuator would give if the frame were rigid, at the end of the step
+
+        Returns:
+            float: force (N) pushing up on the hammer at the end of the step
+        """
+        if self.gap is None:
+            if actuator_gap > self.contact_gap:
+                self.force = 0
+                return self.force
+            self.gap = self.contact_gap
+
+        k = self.frame_stiffness
+        h = self.gap
+        spring_force = k * (h - actuator_gap)
+        excess = abs(spring_force) - self.yield_force(h)
+        if excess > 0 and dt > 0:
+            # Solve excess - k * x - C * (x / dt)^n = 0 for how far the gap moves, x >= 0
+            C = self.viscous_coefficient(h)
+            n = self.fluid.flow_index
+            if n == 1:
+                x = excess / (k + C / dt)
+            else:
+                lo, hi = 0.0, excess / k
+                x = hi
+                for _ in range(60):
+                    residual = excess - k * x - C * (x / dt) ** n
+                    if abs(residual) <= 1e-12 * excess:
+                        break
+                    if residual > 0:
+                        lo = x
+                    else:
+                        hi = x
+                    slope = (
+                        -k - n * C / dt * (x / dt) ** (n - 1) if x > 0 else -math.inf
+                    )
+                    x_newton = x - residual / slope
+                    x = x_newton if lo < x_newton < hi else (lo + hi) / 2
+            self.gap = max(h - math.copysign(x, spring_force), 1e-6)
+
+        self.force = k * (self.gap - actuator_gap)
+        return self.force
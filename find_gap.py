@@ -1,12 +1,18 @@
+import sys
 import json
 import threading
-import pytic
 from time import sleep, time
 import math
 from datetime import datetime
 import re
-from Actuator.ticactuator import TicActuator
-from LoadCell.openscale import OpenScale
+
+# Stand in simulated hardware if asked, see Simulator/simulator_settings.json
+if "--simulate" in sys.argv:
+    from Simulator.simopenscale import SimOpenScale as OpenScale
+    from Simulator.simticactuator import SimTicActuator as TicActuator
+else:
+    from LoadCell.openscale import OpenScale
+    from Actuator.ticactuator import TicActuator
 
 # - Initialization -------------------------------------------
 
@@ -43,6 +49,7 @@ gap = 0
 
 if __name__ == "__main__":
     scale = OpenScale()
+    config_path = scale.config_path
 
     # target_line = input("Enter the target force in [{:}]: ".format(scale.units))
     # temp = re.compile("[0-9.]+")
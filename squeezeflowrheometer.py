@@ -70,6 +70,22 @@ class SqueezeFlowRheometer:
         res = temp.search(inp).group(0)
         return abs(float(res))
 
+    def yield_stress_guess(force: float, gap: float, sample_volume: float) -> float:
+        """Estimates the sample's yield stress from the force holding it at a gap, assuming it slips at the plates
+        (Meeten (2000))
+
+        Args:
+            force (float): force in grams
+            gap (float): gap in m
+            sample_volume (float): sample volume in m^3
+
+        Returns:
+            float: yield stress in Pa, 0 with no sample volume
+        """
+        if sample_volume <= 0:
+            return 0
+        return 0.00980665 * force * gap / sample_volume / math.sqrt(3)
+
     def input_start_gap(scale) -> float:
         """Gets start gap in mm from user.
 